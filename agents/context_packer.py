@@ -0,0 +1,214 @@
+"""
+Pakowanie kontekstu promptów w budżet tokenów.
+
+- pack_documents: fragmenty (już w kolejności trafności po rerankingu)
+  dokładane do budżetu settings.context_docs_token_budget; ostatni, który
+  się nie mieści, jest przycinany, jeśli zostało na niego min. tokenów
+- compress_report: raport dla promptów scenariuszy przycinany do
+  settings.context_report_token_budget proporcjonalnie w każdej sekcji
+  (nagłówki zostają), zamiast obcinać końcowe sekcje
+- prompt_telemetry: liczba tokenów promptu (statystyki + event SSE)
+
+Tokeny liczone są tiktokenem (settings.tokenizer_encoding). To przybliżenie
+tokenizera Gemini, wystarczające do budżetów; gdy tiktoken lub plik
+kodowania jest niedostępny (offline), liczymy ~4 znaki na token.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import logging
+import re
+import threading
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Znaków na token przy braku tiktoken
+CHARS_PER_TOKEN = 4
+
+_encoding: Any = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+_prompt_stats: Dict[str, Dict[str, float]] = {}
+_prompt_stats_lock = threading.Lock()
+
+
+def _get_encoding():
+    """Kodowanie tiktoken (leniwie; None gdy niedostępne)."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(settings.tokenizer_encoding)
+                except Exception as e:
+                    logger.warning(f"tiktoken niedostępny ({e}) - liczenie tokenów ~{CHARS_PER_TOKEN} znaki/token")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Liczba tokenów tekstu."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = " [...]") -> str:
+    """
+    Przycina tekst do max_tokens (łącznie z sufiksem), na granicy zdania lub słowa.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    budget = max(1, max_tokens - count_tokens(suffix))
+    encoding = _get_encoding()
+    if encoding is None:
+        cut = text[:budget * CHARS_PER_TOKEN]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:budget])
+
+    # Granica zdania w drugiej połowie, inaczej granica słowa
+    sentence_end = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("\n"))
+    if sentence_end >= len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    elif " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + suffix
+
+
+@dataclass
+class PackedContext:
+    """Wynik pakowania fragmentów."""
+
+    text: str
+    tokens: int
+    included: int
+    truncated: int = 0
+    dropped: int = 0
+    # Indeksy (w kolejności wejściowej) fragmentów, które trafiły do kontekstu
+    indices: List[int] = field(default_factory=list)
+
+
+def pack_documents(
+    docs: Sequence[Any],
+    render: Callable[[Any], str],
+    budget_tokens: Optional[int] = None,
+    separator: str = "\n---\n",
+    min_chunk_tokens: Optional[int] = None
+) -> PackedContext:
+    """
+    Dokłada fragmenty w kolejności trafności do budżetu tokenów.
+
+    Fragment, który się nie mieści, jest przycinany (jeśli zostało co najmniej
+    min_chunk_tokens), a dalsze krótsze fragmenty nadal mogą wypełnić resztę.
+
+    Args:
+        docs: Fragmenty od najtrafniejszego
+        render: Zamiana fragmentu na tekst promptu
+        budget_tokens: Budżet (domyślnie settings.context_docs_token_budget)
+        separator: Separator fragmentów
+        min_chunk_tokens: Minimalny sensowny przycięty fragment (domyślnie z settings)
+    """
+    budget = budget_tokens or settings.context_docs_token_budget
+    min_chunk = min_chunk_tokens or settings.context_min_chunk_tokens
+    separator_tokens = count_tokens(separator)
+
+    parts: List[str] = []
+    packed = PackedContext(text="", tokens=0, included=0)
+
+    for i, doc in enumerate(docs):
+        text = render(doc)
+        cost = count_tokens(text) + (separator_tokens if parts else 0)
+        remaining = budget - packed.tokens
+
+        if cost <= remaining:
+            parts.append(text)
+            packed.tokens += cost
+        elif remaining - separator_tokens >= min_chunk:
+            text = truncate_to_tokens(text, remaining - separator_tokens)
+            parts.append(text)
+            packed.tokens += count_tokens(text) + (separator_tokens if len(parts) > 1 else 0)
+            packed.truncated += 1
+        else:
+            packed.dropped += 1
+            continue
+
+        packed.included += 1
+        packed.indices.append(i)
+
+    packed.text = separator.join(parts)
+    return packed
+
+
+_HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
+
+
+def compress_report(report: str, budget_tokens: Optional[int] = None) -> str:
+    """
+    Skraca raport do budżetu tokenów, zachowując wszystkie sekcje.
+
+    Raport dzielony jest na sekcje po nagłówkach markdown; każda sekcja
+    dostaje część budżetu proporcjonalną do swojej długości i jest
+    przycinana od końca (pierwsze akapity sekcji niosą tezy).
+    """
+    budget = budget_tokens or settings.context_report_token_budget
+    total = count_tokens(report)
+    if total <= budget:
+        return report
+
+    starts = [m.start() for m in _HEADING_RE.finditer(report)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = [report[start:end].strip() for start, end in zip(starts, starts[1:] + [len(report)])]
+    sections = [s for s in sections if s]
+
+    compressed = []
+    for section in sections:
+        share = max(1, int(budget * count_tokens(section) / total))
+        compressed.append(truncate_to_tokens(section, share))
+
+    result = "\n\n".join(s for s in compressed if s)
+    logger.debug(f"Raport skrócony: {total} -> {count_tokens(result)} tokenów ({len(sections)} sekcji)")
+    return result
+
+
+def prompt_telemetry(prompt_name: str, prompt: str, **parts: int) -> Dict[str, Any]:
+    """
+    Rejestruje rozmiar promptu i zwraca telemetrię do eventu SSE.
+
+    Args:
+        prompt_name: Nazwa promptu (np. "analysis", "scenario")
+        prompt: Pełny tekst promptu
+        **parts: Tokeny składowych (np. documents=..., report=...)
+    """
+    tokens = count_tokens(prompt)
+    with _prompt_stats_lock:
+        stats = _prompt_stats.setdefault(prompt_name, {"count": 0, "total_tokens": 0, "max_tokens": 0})
+        stats["count"] += 1
+        stats["total_tokens"] += tokens
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+
+    logger.info(f"Prompt '{prompt_name}': {tokens} tokenów {parts or ''}")
+    return {"prompt": prompt_name, "tokens": tokens, **parts}
+
+
+def get_prompt_stats() -> Dict[str, Dict[str, Any]]:
+    """Statystyki rozmiaru promptów (tokeny) w tym procesie."""
+    with _prompt_stats_lock:
+        return {
+            name: {
+                "count": int(stats["count"]),
+                "avg_tokens": round(stats["total_tokens"] / stats["count"]) if stats["count"] else 0,
+                "max_tokens": int(stats["max_tokens"]),
+            }
+            for name, stats in sorted(_prompt_stats.items())
+        }
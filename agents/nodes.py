@@ -1,10 +1,14 @@
 from typing import Dict, Any, Callable, Optional
 from datetime import datetime
+import logging
 
 from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.prebuilt import create_react_agent
 
 from services.llm import get_llm
+from services.registry import get_registry
+from agents.token_stream import stream_completion
+from agents.context_packer import compress_report, count_tokens, pack_documents, prompt_telemetry
 from core.config import (
     REGIONS, COUNTRIES, SOURCES,
     REGION_PROMPT, COUNTRY_PROMPT, SYNTHESIS_PROMPT,
@@ -16,7 +20,10 @@ from schemas.schemas import (
     FullReport, ReportSectionType
 )
 from services.tools import search_vector_store, get_region_info, search_by_source, search_by_country, get_search_service
-from services.rag.search import SearchStrategy
+from services.rag.search import SearchStrategy, SearchFilter
+from services.rag.reranker import get_reranker
+
+logger = logging.getLogger(__name__)
 
 
 # Typ dla emit callback
@@ -27,6 +34,20 @@ async def noop_emit(event: Dict[str, Any]) -> None:
     pass
 
 
+def get_react_agent(node: str, temperature: float, tools: list):
+    """
+    Zwraca skompilowanego agenta ReAct dla węzła (budowany raz na proces).
+
+    Agent jest bezstanowy - stan rozmowy przekazywany jest w ainvoke,
+    więc jedna instancja obsługuje wszystkie analizy.
+    """
+    llm = get_llm(temperature=temperature, node=node)
+    return get_registry("agent").get_or_create(
+        (node, id(llm)),
+        lambda: create_react_agent(model=llm, tools=tools)
+    )
+
+
 async def region_node(state: Dict[str, Any], emit: Optional[EmitCallback] = None) -> Dict[str, Any]:
     """
     Analizuje region geopolityczny.
@@ -68,7 +89,7 @@ async def region_node(state: Dict[str, Any], emit: Optional[EmitCallback] = None
 
     # 2. Wyszukaj dokumenty PRZED agentem
     service = get_search_service()
-    search_results = service.search(
+    search_results = await service.asearch(
         query=query,
         n_results=5,
         region=search_region,
@@ -98,8 +119,7 @@ async def region_node(state: Dict[str, Any], emit: Optional[EmitCallback] = None
     ]) if search_results else "Brak dokumentów w bazie dla tego regionu."
 
     # 5. Uruchom agenta z kontekstem dokumentów
-    llm = get_llm(temperature=0.3)
-    agent = create_react_agent(model=llm, tools=[search_vector_store, get_region_info])
+    agent = get_react_agent("region", 0.3, [search_vector_store, get_region_info])
 
     result = await agent.ainvoke({
         "messages": [HumanMessage(content=f"{prompt}\n\nDokumenty źródłowe:\n{docs_context}\n\nZapytanie: {query}")]
@@ -168,7 +188,7 @@ async def country_node(state: Dict[str, Any], emit: Optional[EmitCallback] = Non
 
     # Priorytet: najpierw po źródle, potem po kraju
     if source:
-        search_results = service.search(
+        search_results = await service.asearch(
             query=query,
             n_results=5,
             source=source,
@@ -176,7 +196,7 @@ async def country_node(state: Dict[str, Any], emit: Optional[EmitCallback] = Non
         )
 
     if not search_results and country:
-        search_results = service.search(
+        search_results = await service.asearch(
             query=query,
             n_results=5,
             country=country,
@@ -185,7 +205,7 @@ async def country_node(state: Dict[str, Any], emit: Optional[EmitCallback] = Non
 
     # Fallback: wyszukaj bez filtrów
     if not search_results:
-        search_results = service.search(
+        search_results = await service.asearch(
             query=query,
             n_results=5,
             strategy=SearchStrategy.HYBRID
@@ -214,9 +234,7 @@ async def country_node(state: Dict[str, Any], emit: Optional[EmitCallback] = Non
     ]) if search_results else "Brak dokumentów w bazie dla tego kraju/źródła."
 
     # 4. Uruchom agenta z kontekstem dokumentów
-    llm = get_llm(temperature=0.3)
-    
-    agent = create_react_agent(model=llm, tools=[search_by_source, search_by_country])
+    agent = get_react_agent("country", 0.3, [search_by_source, search_by_country])
 
     result = await agent.ainvoke({
         "messages": [HumanMessage(content=f"{prompt}\n\nDokumenty źródłowe:\n{docs_context}\n\nZapytanie: {query}")]
@@ -299,8 +317,7 @@ async def synthesis_node(state: Dict[str, Any], emit: Optional[EmitCallback] = N
     ])
     prompt = SYNTHESIS_PROMPT.format(expert_analyses=expert_text)
 
-    llm = get_llm(temperature=0.5)
-    agent = create_react_agent(model=llm, tools=[])
+    agent = get_react_agent("synthesis", 0.5, [])
 
     result = await agent.ainvoke({
         "messages": [HumanMessage(content=f"{prompt}\n\nZapytanie: {query}")]
@@ -385,7 +402,7 @@ Struktura:
 
 Odpowiedz w formacie Markdown."""
 
-    llm = get_llm(temperature=0.6 if variant == "positive" else 0.4)
+    llm = get_llm(temperature=0.6 if variant == "positive" else 0.4, node="scenario")
     result = await llm.ainvoke(scenario_prompt)
     scenario_content = result.content
 
@@ -427,7 +444,13 @@ def report_to_markdown(report: FullReport) -> str:
 # ============================================================================
 
 import asyncio
-from core.config import MVP_ANALYSIS_PROMPT, MVP_SCENARIO_PROMPT
+from core.config import (
+    MVP_ANALYSIS_PROMPT, MVP_SCENARIO_CONTEXT_PROMPT, MVP_SCENARIO_TASK_PROMPT,
+    MVP_SCENARIOS_BATCH_TASK_PROMPT, settings
+)
+from schemas.schemas import ScenarioBatch
+from services.context_cache import CachedContext, get_context_cache
+from services.executor import run_blocking
 
 
 async def analysis_node(state: Dict[str, Any], emit: Optional[EmitCallback] = None) -> Dict[str, Any]:
@@ -459,64 +482,57 @@ async def analysis_node(state: Dict[str, Any], emit: Optional[EmitCallback] = No
     })
 
     service = get_search_service()
-    all_docs = []
-
-    # Wyszukaj dla każdego regionu
-    for region in regions:
-        try:
-            results = service.search(
-                query=query,
-                n_results=5,
-                region=region if region in REGIONS else None,
-                strategy=SearchStrategy.HYBRID
-            )
-            all_docs.extend(results)
-        except Exception as e:
-            await emit({
-                "type": "error",
-                "agent": "analysis",
-                "content": f"Błąd wyszukiwania dla regionu {region}: {str(e)}"
-            })
-
-    # Wyszukaj dla krajów (limit do 3)
-    for country in countries[:3]:
-        try:
-            results = service.search(
-                query=query,
-                n_results=3,
-                country=country if country in COUNTRIES else None,
-                strategy=SearchStrategy.HYBRID
-            )
-            all_docs.extend(results)
-        except Exception as e:
-            await emit({
-                "type": "error",
-                "agent": "analysis",
-                "content": f"Błąd wyszukiwania dla kraju {country}: {str(e)}"
-            })
+
+    # Filtry: każdy region + kraje (limit do 3) - wyszukiwane równolegle
+    filters = [
+        SearchFilter(
+            region=region if region in REGIONS else None,
+            n_results=5,
+            label=f"region {region}"
+        )
+        for region in regions
+    ]
+    filters += [
+        SearchFilter(
+            country=country if country in COUNTRIES else None,
+            n_results=3,
+            label=f"kraj {country}"
+        )
+        for country in countries[:3]
+    ]
+
+    # Wyniki są już połączone i zdeduplikowane
+    unique_docs = await service.asearch_many(
+        query=query,
+        filters=filters,
+        strategy=SearchStrategy.HYBRID
+    )
 
     # Fallback - wyszukaj bez filtrów jeśli brak wyników
-    if not all_docs:
+    if not unique_docs:
         await emit({
             "type": "thinking",
             "agent": "analysis",
             "content": "Brak wyników z filtrami, szukam w całej bazie..."
         })
-        results = service.search(
+        unique_docs = await service.asearch(
             query=query,
             n_results=10,
             strategy=SearchStrategy.HYBRID
         )
-        all_docs.extend(results)
 
-    # Deduplikacja
-    seen = set()
-    unique_docs = []
-    for doc in all_docs:
-        content_hash = hash(doc.content[:200] if len(doc.content) > 200 else doc.content)
-        if content_hash not in seen:
-            seen.add(content_hash)
-            unique_docs.append(doc)
+    # Reranking (MMR / cross-encoder): mniej, ale trafniejszych i zróżnicowanych fragmentów
+    if settings.rerank_enabled and unique_docs:
+        reranked = await get_reranker().arerank(query, unique_docs)
+        await emit({
+            "type": "thinking",
+            "agent": "analysis",
+            "content": (
+                f"Wybrano {len(reranked.results)} z {len(unique_docs)} fragmentów "
+                f"(reranking {reranked.timings.get('total', 0):.0f} ms)"
+            )
+        })
+        unique_docs = reranked.results
 
     # Emituj dokumenty
     await emit({
@@ -541,11 +557,9 @@ async def analysis_node(state: Dict[str, Any], emit: Optional[EmitCallback] = No
         "content": "Generuję raport analityczny..."
     })
 
-    # Przygotuj kontekst dokumentów
-    docs_context = "\n---\n".join([
-        f"[Źródło: {d.metadata.source}] {d.content}"
-        for d in unique_docs[:15]
-    ]) if unique_docs else "Brak dokumentów w bazie. Analiza oparta na wiedzy ogólnej."
+    # Kontekst dokumentów w budżecie tokenów (kolejność trafności)
+    packed = pack_documents(unique_docs, lambda d: f"[Źródło: {d.metadata.source}] {d.content}")
+    docs_context = packed.text or "Brak dokumentów w bazie. Analiza oparta na wiedzy ogólnej."
 
     # Prompt MVP
     analysis_prompt = MVP_ANALYSIS_PROMPT.format(
@@ -556,16 +570,34 @@ async def analysis_node(state: Dict[str, Any], emit: Optional[EmitCallback] = No
         documents=docs_context
     )
 
-    llm = get_llm(temperature=0.4)
-    result = await llm.ainvoke(analysis_prompt)
-    report_content = result.content
+    telemetry = prompt_telemetry(
+        "analysis", analysis_prompt,
+        documents=packed.tokens,
+        documents_included=packed.included,
+        documents_truncated=packed.truncated,
+        documents_dropped=packed.dropped
+    )
+    await emit({
+        "type": "telemetry",
+        "agent": "analysis",
+        "content": f"Prompt analizy: {telemetry['tokens']} tokenów ({packed.included} fragmentów)",
+        "telemetry": telemetry
+    })
+
+    # Tokeny raportu idą do UI na bieżąco jako report_delta
+    llm = get_llm(temperature=0.4, node="analysis")
+    report_content = await stream_completion(llm, analysis_prompt, emit, {
+        "type": "report_delta",
+        "agent": "analysis",
+        "section": "main_analysis"
+    })
 
-    # Emituj raport
+    # Emituj pełny raport
     await emit({
         "type": "report",
         "agent": "analysis",
         "section": "main_analysis",
-        "content": report_content[:1500] if len(report_content) > 1500 else report_content
+        "content": report_content
     })
 
     await emit({
@@ -589,9 +621,79 @@ async def analysis_node(state: Dict[str, Any], emit: Optional[EmitCallback] = No
     }
 
 
+# Konfiguracja scenariuszy
+SCENARIO_CONFIGS = [
+    {"timeframe": "12 miesięcy", "variant": "positive", "variant_pl": "POZYTYWNY", "word_limit": "300-400"},
+    {"timeframe": "12 miesięcy", "variant": "negative", "variant_pl": "NEGATYWNY", "word_limit": "300-400"},
+    {"timeframe": "36 miesięcy", "variant": "positive", "variant_pl": "POZYTYWNY", "word_limit": "350-450"},
+    {"timeframe": "36 miesięcy", "variant": "negative", "variant_pl": "NEGATYWNY", "word_limit": "350-450"},
+]
+
+
+async def _create_scenario_context(shared_prompt: str) -> Optional[CachedContext]:
+    """Zapisuje wspólny prefiks w cache kontekstu (None = pełne prompty)."""
+    if count_tokens(shared_prompt) < settings.scenario_context_cache_min_tokens:
+        logger.debug("Prefiks scenariuszy poniżej minimum cache kontekstu - pełne prompty")
+        return None
+    return await run_blocking(
+        "context_cache.create", get_context_cache().create, settings.llm_model, shared_prompt
+    )
+
+
+async def _generate_scenarios_batched(
+    shared_prompt: str,
+    configs: list,
+    emit: EmitCallback
+) -> Dict[tuple, str]:
+    """
+    Wszystkie scenariusze jednym wywołaniem (structured output).
+
+    Returns:
+        Treści scenariuszy po (timeframe, variant); brakujące pomijane
+    """
+    task_prompt = MVP_SCENARIOS_BATCH_TASK_PROMPT.format(
+        count=len(configs),
+        scenario_list="\n".join(
+            f"- timeframe: \"{c['timeframe']}\", variant: \"{c['variant']}\" "
+            f"(scenariusz {c['variant_pl']}, {c['word_limit']} słów)"
+            for c in configs
+        )
+    )
+    prompt = shared_prompt + "\n\n" + task_prompt
+
+    telemetry = prompt_telemetry("scenario_batch", prompt, scenarios=len(configs))
+    await emit({
+        "type": "telemetry",
+        "agent": "scenarios",
+        "content": f"Prompt scenariuszy (jedno wywołanie): {telemetry['tokens']} tokenów",
+        "telemetry": telemetry
+    })
+
+    try:
+        llm = get_llm(temperature=0.4, node="scenarios").with_structured_output(ScenarioBatch)
+        batch = await llm.ainvoke(prompt)
+    except Exception as e:
+        logger.error(f"Błąd zbiorczego generowania scenariuszy: {e}")
+        return {}
+
+    return {(s.timeframe, s.variant): s.content for s in (batch.scenarios if batch else [])}
+
+
 async def scenarios_node(state: Dict[str, Any], emit: Optional[EmitCallback] = None) -> Dict[str, Any]:
     """
-    Generuje 4 scenariusze równolegle (asyncio.gather).
+    Generuje 4 scenariusze (settings.scenario_generation_mode).
+
+    Prompty mają wspólny prefiks (raport, zapytanie, zasady) i krótkie
+    zadanie na końcu, więc prefiks może być przetworzony raz:
+    - parallel: 4 wywołania równolegle (Gemini cache'uje wspólny prefiks niejawnie)
+    - context_cache: prefiks zapisany w cache kontekstu, wywołania wysyłają
+      tylko zadanie; gdy cache niedostępny - jak parallel
+    - batched: jedno wywołanie ze structured output; scenariusze, których
+      zabrakło w odpowiedzi, generowane są pojedynczo
+
+    W trybach parallel/context_cache tekst każdego scenariusza jest
+    streamowany (scenario_delta), a gotowy scenariusz emitowany zaraz po
+    zakończeniu, niezależnie od pozostałych.
 
     Scenariusze:
     - 12m pozytywny, 12m negatywny
@@ -608,6 +710,7 @@ async def scenarios_node(state: Dict[str, Any], emit: Optional[EmitCallback] = N
     report = state.get("analysis_report", "")
     messages = state.get("messages", [])
     query = messages[0].content if messages else ""
+    mode = settings.scenario_generation_mode
 
     await emit({
         "type": "thinking",
@@ -615,59 +718,99 @@ async def scenarios_node(state: Dict[str, Any], emit: Optional[EmitCallback] = N
         "content": "Generuję 4 scenariusze rozwoju sytuacji..."
     })
 
-    # Konfiguracja scenariuszy
-    scenario_configs = [
-        {"timeframe": "12 miesięcy", "variant": "positive", "variant_pl": "POZYTYWNY", "word_limit": "300-400"},
-        {"timeframe": "12 miesięcy", "variant": "negative", "variant_pl": "NEGATYWNY", "word_limit": "300-400"},
-        {"timeframe": "36 miesięcy", "variant": "positive", "variant_pl": "POZYTYWNY", "word_limit": "350-450"},
-        {"timeframe": "36 miesięcy", "variant": "negative", "variant_pl": "NEGATYWNY", "word_limit": "350-450"},
-    ]
+    # Raport skrócony do budżetu - wspólny prefiks wszystkich promptów
+    report_context = compress_report(report)
+    shared_prompt = MVP_SCENARIO_CONTEXT_PROMPT.format(report=report_context, query=query)
+    shared_tokens = count_tokens(shared_prompt)
 
-    async def generate_single_scenario(config: dict) -> dict:
-        """Generuje pojedynczy scenariusz."""
+    context = await _create_scenario_context(shared_prompt) if mode == "context_cache" else None
+
+    async def publish_scenario(config: dict, content: str) -> dict:
+        """Emituje gotowy scenariusz i zwraca go w formacie stanu."""
         timeframe = config["timeframe"]
         variant = config["variant"]
-        variant_pl = config["variant_pl"]
-        word_limit = config["word_limit"]
-
-        scenario_prompt = MVP_SCENARIO_PROMPT.format(
-            timeframe=timeframe,
-            variant_pl=variant_pl,
-            word_limit=word_limit,
-            report=report,
-            query=query
-        )
-
-        # Różna temperatura dla pozytywnych/negatywnych
-        llm = get_llm(temperature=0.5 if variant == "positive" else 0.3)
-        result = await llm.ainvoke(scenario_prompt)
 
         # Confidence zależny od horyzontu czasowego
         confidence = 0.75 if "12" in timeframe else 0.55
 
+        # Emituj scenariusz od razu po wygenerowaniu (nie czekając na pozostałe)
+        await emit({
+            "type": "scenario",
+            "agent": "scenarios",
+            "timeframe": timeframe,
+            "variant": variant,
+            "title": f"Scenariusz {variant} ({timeframe})",
+            "content": content,
+            "confidence": confidence
+        })
         return {
             "timeframe": timeframe,
             "variant": variant,
-            "content": result.content,
+            "content": content,
             "confidence": confidence
         }
 
-    # Generuj wszystkie równolegle
-    scenarios = await asyncio.gather(*[
-        generate_single_scenario(cfg) for cfg in scenario_configs
-    ])
+    async def generate_single_scenario(config: dict) -> dict:
+        """Generuje pojedynczy scenariusz."""
+        timeframe = config["timeframe"]
+        variant = config["variant"]
+
+        task_prompt = MVP_SCENARIO_TASK_PROMPT.format(
+            timeframe=timeframe,
+            variant_pl=config["variant_pl"],
+            word_limit=config["word_limit"]
+        )
+
+        # Różna temperatura dla pozytywnych/negatywnych
+        llm = get_llm(temperature=0.5 if variant == "positive" else 0.3, node="scenarios")
+        if context is not None:
+            llm, scenario_prompt = get_context_cache().bind(llm, context, task_prompt)
+            telemetry = prompt_telemetry(
+                "scenario", task_prompt, shared_prefix=shared_tokens, cached_prefix=context.tokens
+            )
+        else:
+            scenario_prompt = shared_prompt + "\n\n" + task_prompt
+            telemetry = prompt_telemetry("scenario", scenario_prompt, shared_prefix=shared_tokens)
 
-    # Emituj każdy scenariusz
-    for scenario in scenarios:
         await emit({
-            "type": "scenario",
+            "type": "telemetry",
             "agent": "scenarios",
-            "timeframe": scenario["timeframe"],
-            "variant": scenario["variant"],
-            "title": f"Scenariusz {scenario['variant']} ({scenario['timeframe']})",
-            "content": scenario["content"],
-            "confidence": scenario["confidence"]
+            "timeframe": timeframe,
+            "variant": variant,
+            "content": f"Prompt scenariusza: {telemetry['tokens']} tokenów",
+            "telemetry": telemetry
+        })
+
+        content = await stream_completion(llm, scenario_prompt, emit, {
+            "type": "scenario_delta",
+            "agent": "scenarios",
+            "timeframe": timeframe,
+            "variant": variant
         })
+        return await publish_scenario(config, content)
+
+    try:
+        if mode == "batched":
+            contents = await _generate_scenarios_batched(shared_prompt, SCENARIO_CONFIGS, emit)
+            scenarios = []
+            missing = []
+            for cfg in SCENARIO_CONFIGS:
+                content = contents.get((cfg["timeframe"], cfg["variant"]))
+                if content:
+                    scenarios.append(await publish_scenario(cfg, content))
+                else:
+                    missing.append(cfg)
+            if missing:
+                logger.warning(f"Tryb batched: brak {len(missing)} scenariuszy - generuję pojedynczo")
+                scenarios += await asyncio.gather(*[generate_single_scenario(cfg) for cfg in missing])
+        else:
+            # Generuj wszystkie równolegle
+            scenarios = await asyncio.gather(*[
+                generate_single_scenario(cfg) for cfg in SCENARIO_CONFIGS
+            ])
+    finally:
+        if context is not None:
+            await run_blocking("context_cache.delete", get_context_cache().delete, context)
 
     await emit({
         "type": "thinking",
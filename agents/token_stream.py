@@ -0,0 +1,76 @@
+"""
+Streaming tokenów LLM jako eventy SSE (*_delta).
+
+Tokeny z llm.astream są łączone w ramki co ~100 ms
+(settings.stream_frame_interval_ms), żeby nie wysyłać osobnego eventu SSE
+dla każdego tokenu. Trafienie w cache odpowiedzi LLM (GeminiChatModel.astream)
+przychodzi jako jeden fragment, więc daje jedną ramkę.
+"""
+from typing import Any, Callable, Dict, List
+import asyncio
+
+from core.config import settings
+
+
+class DeltaCoalescer:
+    """Bufor tekstu emitowany jako eventy delta w ramkach czasowych."""
+
+    def __init__(self, emit: Callable, event: Dict[str, Any], interval: float = None):
+        """
+        Args:
+            emit: Callback SSE
+            event: Pola wspólne eventów (type, agent, section/timeframe...)
+            interval: Minimalny odstęp między ramkami w sekundach
+        """
+        self.emit = emit
+        self.event = event
+        self.interval = interval if interval is not None else settings.stream_frame_interval_ms / 1000
+        self._buffer: List[str] = []
+        self._offset = 0
+        self._last_flush = asyncio.get_running_loop().time()
+        self.frames = 0
+
+    async def add(self, text: str) -> None:
+        """Dodaje fragment; emituje ramkę, jeśli minął interwał."""
+        if not text:
+            return
+        self._buffer.append(text)
+        if asyncio.get_running_loop().time() - self._last_flush >= self.interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Emituje zbuforowany tekst jako jeden event."""
+        self._last_flush = asyncio.get_running_loop().time()
+        if not self._buffer:
+            return
+
+        delta = "".join(self._buffer)
+        self._buffer = []
+        await self.emit({**self.event, "content": delta, "offset": self._offset})
+        self._offset += len(delta)
+        self.frames += 1
+
+
+async def stream_completion(llm: Any, prompt: Any, emit: Callable, event: Dict[str, Any]) -> str:
+    """
+    Wywołuje LLM strumieniowo i emituje odpowiedź jako eventy delta.
+
+    Args:
+        llm: Model czatu (astream)
+        prompt: Prompt (tekst lub wiadomości)
+        emit: Callback SSE
+        event: Pola eventów delta, np. {"type": "report_delta", "agent": "analysis"}
+
+    Returns:
+        Pełna treść odpowiedzi
+    """
+    coalescer = DeltaCoalescer(emit, event)
+    parts: List[str] = []
+
+    async for chunk in llm.astream(prompt):
+        text = chunk.content if isinstance(chunk.content, str) else ""
+        parts.append(text)
+        await coalescer.add(text)
+
+    await coalescer.flush()
+    return "".join(parts)
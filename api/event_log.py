@@ -0,0 +1,143 @@
+"""
+Dziennik eventów sesji (append-only) dla SSE.
+
+Każdy event dostaje rosnące ID (1, 2, 3, ...) wysyłane jako pole SSE `id:`.
+Subskrybent czyta eventy po podanym ID, więc ponowne połączenie
+(Last-Event-ID), druga karta czy kilku równoległych odbiorców widzą
+pełną historię bez ponownego liczenia analizy.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+
+from services.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Typy eventów kończących strumień
+TERMINAL_EVENT_TYPES = ("done", "error")
+
+
+class EventLog:
+    """
+    Append-only lista eventów z powiadamianiem subskrybentów.
+
+    - append() jest synchroniczne i budzi wszystkich czekających
+    - wait_for_events(after_id) zwraca eventy o ID > after_id
+    - opcjonalny on_append (np. kopia do Redis) i fetch_remote
+      (dociąganie eventów emitowanych przez inny proces, w puli wątków -
+      fetch_remote może blokować)
+    """
+
+    def __init__(
+        self,
+        on_append: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+        fetch_remote: Optional[Callable[[int], List[Dict[str, Any]]]] = None,
+        poll_interval: float = 1.0
+    ):
+        """
+        Args:
+            on_append: Callback (event_id, event) po dodaniu eventu lokalnie
+            fetch_remote: Funkcja (synchroniczna) zwracająca eventy po podanym ID z innego źródła
+            poll_interval: Co ile sekund odpytywać fetch_remote
+        """
+        self._events: List[Dict[str, Any]] = []
+        self._changed = asyncio.Event()
+        self.on_append = on_append
+        self.fetch_remote = fetch_remote
+        self.poll_interval = poll_interval
+        self.size_bytes = 0
+
+    @property
+    def last_id(self) -> int:
+        """ID ostatniego eventu (0 gdy pusty)."""
+        return len(self._events)
+
+    @property
+    def finished(self) -> bool:
+        """Czy dziennik zawiera event kończący (done/error)."""
+        return bool(self._events) and self._events[-1].get("type") in TERMINAL_EVENT_TYPES
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def append(self, event: Dict[str, Any], notify_remote: bool = True) -> int:
+        """
+        Dodaje event i budzi subskrybentów.
+
+        Returns:
+            ID eventu
+        """
+        self._events.append(event)
+        event_id = len(self._events)
+        self.size_bytes += len(json.dumps(event, ensure_ascii=False, default=str))
+
+        if notify_remote and self.on_append is not None:
+            try:
+                self.on_append(event_id, event)
+            except Exception as e:
+                logger.warning(f"Błąd on_append dla eventu {event_id}: {e}")
+
+        # Obudź wszystkich czekających i przygotuj nowy sygnał
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return event_id
+
+    def read_after(self, after_id: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Zwraca eventy o ID > after_id jako pary (id, event)."""
+        after_id = max(0, after_id)
+        return [
+            (i, event)
+            for i, event in enumerate(self._events[after_id:], start=after_id + 1)
+        ]
+
+    async def _sync_remote(self) -> None:
+        """Dociąga eventy z fetch_remote (inny worker)."""
+        if self.fetch_remote is None:
+            return
+        start = self.last_id
+        try:
+            events = await run_blocking("session.events", self.fetch_remote, start)
+        except Exception as e:
+            logger.warning(f"Błąd pobierania eventów zdalnych: {e}")
+            return
+        # Inny subskrybent mógł w międzyczasie dociągnąć część tych eventów
+        for event in events[self.last_id - start:]:
+            self.append(event, notify_remote=False)
+
+    async def wait_for_events(
+        self,
+        after_id: int,
+        timeout: float
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        Czeka na eventy o ID > after_id.
+
+        Returns:
+            Lista (id, event); pusta po upływie timeout
+        """
+        await self._sync_remote()
+        events = self.read_after(after_id)
+        if events:
+            return events
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return []
+
+            wait = remaining if self.fetch_remote is None else min(remaining, self.poll_interval)
+            changed = self._changed
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+            await self._sync_remote()
+            events = self.read_after(after_id)
+            if events:
+                return events
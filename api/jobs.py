@@ -0,0 +1,221 @@
+"""
+Kolejka zadań analizy z pulą workerów i kontrolą przyjęć.
+
+/api/analyze nie uruchamia analizy od razu, tylko dodaje zadanie do
+ograniczonej kolejki. Stała liczba workerów (analysis_max_workers) pobiera
+zadania według priorytetu i kolejności zgłoszeń, więc liczba równoległych
+analiz - a z nią wywołań Gemini - nie rośnie z liczbą użytkowników.
+Pełna kolejka oznacza odrzucenie zgłoszenia (HTTP 429).
+"""
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import itertools
+import logging
+import time
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Kolejka analiz jest pełna."""
+
+
+@dataclass
+class AnalysisJob:
+    """Zadanie analizy w kolejce."""
+
+    session_id: str
+    query: str
+    config: Dict[str, Any]
+    # Niższa wartość = wyższy priorytet
+    priority: int = 0
+    enqueued_at: float = field(default_factory=time.monotonic)
+    seq: int = 0
+
+
+# Runner zadania (np. run_analysis_background)
+JobRunner = Callable[[AnalysisJob], Awaitable[None]]
+# Callback pozycji w kolejce: (zadanie, pozycja 1..N)
+PositionCallback = Callable[[AnalysisJob, int], Awaitable[None]]
+
+
+class JobScheduler:
+    """
+    Scheduler analiz: ograniczona kolejka priorytetowa + N workerów.
+
+    - submit() jest synchroniczne - przyjęcie lub QueueFullError bez wyścigu
+    - po każdej zmianie kolejki oczekujący dostają nową pozycję (on_position)
+    - workery startują leniwie przy pierwszym zgłoszeniu
+    """
+
+    def __init__(
+        self,
+        runner: JobRunner,
+        max_workers: Optional[int] = None,
+        max_queue_size: Optional[int] = None,
+        on_position: Optional[PositionCallback] = None
+    ):
+        """
+        Args:
+            runner: Korutyna wykonująca zadanie
+            max_workers: Liczba równoległych analiz (domyślnie settings.analysis_max_workers)
+            max_queue_size: Maksymalna liczba oczekujących (domyślnie settings.analysis_queue_size)
+            on_position: Callback informujący zadanie o pozycji w kolejce
+        """
+        self.runner = runner
+        self.max_workers = max_workers or settings.analysis_max_workers
+        self.max_queue_size = max_queue_size or settings.analysis_queue_size
+        self.on_position = on_position
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._waiting: Dict[str, AnalysisJob] = {}
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._running = 0
+
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+
+    @property
+    def is_full(self) -> bool:
+        """Czy kolejka oczekujących jest pełna."""
+        return len(self._waiting) >= self.max_queue_size
+
+    def _ensure_started(self) -> None:
+        """Tworzy kolejkę i workery w bieżącej pętli (przy pierwszym użyciu)."""
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(i)) for i in range(self.max_workers)
+            ]
+            logger.info(
+                f"JobScheduler: {self.max_workers} workerów, kolejka do {self.max_queue_size}"
+            )
+
+    def submit(self, job: AnalysisJob) -> int:
+        """
+        Dodaje zadanie do kolejki.
+
+        Returns:
+            Pozycja w kolejce (1 = następne do uruchomienia)
+
+        Raises:
+            QueueFullError: gdy kolejka jest pełna
+        """
+        self._ensure_started()
+
+        if self.is_full:
+            self._rejected += 1
+            raise QueueFullError(
+                f"Kolejka analiz pełna ({self.max_queue_size} oczekujących)"
+            )
+
+        job.seq = next(self._seq)
+        job.enqueued_at = time.monotonic()
+        self._waiting[job.session_id] = job
+        self._queue.put_nowait((job.priority, job.seq, job))
+
+        position = self.position(job.session_id)
+        self._schedule_position_updates()
+        return position
+
+    def position(self, session_id: str) -> Optional[int]:
+        """Pozycja zadania w kolejce (None jeśli nie czeka)."""
+        job = self._waiting.get(session_id)
+        if job is None:
+            return None
+        key = (job.priority, job.seq)
+        return 1 + sum(1 for other in self._waiting.values() if (other.priority, other.seq) < key)
+
+    def _schedule_position_updates(self) -> None:
+        """Wysyła oczekującym ich aktualne pozycje (w tle)."""
+        if self.on_position is None or not self._waiting:
+            return
+
+        ordered = sorted(self._waiting.values(), key=lambda j: (j.priority, j.seq))
+
+        async def notify() -> None:
+            for position, job in enumerate(ordered, start=1):
+                try:
+                    await self.on_position(job, position)
+                except Exception as e:
+                    logger.warning(f"Błąd powiadomienia o pozycji {job.session_id}: {e}")
+
+        asyncio.create_task(notify())
+
+    async def _worker(self, worker_id: int) -> None:
+        """Pobiera zadania z kolejki i wykonuje je po jednym."""
+        while True:
+            _, _, job = await self._queue.get()
+            self._waiting.pop(job.session_id, None)
+            self._wait_seconds += time.monotonic() - job.enqueued_at
+            self._schedule_position_updates()
+
+            self._running += 1
+            try:
+                await self.runner(job)
+                self._completed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._failed += 1
+                logger.error(f"Worker {worker_id}: błąd analizy {job.session_id}: {e}")
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+    def estimate_wait_seconds(self) -> int:
+        """Szacowany czas oczekiwania dla nowego zgłoszenia (Retry-After)."""
+        started = self._completed + self._failed + self._running
+        avg_wait = self._wait_seconds / started if started else 60.0
+        return max(1, int(avg_wait))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki schedulera."""
+        started = self._completed + self._failed + self._running
+        return {
+            "workers": self.max_workers,
+            "running": self._running,
+            "queued": len(self._waiting),
+            "max_queue_size": self.max_queue_size,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "avg_wait_seconds": round(self._wait_seconds / started, 1) if started else 0,
+        }
+
+    async def shutdown(self) -> None:
+        """Zatrzymuje workery (przy zamykaniu aplikacji)."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Singleton instancja
+_job_scheduler: Optional[JobScheduler] = None
+
+
+def get_job_scheduler(
+    runner: Optional[JobRunner] = None,
+    on_position: Optional[PositionCallback] = None
+) -> JobScheduler:
+    """
+    Zwraca singleton JobScheduler.
+
+    Args:
+        runner: Runner zadań (wymagany przy pierwszym wywołaniu)
+        on_position: Callback pozycji w kolejce (przy pierwszym wywołaniu)
+    """
+    global _job_scheduler
+    if _job_scheduler is None:
+        if runner is None:
+            raise RuntimeError("JobScheduler nie został zainicjalizowany (brak runnera)")
+        _job_scheduler = JobScheduler(runner, on_position=on_position)
+    return _job_scheduler
@@ -3,35 +3,60 @@ FastAPI Routes - endpointy API z SSE streaming.
 """
 import uuid
 import asyncio
+import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi import APIRouter, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from api.streaming import (
     create_session,
     get_session,
+    save_session,
+    delete_session,
     event_generator,
     create_emit_callback,
     emit_thinking,
+    emit_progress,
     emit_done,
     emit_error,
+    emit_queue_position,
 )
+from api.jobs import AnalysisJob, QueueFullError, get_job_scheduler
 from services.graph import run_mvp_analysis
-from core.config import REGIONS, COUNTRIES, SOURCES
+from services.executor import get_stage_stats, run_blocking
+from services.llm import get_llm_stats
+from services.gemini_limiter import get_limiter_stats
+from agents.context_packer import get_prompt_stats
+from services.context_cache import get_context_cache_stats
+from services.tracing import start_trace
+from services.registry import get_registry_stats
+from services.analysis_cache import CachedAnalysis, get_analysis_cache
+from api.session_store import get_session_store
+from core.config import settings, REGIONS, COUNTRIES, SOURCES
 from schemas.schemas import AnalyzeRequest, AnalyzeResponse, SessionStatusResponse
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api", tags=["analysis"])
 
 
 # === ENDPOINTS ===
 
 @router.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
+async def analyze(request: AnalyzeRequest):
     """
-    Rozpoczyna analizę geopolityczną asynchronicznie.
+    Dodaje analizę geopolityczną do kolejki.
+
+    Liczba równoległych analiz jest ograniczona (settings.analysis_max_workers);
+    oczekujące dostają swoją pozycję jako eventy `progress` z polem
+    `queue_position`. Przy pełnej kolejce zwraca 429 z nagłówkiem Retry-After.
+
+    Identyczne lub bardzo podobne zapytanie z tą samą konfiguracją jest
+    odtwarzane z cache analiz (bez kolejki); force_refresh wymusza
+    ponowne liczenie.
 
     Zwraca session_id do użycia z GET /api/stream/{session_id}
     """
@@ -51,54 +76,170 @@ async def analyze(request: AnalyzeRequest, background_tasks: BackgroundTasks):
         "scenarios": ["positive", "negative"],
     }
 
+    # Cache analiz - trafienie nie zajmuje miejsca w kolejce
+    if settings.analysis_cache_enabled and not request.force_refresh:
+        cached = await _lookup_cached_analysis(request.query, config)
+        if cached is not None:
+            await create_session(session_id, request.query, config)
+            await _replay_cached_analysis(session_id, cached)
+            return AnalyzeResponse(
+                session_id=session_id,
+                status="completed",
+                message="Wynik z cache analiz"
+            )
+
+    scheduler = _get_scheduler()
+    if scheduler.is_full:
+        raise HTTPException(
+            status_code=429,
+            detail="Zbyt wiele analiz w kolejce, spróbuj ponownie później",
+            headers={"Retry-After": str(scheduler.estimate_wait_seconds())}
+        )
+
     # Stwórz sesję
-    create_session(session_id, request.query, config)
-
-    # Uruchom analizę w tle
-    background_tasks.add_task(
-        run_analysis_background,
-        session_id,
-        request.query,
-        config
+    session = await create_session(session_id, request.query, config)
+    session.status = "queued"
+    await save_session(session)
+
+    # Dodaj do kolejki (submit jest synchroniczne - brak wyścigu z is_full)
+    try:
+        position = scheduler.submit(AnalysisJob(
+            session_id=session_id,
+            query=request.query,
+            config=config,
+            priority=settings.analysis_request_priority
+        ))
+    except QueueFullError as e:
+        await delete_session(session_id)
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(scheduler.estimate_wait_seconds())}
+        )
+
+    return AnalyzeResponse(
+        session_id=session_id,
+        queue_position=position,
+        message=f"Analiza w kolejce (pozycja {position})"
+    )
+
+
+async def _run_job(job: AnalysisJob):
+    """Runner schedulera - uruchamia analizę zadania z kolejki."""
+    await run_analysis_background(job.session_id, job.query, job.config)
+
+
+async def _notify_position(job: AnalysisJob, position: int):
+    """Informuje oczekującą sesję o jej pozycji w kolejce."""
+    await emit_queue_position(create_emit_callback(job.session_id), position)
+
+
+def _get_scheduler():
+    return get_job_scheduler(runner=_run_job, on_position=_notify_position)
+
+
+async def _lookup_cached_analysis(query: str, config: dict) -> Optional[CachedAnalysis]:
+    """Szuka wyniku w cache analiz (błąd cache = brak trafienia)."""
+    try:
+        return await run_blocking("analysis_cache.lookup", get_analysis_cache().lookup, query, config)
+    except Exception as e:
+        logger.warning(f"Błąd odczytu cache analiz: {e}")
+        return None
+
+
+async def _replay_cached_analysis(session_id: str, cached: CachedAnalysis):
+    """Odtwarza zapisane eventy i wynik w nowej sesji."""
+    emit = create_emit_callback(session_id)
+    session = await get_session(session_id)
+
+    await emit_progress(
+        emit, "system",
+        f"Wynik z cache analiz (podobieństwo zapytania {cached.similarity:.2f})"
     )
+    for event in cached.events:
+        await emit(dict(event))
+
+    session.result = cached.result
+    session.status = "completed"
+    await save_session(session)
 
-    return AnalyzeResponse(session_id=session_id)
+    await emit_done(emit, session_id, cached.result)
+
+
+async def _store_cached_analysis(session, data_version: Optional[str]):
+    """Zapisuje wynik zakończonej analizy w cache analiz."""
+    events = [event for _, event in session.events.read_after(0)]
+    try:
+        await run_blocking(
+            "analysis_cache.store",
+            get_analysis_cache().store,
+            session.query, session.config, events, session.result, data_version
+        )
+    except Exception as e:
+        logger.warning(f"Błąd zapisu cache analiz: {e}")
 
 
 async def run_analysis_background(session_id: str, query: str, config: dict):
     """
-    Background task wykonujący analizę.
+    Wykonuje analizę (wywoływane przez worker kolejki).
     Emituje eventy przez SSE.
     """
     emit = create_emit_callback(session_id)
-    session = get_session(session_id)
+    session = await get_session(session_id)
 
     if not session:
         return
 
-    try:
-        session.status = "running"
+    # Spany analizy (także w wątkach run_blocking) trafiają do eventów progress
+    with start_trace(session_id):
+        # Wersja danych z początku analizy - wynik liczony na zmienionej bazie nie trafi do cache
+        data_version = None
+        if settings.analysis_cache_enabled:
+            try:
+                data_version = await run_blocking(
+                    "analysis_cache.version", get_analysis_cache().current_data_version
+                )
+            except Exception as e:
+                logger.warning(f"Cache analiz niedostępny: {e}")
 
-        # Uruchom uproszczony flow MVP
-        result = await run_mvp_analysis(query, config, emit)
+        try:
+            session.status = "running"
+            await save_session(session)
 
-        # Zapisz wynik
-        session.result = result
-        session.status = "completed"
+            # Uruchom uproszczony flow MVP
+            result = await run_mvp_analysis(query, config, emit)
 
-        await emit_done(emit, session_id, result)
+            # Zapisz wynik
+            session.result = result
+            session.status = "completed"
+            await save_session(session)
 
-    except Exception as e:
-        session.status = "error"
-        await emit_error(emit, str(e))
-        raise
+            if data_version is not None:
+                await _store_cached_analysis(session, data_version)
+
+            await emit_done(emit, session_id, result)
+
+        except Exception as e:
+            session.status = "error"
+            await save_session(session)
+            await emit_error(emit, str(e))
+            raise
 
 
 @router.get("/stream/{session_id}")
-async def stream(session_id: str):
+async def stream(
+    session_id: str,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
     """
     SSE endpoint - streamuje eventy z analizy w czasie rzeczywistym.
 
+    Każdy event ma pole SSE `id:`. Po zerwaniu połączenia EventSource
+    wznawia je z nagłówkiem Last-Event-ID i dostaje tylko brakujące eventy
+    (alternatywnie parametr ?last_event_id=N). Wielu subskrybentów może
+    czytać tę samą sesję równolegle.
+
     Użycie w JavaScript:
     ```js
     const eventSource = new EventSource(`/api/stream/${sessionId}`);
@@ -118,12 +259,16 @@ async def stream(session_id: str):
     - done: Zakończono
     - heartbeat: Keep-alive (co 30s)
     """
-    session = get_session(session_id)
+    session = await get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Sesja nie znaleziona")
 
+    resume_from = last_event_id or 0
+    if last_event_id_header and last_event_id_header.strip().isdigit():
+        resume_from = max(resume_from, int(last_event_id_header.strip()))
+
     return StreamingResponse(
-        event_generator(session_id),
+        event_generator(session_id, last_event_id=resume_from),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -137,7 +282,7 @@ async def stream(session_id: str):
 @router.get("/session/{session_id}", response_model=SessionStatusResponse)
 async def get_session_status(session_id: str):
     """Pobiera status sesji."""
-    session = get_session(session_id)
+    session = await get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Sesja nie znaleziona")
 
@@ -152,7 +297,7 @@ async def get_session_status(session_id: str):
 @router.get("/session/{session_id}/result")
 async def get_session_result(session_id: str):
     """Pobiera wynik analizy (po zakończeniu)."""
-    session = get_session(session_id)
+    session = await get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Sesja nie znaleziona")
 
@@ -171,6 +316,22 @@ async def get_session_result(session_id: str):
 
 # === ENDPOINTS POMOCNICZE ===
 
+@router.get("/stats")
+async def get_stats():
+    """Statystyki runtime: etapy blokujące, kolejka analiz, cache i magazyn sesji."""
+    return {
+        "stages": get_stage_stats(),
+        "jobs": _get_scheduler().get_stats(),
+        "analysis_cache": get_analysis_cache().get_stats() if settings.analysis_cache_enabled else None,
+        "llm": get_llm_stats(),
+        "construction": get_registry_stats(),
+        "gemini": get_limiter_stats(),
+        "prompts": get_prompt_stats(),
+        "context_cache": get_context_cache_stats(),
+        "sessions": get_session_store().get_stats(),
+    }
+
+
 @router.get("/regions")
 async def list_regions():
     """Lista dostępnych regionów."""
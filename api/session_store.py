@@ -0,0 +1,440 @@
+"""
+Magazyn sesji analizy (AnalysisSession).
+
+Backendy:
+- InMemorySessionStore - LRU + TTL z limitem liczby sesji i pamięci (domyślny)
+- RedisSessionStore - stan sesji i dziennik eventów w Redis (współdzielone
+  między workerami uvicorn), żywe obiekty sesji trzymane lokalnie
+
+Backend wybierany przez settings.session_store_backend ("memory" | "redis").
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+import json
+import logging
+import threading
+import time
+
+from core.config import settings
+from api.event_log import EventLog
+from services.executor import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AnalysisSession:
+    """Sesja analizy z dziennikiem eventów."""
+    session_id: str
+    query: str
+    config: Dict[str, Any]
+    events: EventLog = field(default_factory=EventLog)
+    status: str = "pending"
+    created_at: datetime = field(default_factory=datetime.now)
+    result: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_active(self) -> bool:
+        """Czy analiza jeszcze trwa (takich sesji nie usuwamy przy LRU)."""
+        return self.status in ("pending", "queued", "running")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializuje stan sesji (bez dziennika eventów)."""
+        return {
+            "session_id": self.session_id,
+            "query": self.query,
+            "config": self.config,
+            "status": self.status,
+            "created_at": self.created_at.isoformat(),
+            "result": self.result,
+        }
+
+    @classmethod
+    def from_dict(
+        cls,
+        data: Dict[str, Any],
+        events: Optional[EventLog] = None
+    ) -> "AnalysisSession":
+        """Odtwarza sesję ze stanu (domyślnie z pustym dziennikiem eventów)."""
+        return cls(
+            session_id=data["session_id"],
+            query=data["query"],
+            config=data.get("config") or {},
+            status=data.get("status", "pending"),
+            created_at=datetime.fromisoformat(data["created_at"]),
+            result=data.get("result"),
+            events=events if events is not None else EventLog(),
+        )
+
+
+def estimate_session_size(session: AnalysisSession) -> int:
+    """
+    Domyślny hook rozmiaru: przybliżona liczba bajtów sesji.
+
+    Liczy serializowany stan (wynik z treścią dokumentów dominuje)
+    plus dziennik eventów.
+    """
+    state = json.dumps(session.to_dict(), ensure_ascii=False, default=str)
+    return len(state.encode("utf-8")) + session.events.size_bytes
+
+
+class SessionStore(ABC):
+    """Interfejs magazynu sesji."""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        """Pobiera sesję (None jeśli nie istnieje lub wygasła)."""
+
+    @abstractmethod
+    def save(self, session: AnalysisSession) -> None:
+        """Zapisuje nową sesję lub zmiany stanu istniejącej (status, wynik)."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Usuwa sesję. Zwraca True jeśli istniała."""
+
+    @abstractmethod
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki magazynu."""
+
+    # Wersje async dla event loop - domyślnie wołają metody synchroniczne
+    # (backend w pamięci nie blokuje); backendy sieciowe je nadpisują
+
+    async def aget(self, session_id: str) -> Optional[AnalysisSession]:
+        """Async get()."""
+        return self.get(session_id)
+
+    async def asave(self, session: AnalysisSession) -> None:
+        """Async save()."""
+        self.save(session)
+
+    async def adelete(self, session_id: str) -> bool:
+        """Async delete()."""
+        return self.delete(session_id)
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Sesje w pamięci procesu z eviction LRU + TTL.
+
+    - TTL liczony od ostatniego dostępu (emitowanie eventów odświeża sesję)
+    - po przekroczeniu max_sessions lub max_bytes usuwane są najdawniej
+      używane sesje zakończone; aktywne analizy wygasają tylko przez TTL
+    - rozmiar sesji liczony hookiem size_of przy save() i ponownie, gdy
+      urósł jej dziennik eventów (get(), eviction, statystyki)
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        size_of: Callable[[AnalysisSession], int] = estimate_session_size,
+        on_evict: Optional[Callable[[AnalysisSession], None]] = None
+    ):
+        """
+        Args:
+            max_sessions: Maksymalna liczba sesji (domyślnie settings.session_max_count)
+            ttl_seconds: Czas życia od ostatniego dostępu (domyślnie settings.session_ttl_seconds)
+            max_bytes: Limit pamięci (domyślnie settings.session_max_memory_mb)
+            size_of: Hook liczący rozmiar sesji w bajtach
+            on_evict: Opcjonalny callback wywoływany dla usuniętej sesji
+        """
+        self.max_sessions = max_sessions or settings.session_max_count
+        self.ttl_seconds = ttl_seconds or settings.session_ttl_seconds
+        self.max_bytes = max_bytes or settings.session_max_memory_mb * 1024 * 1024
+        self.size_of = size_of
+        self.on_evict = on_evict
+
+        # session_id -> (sesja, ostatni dostęp, rozmiar, policzony rozmiar dziennika)
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+
+            now = time.monotonic()
+            if now - entry[1] > self.ttl_seconds:
+                self._remove(session_id)
+                self._expirations += 1
+                return None
+
+            entry[1] = now
+            self._sessions.move_to_end(session_id)
+            # Emitowanie eventu pobiera sesję - tu widać przyrost dziennika
+            if self._refresh_size(entry) and self._over_limit():
+                self._evict()
+            return entry[0]
+
+    def save(self, session: AnalysisSession) -> None:
+        size = self.size_of(session)
+
+        with self._lock:
+            old = self._sessions.pop(session.session_id, None)
+            if old is not None:
+                self._total_bytes -= old[2]
+
+            self._sessions[session.session_id] = [session, time.monotonic(), size, session.events.size_bytes]
+            self._total_bytes += size
+            self._evict()
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._remove(session_id) is not None
+
+    def _remove(self, session_id: str) -> Optional[AnalysisSession]:
+        """Usuwa wpis (wywoływane pod lockiem)."""
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return None
+
+        self._total_bytes -= entry[2]
+        if self.on_evict is not None:
+            try:
+                self.on_evict(entry[0])
+            except Exception as e:
+                logger.warning(f"Błąd on_evict dla sesji {session_id}: {e}")
+        return entry[0]
+
+    def _refresh_size(self, entry: list) -> bool:
+        """
+        Przelicza rozmiar sesji, jeśli jej dziennik eventów urósł (pod lockiem).
+
+        Returns:
+            True jeśli rozmiar został przeliczony
+        """
+        session = entry[0]
+        if session.events.size_bytes == entry[3]:
+            return False
+
+        size = self.size_of(session)
+        self._total_bytes += size - entry[2]
+        entry[2] = size
+        entry[3] = session.events.size_bytes
+        return True
+
+    def _over_limit(self) -> bool:
+        return len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+
+    def _evict(self) -> None:
+        """Usuwa wygasłe, potem najdawniej używane zakończone sesje ponad limit."""
+        now = time.monotonic()
+        expired = [
+            sid for sid, entry in self._sessions.items()
+            if now - entry[1] > self.ttl_seconds
+        ]
+        for sid in expired:
+            self._remove(sid)
+        self._expirations += len(expired)
+
+        for entry in self._sessions.values():
+            self._refresh_size(entry)
+
+        if not self._over_limit():
+            return
+
+        # Od najdawniej używanych; aktywne analizy pomijamy
+        for sid in list(self._sessions.keys()):
+            if not self._over_limit():
+                break
+            if self._sessions[sid][0].is_active:
+                continue
+            self._remove(sid)
+            self._evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            for entry in self._sessions.values():
+                self._refresh_size(entry)
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "active": sum(1 for entry in self._sessions.values() if entry[0].is_active),
+                "max_sessions": self.max_sessions,
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+            }
+
+
+class RedisSessionStore(SessionStore):
+    """
+    Stan sesji w Redis, współdzielony między workerami.
+
+    Klient jest wstrzykiwany (redis.Redis lub zgodny, np. fakeredis.FakeRedis
+    w testach lokalnych). Używane komendy: get, set(ex=), delete, rpush,
+    lrange, expire.
+
+    Klient jest synchroniczny, więc z event loop wołane są tylko wersje
+    async (aget/asave/adelete, przez run_blocking). Eventy trafiają do Redis
+    przez jednowątkowy executor - append() nie blokuje pętli, a kolejność
+    na liście (ID eventu = pozycja) jest zachowana.
+
+    Sesje utworzone w tym procesie są trzymane lokalnie (InMemorySessionStore),
+    a każdy event jest dopisywany do listy w Redis. Inny worker dostaje
+    z Redis stan sesji (status, wynik) oraz dziennik eventów, który
+    dociąga nowe eventy w trakcie streamowania.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        ttl_seconds: Optional[int] = None,
+        prefix: str = "sedno:session:",
+        local_store: Optional[InMemorySessionStore] = None
+    ):
+        """
+        Args:
+            client: Klient Redis (synchroniczny)
+            ttl_seconds: Czas życia klucza (domyślnie settings.session_ttl_seconds)
+            prefix: Prefiks kluczy
+            local_store: Lokalny magazyn żywych sesji
+        """
+        self.client = client
+        self.ttl_seconds = int(ttl_seconds or settings.session_ttl_seconds)
+        self.prefix = prefix
+        self.local = local_store or InMemorySessionStore(ttl_seconds=self.ttl_seconds)
+        self._event_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="redis-events")
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def _events_key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}:events"
+
+    def _append_event(self, session_id: str, event_id: int, event: Dict[str, Any]) -> None:
+        """Kolejkuje kopię eventu lokalnej sesji do Redis (bez blokowania wołającego)."""
+        payload = json.dumps(event, ensure_ascii=False, default=str)
+        future = self._event_writer.submit(self._push_event, self._events_key(session_id), payload)
+        future.add_done_callback(lambda f, sid=session_id, eid=event_id: self._log_push_error(f, sid, eid))
+
+    def _push_event(self, key: str, payload: str) -> None:
+        self.client.rpush(key, payload)
+        self.client.expire(key, self.ttl_seconds)
+
+    @staticmethod
+    def _log_push_error(future: Future, session_id: str, event_id: int) -> None:
+        error = future.exception()
+        if error is not None:
+            logger.warning(f"Błąd zapisu eventu {event_id} sesji {session_id} do Redis: {error}")
+
+    def flush(self) -> None:
+        """Czeka, aż zakolejkowane eventy trafią do Redis."""
+        self._event_writer.submit(lambda: None).result()
+
+    def _fetch_events(self, session_id: str, after_id: int) -> List[Dict[str, Any]]:
+        """Pobiera z Redis eventy o ID > after_id (ID = pozycja na liście + 1)."""
+        raw_events = self.client.lrange(self._events_key(session_id), after_id, -1)
+        return [
+            json.loads(raw.decode("utf-8") if isinstance(raw, bytes) else raw)
+            for raw in raw_events
+        ]
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        session = self.local.get(session_id)
+        if session is not None:
+            return session
+        return self._load_remote(session_id)
+
+    async def aget(self, session_id: str) -> Optional[AnalysisSession]:
+        session = self.local.get(session_id)
+        if session is not None:
+            return session
+        return await run_blocking("session.redis", self._load_remote, session_id)
+
+    def _load_remote(self, session_id: str) -> Optional[AnalysisSession]:
+        """Odtwarza sesję innego workera ze stanu w Redis."""
+        raw = self.client.get(self._key(session_id))
+        if raw is None:
+            return None
+
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+
+        # Sesja z innego workera - dziennik eventów dociągany z Redis
+        events = EventLog(fetch_remote=lambda after_id: self._fetch_events(session_id, after_id))
+        return AnalysisSession.from_dict(json.loads(raw), events=events)
+
+    def save(self, session: AnalysisSession) -> None:
+        self._write_state(self._save_local(session))
+
+    async def asave(self, session: AnalysisSession) -> None:
+        await run_blocking("session.redis", self._write_state, self._save_local(session))
+
+    def _save_local(self, session: AnalysisSession) -> AnalysisSession:
+        """Podpina kopiowanie eventów do Redis i zapisuje sesję lokalnie."""
+        if session.events.on_append is None and session.events.fetch_remote is None:
+            session.events.on_append = (
+                lambda event_id, event, sid=session.session_id: self._append_event(sid, event_id, event)
+            )
+        self.local.save(session)
+        return session
+
+    def _write_state(self, session: AnalysisSession) -> None:
+        self.client.set(
+            self._key(session.session_id),
+            json.dumps(session.to_dict(), ensure_ascii=False, default=str),
+            ex=self.ttl_seconds
+        )
+
+    def delete(self, session_id: str) -> bool:
+        local_deleted = self.local.delete(session_id)
+        return self._delete_remote(session_id) or local_deleted
+
+    async def adelete(self, session_id: str) -> bool:
+        local_deleted = self.local.delete(session_id)
+        return await run_blocking("session.redis", self._delete_remote, session_id) or local_deleted
+
+    def _delete_remote(self, session_id: str) -> bool:
+        self.client.delete(self._events_key(session_id))
+        return bool(self.client.delete(self._key(session_id)))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "redis",
+            "ttl_seconds": self.ttl_seconds,
+            "local": self.local.get_stats(),
+        }
+
+
+# Singleton instancja
+_session_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    """Zwraca singleton magazynu sesji (backend z settings)."""
+    global _session_store
+    if _session_store is None:
+        if settings.session_store_backend == "redis":
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "session_store_backend=redis wymaga pakietu 'redis' (pip install redis)"
+                ) from e
+            _session_store = RedisSessionStore(redis.Redis.from_url(settings.redis_url))
+        else:
+            _session_store = InMemorySessionStore()
+        logger.info(f"Magazyn sesji: {settings.session_store_backend}")
+    return _session_store
+
+
+def set_session_store(store: SessionStore) -> None:
+    """Podmienia magazyn sesji (np. RedisSessionStore z własnym klientem)."""
+    global _session_store
+    _session_store = store
@@ -1,16 +1,18 @@
 """
 SSE Streaming - real-time eventy z agentów do frontendu.
 
-Sesje analizy przechowywane in-memory (dla demo).
-Produkcyjnie: Redis lub podobne.
+Sesje analizy przechowywane w SessionStore (api/session_store.py):
+in-memory LRU+TTL lub Redis.
 """
 import asyncio
 import json
 from typing import AsyncGenerator, Dict, Any, Callable, Optional
 from datetime import datetime
-from dataclasses import dataclass, field
 from enum import Enum
 
+from api.session_store import AnalysisSession, get_session_store
+from services.tracing import drain_timing, span
+
 
 class EventType(str, Enum):
     """Typy eventów SSE."""
@@ -18,10 +20,13 @@ class EventType(str, Enum):
     DOCUMENT = "document"      # Znaleziono dokumenty
     PROGRESS = "progress"      # Postęp pracy
     REPORT = "report"          # Fragment raportu
+    REPORT_DELTA = "report_delta"      # Przyrost tekstu raportu (streaming tokenów)
     SCENARIO = "scenario"      # Scenariusz końcowy
+    SCENARIO_DELTA = "scenario_delta"  # Przyrost tekstu scenariusza (streaming tokenów)
     ERROR = "error"            # Błąd
     DONE = "done"              # Zakończono
     HEARTBEAT = "heartbeat"    # Keep-alive
+    TELEMETRY = "telemetry"    # Rozmiar promptu (tokeny) i inne metryki etapu
     # === NOWE: Rozszerzone Chain of Thought ===
     REASONING = "reasoning"    # Szczegółowy krok rozumowania z wyjaśnialnością
     CORRELATION = "correlation" # Zidentyfikowana korelacja między faktami
@@ -30,44 +35,30 @@ class EventType(str, Enum):
     INFERENCE = "inference"    # Wnioskowanie: fakt historyczny -> przewidywanie
 
 
-@dataclass
-class AnalysisSession:
-    """Sesja analizy z kolejką eventów."""
-    session_id: str
-    query: str
-    config: Dict[str, Any]
-    events: asyncio.Queue = field(default_factory=asyncio.Queue)
-    status: str = "pending"
-    created_at: datetime = field(default_factory=datetime.now)
-    result: Optional[Dict[str, Any]] = None
-
-
-# In-memory store sesji
-_sessions: Dict[str, AnalysisSession] = {}
-
-
-def create_session(session_id: str, query: str, config: Dict[str, Any]) -> AnalysisSession:
+async def create_session(session_id: str, query: str, config: Dict[str, Any]) -> AnalysisSession:
     """Tworzy nową sesję analizy."""
     session = AnalysisSession(
         session_id=session_id,
         query=query,
         config=config
     )
-    _sessions[session_id] = session
+    await get_session_store().asave(session)
     return session
 
 
-def get_session(session_id: str) -> Optional[AnalysisSession]:
+async def get_session(session_id: str) -> Optional[AnalysisSession]:
     """Pobiera sesję po ID."""
-    return _sessions.get(session_id)
+    return await get_session_store().aget(session_id)
+
+
+async def save_session(session: AnalysisSession) -> None:
+    """Zapisuje zmiany stanu sesji (status, wynik) w magazynie."""
+    await get_session_store().asave(session)
 
 
-def delete_session(session_id: str) -> bool:
+async def delete_session(session_id: str) -> bool:
     """Usuwa sesję."""
-    if session_id in _sessions:
-        del _sessions[session_id]
-        return True
-    return False
+    return await get_session_store().adelete(session_id)
 
 
 async def emit_event(session_id: str, event: Dict[str, Any]) -> bool:
@@ -83,63 +74,94 @@ async def emit_event(session_id: str, event: Dict[str, Any]) -> bool:
         ...dodatkowe pola zależne od typu
     }
 
+    Eventy progress dostają pole `timing` - spany analizy od poprzedniego
+    eventu progress (gdy settings.tracing_enabled).
+
     Returns:
         True jeśli event został dodany, False jeśli sesja nie istnieje
     """
-    session = get_session(session_id)
-    if not session:
-        return False
+    with span("sse.emit", type=str(event.get("type"))):
+        session = await get_session(session_id)
+        if not session:
+            return False
+
+        # Dodaj timestamp jeśli brak
+        if "timestamp" not in event:
+            event["timestamp"] = datetime.now().isoformat()
+
+        if event.get("type") == EventType.PROGRESS and "timing" not in event:
+            timing = drain_timing()
+            if timing is not None:
+                event["timing"] = timing
+
+        session.events.append(event)
+        return True
 
-    # Dodaj timestamp jeśli brak
-    if "timestamp" not in event:
-        event["timestamp"] = datetime.now().isoformat()
 
-    await session.events.put(event)
-    return True
+def _format_sse(event: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    """Formatuje event jako ramkę SSE (z polem id: dla eventów z dziennika)."""
+    data = f"data: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+    if event_id is None:
+        return data
+    return f"id: {event_id}\n{data}"
 
 
-async def event_generator(session_id: str, timeout: float = 30.0) -> AsyncGenerator[str, None]:
+async def event_generator(
+    session_id: str,
+    last_event_id: int = 0,
+    timeout: float = 30.0
+) -> AsyncGenerator[str, None]:
     """
     Generator SSE dla danej sesji.
     Używany przez endpoint GET /api/stream/{session_id}
 
+    Czyta dziennik eventów sesji od last_event_id - ponowne połączenie
+    (nagłówek Last-Event-ID) dostaje tylko brakujące eventy, a każdy
+    subskrybent ma własną pozycję w dzienniku.
+
     Args:
         session_id: ID sesji
+        last_event_id: ID ostatniego odebranego eventu (0 = od początku)
         timeout: Timeout w sekundach między eventami (heartbeat)
 
     Yields:
-        Stringi w formacie SSE: "data: {...}\n\n"
+        Stringi w formacie SSE: "id: N\ndata: {...}\n\n"
     """
-    session = get_session(session_id)
+    session = await get_session(session_id)
     if not session:
-        yield f"data: {json.dumps({'type': 'error', 'content': 'Sesja nie znaleziona'})}\n\n"
+        yield _format_sse({'type': 'error', 'content': 'Sesja nie znaleziona'})
         return
 
+    # Po zerwaniu połączenia przeglądarka wznowi je po 3 s z Last-Event-ID
+    yield "retry: 3000\n\n"
+
+    position = last_event_id
     try:
         while True:
-            try:
-                # Czekaj na event z timeout
-                event = await asyncio.wait_for(
-                    session.events.get(),
-                    timeout=timeout
-                )
+            # Reconnect z Last-Event-ID na/po evencie kończącym - nic więcej nie przyjdzie
+            if session.events.finished and position >= session.events.last_id:
+                return
 
-                # Serializuj i wyślij
-                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            events = await session.events.wait_for_events(position, timeout=timeout)
+
+            if not events:
+                # Heartbeat co timeout sekund
+                yield _format_sse({'type': 'heartbeat'})
+                continue
+
+            for event_id, event in events:
+                yield _format_sse(event, event_id)
+                position = event_id
 
                 # Zakończ jeśli done lub error
                 if event.get("type") in (EventType.DONE, EventType.ERROR, "done", "error"):
-                    break
-
-            except asyncio.TimeoutError:
-                # Heartbeat co timeout sekund
-                yield f"data: {json.dumps({'type': 'heartbeat'})}\n\n"
+                    return
 
     except asyncio.CancelledError:
         # Klient rozłączył się
         pass
     except Exception as e:
-        yield f"data: {json.dumps({'type': 'error', 'content': str(e)})}\n\n"
+        yield _format_sse({'type': 'error', 'content': str(e)})
 
 
 def create_emit_callback(session_id: str) -> Callable:
@@ -202,6 +224,16 @@ async def emit_progress(emit: Callable, agent: str, status: str, progress: float
     await emit(event)
 
 
+async def emit_queue_position(emit: Callable, position: int):
+    """Helper: emituj pozycję sesji w kolejce analiz."""
+    await emit({
+        "type": EventType.PROGRESS,
+        "agent": "system",
+        "content": f"Oczekiwanie w kolejce (pozycja {position})",
+        "queue_position": position
+    })
+
+
 async def emit_report_section(emit: Callable, section: str, content: str):
     """Helper: emituj sekcję raportu."""
     await emit({
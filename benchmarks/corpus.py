@@ -0,0 +1,136 @@
+"""
+Syntetyczny korpus dokumentów i zapytań dla benchmarków.
+
+Dokumenty są generowane deterministycznie z ziarna: każdy należy do
+jednego tematu, a słowa tematu występują w nim częściej niż słowa ogólne -
+wyszukiwanie wektorowe (atrapa embeddingów haszuje słowa) i BM25 mają
+więc realny sygnał trafności, a rozmiary chunków odpowiadają produkcji.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import random
+
+from core.config import COUNTRIES, REGIONS, SOURCES
+from services.data_pipeline.scraper import ScrapedDocument
+
+# Słowa wspólne dla wszystkich tematów
+COMMON_WORDS = [
+    "państwa", "polityka", "rząd", "ministerstwo", "współpraca", "rozwój",
+    "strategia", "region", "bezpieczeństwo", "gospodarka", "partnerzy",
+    "decyzja", "porozumienie", "negocjacje", "reforma", "budżet", "analiza",
+    "ryzyko", "stabilność", "inwestycje", "rynek", "sojusznicy", "konflikt",
+    "sankcje", "eksport", "import", "regulacje", "deklaracja", "szczyt",
+    "komunikat", "raport", "prognoza", "scenariusz", "wpływ", "kryzys",
+]
+
+# Tematy dokumentów i zapytań: słowa kluczowe tematu
+TOPICS: Dict[str, List[str]] = {
+    "energia": ["gaz", "ropa", "LNG", "rurociąg", "OZE", "atom", "magazyny", "ceny", "dywersyfikacja", "elektrownie"],
+    "obronność": ["armia", "NATO", "wschodnia", "flanka", "zbrojenia", "amunicja", "artyleria", "ćwiczenia", "odstraszanie", "brygada"],
+    "handel": ["cła", "łańcuchy", "dostaw", "półprzewodniki", "WTO", "nadwyżka", "deficyt", "kontenery", "porty", "taryfy"],
+    "technologie": ["AI", "chipy", "cyberbezpieczeństwo", "chmura", "dane", "5G", "satelity", "startupy", "patenty", "kwantowe"],
+    "dyplomacja": ["ambasador", "wizyta", "traktat", "ONZ", "mediacja", "rozejm", "delegacja", "konsultacje", "memorandum", "nota"],
+    "finanse": ["inflacja", "stopy", "obligacje", "euro", "dolar", "rezerwy", "kredyt", "EBC", "Fed", "deficyt"],
+}
+
+DOCUMENT_TYPES = ["article", "report", "statement"]
+
+
+@dataclass
+class BenchmarkQuery:
+    """Zapytanie sesji analizy z konfiguracją (jak z API)."""
+
+    query: str
+    topic: str
+    config: Dict[str, Any]
+
+
+def _topic_text(rng: random.Random, topic: str, words: int, topic_ratio: float = 0.35) -> str:
+    """Tekst z akapitami; topic_ratio słów pochodzi z tematu."""
+    keywords = TOPICS[topic]
+    paragraphs = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(40, 120))
+        tokens = [
+            rng.choice(keywords) if rng.random() < topic_ratio else rng.choice(COMMON_WORDS)
+            for _ in range(length)
+        ]
+        sentences = []
+        for start in range(0, len(tokens), 12):
+            sentence = " ".join(tokens[start:start + 12])
+            sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        paragraphs.append(" ".join(sentences))
+        remaining -= length
+    return "\n\n".join(paragraphs)
+
+
+def generate_corpus(
+    n_documents: int,
+    seed: int = 0,
+    min_words: int = 300,
+    max_words: int = 1500
+) -> List[ScrapedDocument]:
+    """
+    Generuje dokumenty w formacie scrapera (do ingest_documents).
+
+    Args:
+        n_documents: Liczba dokumentów
+        seed: Ziarno generatora
+        min_words: Minimalna długość dokumentu (słowa)
+        max_words: Maksymalna długość dokumentu (słowa)
+    """
+    rng = random.Random(seed)
+    sources = sorted(SOURCES)
+    regions = sorted(REGIONS)
+    topics = sorted(TOPICS)
+
+    documents = []
+    for i in range(n_documents):
+        topic = topics[i % len(topics)]
+        region = rng.choice(regions)
+        countries = [c for c in REGIONS[region]["countries"] if c in COUNTRIES]
+        documents.append(ScrapedDocument(
+            url=f"https://bench.example/{topic}/{i}",
+            title=f"{topic.capitalize()}: {' '.join(rng.sample(TOPICS[topic], 3))}",
+            content=_topic_text(rng, topic, rng.randint(min_words, max_words)),
+            source=rng.choice(sources),
+            date=f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            region=region,
+            country=rng.choice(countries) if countries else None,
+            document_type=rng.choice(DOCUMENT_TYPES),
+        ))
+    return documents
+
+
+def generate_queries(n_queries: int, seed: int = 0) -> List[BenchmarkQuery]:
+    """
+    Generuje zapytania sesji analizy (różne tematy, regiony i kraje).
+
+    Args:
+        n_queries: Liczba zapytań
+        seed: Ziarno generatora
+    """
+    rng = random.Random(seed + 1)
+    regions = sorted(REGIONS)
+    countries = sorted(COUNTRIES)
+    topics = sorted(TOPICS)
+
+    queries = []
+    for i in range(n_queries):
+        topic = topics[i % len(topics)]
+        first, second = rng.sample(TOPICS[topic], 2)
+        selected_regions = rng.sample(regions, rng.randint(1, 2))
+        queries.append(BenchmarkQuery(
+            query=(
+                f"Jak zmiany w obszarze {first} wpłyną na {second} "
+                f"w regionie {', '.join(selected_regions)} w ciągu najbliższych lat?"
+            ),
+            topic=topic,
+            config={
+                "regions": selected_regions,
+                "countries": rng.sample(countries, rng.randint(0, 2)),
+                "sectors": ["security", "trade", "diplomacy"],
+            },
+        ))
+    return queries
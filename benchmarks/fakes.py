@@ -0,0 +1,296 @@
+"""
+Deterministyczne atrapy usług zewnętrznych dla benchmarków.
+
+- FakeChatModel - zamiast ChatGoogleGenerativeAI (ainvoke/astream z
+  czasem do pierwszego tokenu i tempem generowania)
+- FakeEmbeddingBackend - zamiast GoogleGenerativeAIEmbeddings, jako backend
+  EmbeddingService (wektory z haszowania słów - podobne teksty są bliskie)
+- FakeDuckDuckGoSearch - zamiast DuckDuckGoSearchRun w WebSearchEngine
+
+Opóźnienia losowane są z rozkładu log-normalnego (mediana + p95).
+Generator jest wyznaczany z ziarna, treści wejścia i numeru jej wystąpienia,
+więc te same wywołania mają te same opóźnienia niezależnie od kolejności
+wykonania przy współbieżnych sesjach.
+"""
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import asyncio
+import hashlib
+import math
+import random
+import threading
+import time
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from services.gemini_limiter import estimate_tokens, get_gemini_limiter
+from services.rag.embedding_backends import EmbeddingBackend
+from .corpus import COMMON_WORDS, TOPICS
+
+# Kwantyl 0.95 rozkładu normalnego
+_Z95 = 1.6449
+
+
+@dataclass
+class LatencyModel:
+    """Rozkład opóźnienia: log-normalny o zadanej medianie i p95 (ms)."""
+
+    median_ms: float
+    p95_ms: Optional[float] = None
+
+    def sample(self, rng: random.Random) -> float:
+        """Losuje opóźnienie w sekundach."""
+        if self.median_ms <= 0:
+            return 0.0
+        if not self.p95_ms or self.p95_ms <= self.median_ms:
+            return self.median_ms / 1000
+        sigma = math.log(self.p95_ms / self.median_ms) / _Z95
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+
+class SeededDraws:
+    """Generatory losowe wyznaczane z ziarna i klucza wywołania."""
+
+    def __init__(self, seed: int, name: str):
+        self.seed = seed
+        self.name = name
+        self._occurrences: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def rng(self, key: str) -> random.Random:
+        """Generator dla kolejnego wystąpienia klucza (np. treści promptu)."""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        with self._lock:
+            occurrence = self._occurrences.get(digest, 0)
+            self._occurrences[digest] = occurrence + 1
+        return random.Random(f"{self.seed}:{self.name}:{digest}:{occurrence}")
+
+
+def _words(rng: random.Random, count: int) -> List[str]:
+    vocabulary = COMMON_WORDS + [w for words in TOPICS.values() for w in words]
+    return [rng.choice(vocabulary) for _ in range(count)]
+
+
+def fake_markdown(rng: random.Random, words: int, sections: int = 4) -> str:
+    """Tekst w markdown z nagłówkami sekcji (jak raporty i scenariusze)."""
+    per_section = max(1, words // sections)
+    parts = []
+    for i in range(1, sections + 1):
+        body = _words(rng, per_section)
+        sentences = [" ".join(body[j:j + 14]).capitalize() + "." for j in range(0, len(body), 14)]
+        parts.append(f"## Sekcja {i}\n\n" + " ".join(sentences))
+    return "\n\n".join(parts)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Model czatu o opóźnieniach Gemini.
+
+    Czas odpowiedzi = czas do pierwszego tokenu (ttft) + output_words /
+    words_per_second. Streaming wysyła fragmenty po chunk_words słów
+    w tym tempie. Wywołania mogą przechodzić przez limiter Gemini,
+    żeby współbieżne sesje konkurowały o te same sloty co w produkcji.
+    """
+
+    seed: int = 0
+    ttft_ms: float = 400.0
+    ttft_p95_ms: float = 1200.0
+    words_per_second: float = 80.0
+    output_words: int = 600
+    chunk_words: int = 8
+    use_limiter: bool = True
+
+    _draws: SeededDraws = PrivateAttr()
+    _calls: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        self._draws = SeededDraws(self.seed, "llm")
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    def _plan(self, messages: List[BaseMessage]) -> tuple:
+        """(ttft w s, fragmenty odpowiedzi) dla wywołania."""
+        self._calls += 1
+        prompt = "\n".join(str(m.content) for m in messages)
+        rng = self._draws.rng(prompt)
+        ttft = LatencyModel(self.ttft_ms, self.ttft_p95_ms).sample(rng)
+        words = fake_markdown(rng, self.output_words).split(" ")
+        chunks = [
+            " ".join(words[i:i + self.chunk_words]) + " "
+            for i in range(0, len(words), self.chunk_words)
+        ]
+        return ttft, chunks
+
+    def _tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(estimate_tokens(str(m.content)) for m in messages) + self.output_words
+
+    def _chunk_delay(self) -> float:
+        return self.chunk_words / self.words_per_second if self.words_per_second > 0 else 0.0
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        def call() -> ChatResult:
+            ttft, chunks = self._plan(messages)
+            time.sleep(ttft + self._chunk_delay() * len(chunks))
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(chunks)))])
+
+        if not self.use_limiter:
+            return call()
+        return get_gemini_limiter("llm").call(call, tokens=self._tokens(messages))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        parts = []
+        async for chunk in self._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            parts.append(chunk.message.content)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(parts)))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        result = self._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        yield ChatGenerationChunk(message=AIMessageChunk(content=result.generations[0].message.content))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        limiter = get_gemini_limiter("llm") if self.use_limiter else None
+        if limiter is not None:
+            await limiter.acquire(self._tokens(messages))
+        try:
+            ttft, chunks = self._plan(messages)
+            await asyncio.sleep(ttft)
+            for i, text in enumerate(chunks):
+                if i:
+                    await asyncio.sleep(self._chunk_delay())
+                yield ChatGenerationChunk(message=AIMessageChunk(content=text))
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+
+class FakeEmbeddingBackend(EmbeddingBackend):
+    """
+    Backend embeddingów z haszowaniem słów (feature hashing).
+
+    Wektor tekstu to znormalizowana suma wektorów bazowych jego słów,
+    więc teksty o wspólnym słownictwie mają wysoki cosinus. Opóźnienie
+    wywołania = opóźnienie bazowe + per_text_ms na tekst.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        dimension: int = 256,
+        seed: int = 0,
+        latency: Optional[LatencyModel] = None,
+        per_text_ms: float = 0.0
+    ):
+        """
+        Args:
+            dimension: Wymiar wektorów
+            seed: Ziarno (haszowanie słów i opóźnienia)
+            latency: Opóźnienie wywołania (domyślnie brak)
+            per_text_ms: Dodatkowe opóźnienie na każdy tekst w batchu
+        """
+        super().__init__(f"hashing-{dimension}")
+        self._dimension = dimension
+        self.seed = seed
+        self.latency = latency or LatencyModel(0)
+        self.per_text_ms = per_text_ms
+        self._draws = SeededDraws(seed, "embedding")
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self._dimension
+        for word in text.lower().split():
+            digest = hashlib.blake2b(f"{self.seed}:{word}".encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self._dimension
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _wait(self, texts: List[str]) -> None:
+        self.calls += 1
+        self.texts += len(texts)
+        delay = self.latency.sample(self._draws.rng("\n".join(texts)))
+        time.sleep(delay + self.per_text_ms * len(texts) / 1000)
+
+    def embed_query(self, text: str) -> List[float]:
+        self._wait([text])
+        return self._vector(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._wait(texts)
+        return [self._vector(t) for t in texts]
+
+
+class FakeDuckDuckGoSearch:
+    """
+    Wyszukiwarka o interfejsie DuckDuckGoSearchRun (api_wrapper.results).
+
+    Wyniki i opóźnienia zależą tylko od zapytania i ziarna.
+    """
+
+    def __init__(self, seed: int = 0, latency: Optional[LatencyModel] = None, snippet_words: int = 40):
+        """
+        Args:
+            seed: Ziarno
+            latency: Opóźnienie wywołania
+            snippet_words: Długość snippetu (słowa)
+        """
+        self.latency = latency or LatencyModel(0)
+        self.snippet_words = snippet_words
+        self._draws = SeededDraws(seed, "web")
+        self.calls = 0
+
+    @property
+    def api_wrapper(self) -> "FakeDuckDuckGoSearch":
+        return self
+
+    def results(self, query: str, max_results: int = 10) -> List[Dict[str, str]]:
+        self.calls += 1
+        rng = self._draws.rng(query)
+        time.sleep(self.latency.sample(rng))
+        query_words = query.split()
+        return [
+            {
+                "title": " ".join(_words(rng, 6)).capitalize(),
+                "snippet": " ".join(rng.sample(query_words, min(4, len(query_words))) + _words(rng, self.snippet_words)),
+                "link": f"https://web.example/{hashlib.sha1(f'{query}:{i}'.encode('utf-8')).hexdigest()[:12]}",
+            }
+            for i in range(max_results)
+        ]
+
+    def run(self, query: str) -> str:
+        return "\n\n".join(f"{r['title']}\n{r['snippet']}" for r in self.results(query))
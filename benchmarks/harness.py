@@ -0,0 +1,465 @@
+"""
+Środowisko i pomiary benchmarków.
+
+BenchmarkEnvironment buduje izolowany zestaw usług (ChromaDB, indeks BM25
+i cache embeddingów w katalogu tymczasowym) z atrapami z fakes.py
+i podmienia singletony aplikacji na czas pomiaru (install). Pomiary:
+
+- ingest - ingest_documents na świeżej bazie + ponowny przebieg (bez zmian)
+- search - HybridSearchService.search, sekwencyjnie i współbieżnie
+- analysis - run_mvp_analysis przy N współbieżnych sesjach; etapy z eventów
+  SSE (wyszukiwanie, pierwszy token raportu, raport, scenariusze) oraz
+  etapy executora (search.*, rerank.*, context_cache.*)
+
+Wyniki to percentyle p50/p95/p99 per etap; zapisane jako baseline (JSON)
+mogą być porównane z kolejnym przebiegiem (compare_results).
+"""
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from core.config import settings
+from services.data_pipeline.ingestion import ingest_documents
+from services.executor import add_stage_listener, install_default_executor, remove_stage_listener, reset_stage_stats
+from services.rag.embedding_cache import PersistentEmbeddingCache
+from services.rag.embeddings import EmbeddingService
+from services.rag.lexical_index import LexicalIndex
+from services.rag.search import HybridSearchService
+from services.rag.vector_store import VectorStoreManager
+from services.web_search_engine import WebSearchEngine
+from .corpus import BenchmarkQuery, generate_corpus
+from .fakes import FakeChatModel, FakeDuckDuckGoSearch, FakeEmbeddingBackend, LatencyModel
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class BenchmarkConfig:
+    """Parametry benchmarku (zapisywane razem z wynikami)."""
+
+    seed: int = 0
+    documents: int = 200
+    # LLM: czas do pierwszego tokenu (mediana, p95) i tempo generowania
+    llm_ttft_ms: float = 400.0
+    llm_ttft_p95_ms: float = 1200.0
+    llm_words_per_second: float = 80.0
+    llm_output_words: int = 600
+    # Embeddingi: opóźnienie wywołania + koszt na tekst
+    embed_ms: float = 60.0
+    embed_p95_ms: float = 150.0
+    embed_per_text_ms: float = 0.5
+    # Web search
+    web_ms: float = 300.0
+    web_p95_ms: float = 900.0
+    # Wywołania LLM przez limiter Gemini (sloty jak w produkcji)
+    use_limiter: bool = True
+    scenario_mode: str = "parallel"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentyl q (0-100) z interpolacją liniową."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class LatencyRecorder:
+    """Próbki czasu per etap; jest też odbiorcą pomiarów executora."""
+
+    def __init__(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(stage, []).append(seconds)
+
+    def __call__(self, stage: str, elapsed: float, failed: bool) -> None:
+        if not failed:
+            self.record(stage, elapsed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """count, mean i percentyle (ms) per etap."""
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                **{f"p{q}_ms": round(percentile(values, q) * 1000, 2) for q in PERCENTILES},
+                "max_ms": round(max(values) * 1000, 2),
+            }
+            for stage, values in sorted(samples.items())
+        }
+
+
+class BenchmarkEnvironment:
+    """Izolowane usługi z atrapami, w katalogu roboczym."""
+
+    def __init__(self, config: BenchmarkConfig, workdir: Path):
+        """
+        Args:
+            config: Parametry benchmarku
+            workdir: Katalog na ChromaDB, indeks BM25 i cache embeddingów
+        """
+        self.config = config
+        self.workdir = Path(workdir)
+
+        self.embedding_backend = FakeEmbeddingBackend(
+            seed=config.seed,
+            latency=LatencyModel(config.embed_ms, config.embed_p95_ms),
+            per_text_ms=config.embed_per_text_ms,
+        )
+        self.web = FakeDuckDuckGoSearch(seed=config.seed, latency=LatencyModel(config.web_ms, config.web_p95_ms))
+        self.llm = FakeChatModel(
+            seed=config.seed,
+            ttft_ms=config.llm_ttft_ms,
+            ttft_p95_ms=config.llm_ttft_p95_ms,
+            words_per_second=config.llm_words_per_second,
+            output_words=config.llm_output_words,
+            use_limiter=config.use_limiter,
+        )
+        self.vector_store = self.new_vector_store("store")
+        self.search_service = HybridSearchService(
+            vector_store=self.vector_store,
+            # Bez cache TTL - każde zapytanie płaci opóźnienie wyszukiwarki
+            web_search=WebSearchEngine(cache_ttl=0, search=self.web),
+        )
+
+    def new_vector_store(self, name: str) -> VectorStoreManager:
+        """Pusta baza (ChromaDB + BM25 + cache embeddingów) w podkatalogu workdir."""
+        path = self.workdir / name
+        embedding_service = EmbeddingService(
+            backend=self.embedding_backend,
+            persistent_cache=PersistentEmbeddingCache(path=str(path / "embedding_cache.sqlite3")),
+        )
+        return VectorStoreManager(
+            persist_path=str(path / "chromadb"),
+            embedding_service=embedding_service,
+            lexical_index=LexicalIndex(path=str(path / "lexical_index.sqlite3")),
+        )
+
+    @contextmanager
+    def install(self) -> Iterator[None]:
+        """Podmienia singletony aplikacji i ustawienia na czas benchmarku."""
+        import agents.nodes
+        import services.context_cache
+        import services.rag.reranker
+        import services.rag.vector_store
+        import services.tools
+        from services.context_cache import FakeContextCache
+        from services.rag.reranker import Reranker
+
+        patches = [
+            (agents.nodes, "get_llm", lambda model=None, temperature=0.7, node=None: self.llm),
+            (services.tools, "_search_service", self.search_service),
+            (services.rag.vector_store, "_vector_store_manager", self.vector_store),
+            (services.rag.reranker, "_reranker", Reranker(embedding_service=self.vector_store.embedding_service)),
+            (services.context_cache, "_context_cache", FakeContextCache()),
+            (settings, "scenario_generation_mode", self.config.scenario_mode),
+            (settings, "scenario_context_cache_backend", "fake"),
+        ]
+        originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+        for target, name, value in patches:
+            setattr(target, name, value)
+        try:
+            yield
+        finally:
+            for target, name, value in originals:
+                setattr(target, name, value)
+
+
+async def bench_ingest(env: BenchmarkEnvironment, runs: int = 3) -> Dict[str, Any]:
+    """
+    Ingestion korpusu na świeżej bazie i ponowny przebieg bez zmian.
+
+    Args:
+        env: Środowisko
+        runs: Liczba przebiegów (każdy na nowej bazie)
+    """
+    documents = generate_corpus(env.config.documents, seed=env.config.seed)
+    recorder = LatencyRecorder()
+    chunks = 0
+
+    for run in range(runs):
+        store = env.new_vector_store(f"ingest_{run}")
+
+        started = time.perf_counter()
+        chunks = await ingest_documents(documents, store)
+        recorder.record("ingest.full", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await ingest_documents(documents, store)
+        recorder.record("ingest.unchanged", time.perf_counter() - started)
+
+    stages = recorder.summary()
+    full_seconds = stages["ingest.full"]["p50_ms"] / 1000
+    return {
+        "stages": stages,
+        "throughput": {
+            "documents": len(documents),
+            "chunks": chunks,
+            "documents_per_s": round(len(documents) / full_seconds, 2) if full_seconds else None,
+            "chunks_per_s": round(chunks / full_seconds, 2) if full_seconds else None,
+        },
+    }
+
+
+async def populate(env: BenchmarkEnvironment) -> int:
+    """Ładuje korpus do bazy środowiska (przed search/analysis)."""
+    documents = generate_corpus(env.config.documents, seed=env.config.seed)
+    return await ingest_documents(documents, env.vector_store)
+
+
+def bench_search(
+    env: BenchmarkEnvironment,
+    queries: List[BenchmarkQuery],
+    concurrency: int = 1,
+    strategy: str = "hybrid"
+) -> Dict[str, Any]:
+    """
+    HybridSearchService.search dla każdego zapytania (wątki przy concurrency > 1).
+
+    Args:
+        env: Środowisko
+        queries: Zapytania
+        concurrency: Liczba równoległych wyszukiwań
+        strategy: Strategia wyszukiwania
+    """
+    recorder = LatencyRecorder()
+
+    def run_one(item: BenchmarkQuery) -> None:
+        started = time.perf_counter()
+        env.search_service.search(item.query, n_results=10, strategy=strategy)
+        recorder.record("search.total", time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_one, queries))
+    wall = time.perf_counter() - started
+
+    return {
+        "stages": recorder.summary(),
+        "throughput": {"queries": len(queries), "queries_per_s": round(len(queries) / wall, 2)},
+    }
+
+
+async def _run_session(item: BenchmarkQuery, recorder: LatencyRecorder) -> None:
+    """Jedna analiza; etapy liczone z czasów eventów SSE."""
+    from services.graph import run_mvp_analysis
+
+    started = time.perf_counter()
+    marks: Dict[str, float] = {}
+
+    async def emit(event: Dict[str, Any]) -> None:
+        now = time.perf_counter()
+        event_type = event.get("type")
+        if event_type == "document":
+            marks.setdefault("documents", now)
+        elif event_type == "report_delta":
+            marks.setdefault("report_first_token", now)
+        elif event_type == "report":
+            marks["report"] = now
+        elif event_type == "scenario":
+            marks.setdefault("scenario_first", now)
+            marks["scenario_last"] = now
+
+    await run_mvp_analysis(item.query, item.config, emit)
+    finished = time.perf_counter()
+
+    recorder.record("session.total", finished - started)
+    documents = marks.get("documents", started)
+    report = marks.get("report", documents)
+    recorder.record("analysis.search", documents - started)
+    if "report_first_token" in marks:
+        recorder.record("analysis.report_ttft", marks["report_first_token"] - started)
+    recorder.record("analysis.report", report - documents)
+    if "scenario_first" in marks:
+        recorder.record("scenarios.first", marks["scenario_first"] - report)
+        recorder.record("scenarios.all", marks["scenario_last"] - report)
+
+
+async def bench_analysis(
+    env: BenchmarkEnvironment,
+    queries: List[BenchmarkQuery],
+    concurrency: int
+) -> Dict[str, Any]:
+    """
+    run_mvp_analysis dla wszystkich zapytań, najwyżej concurrency sesji naraz.
+
+    Args:
+        env: Środowisko (zainstalowane przez env.install())
+        queries: Zapytania sesji
+        concurrency: Liczba współbieżnych sesji
+    """
+    recorder = LatencyRecorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    llm_calls = env.llm.calls
+
+    async def run_limited(item: BenchmarkQuery) -> None:
+        nonlocal failures
+        async with semaphore:
+            try:
+                await _run_session(item, recorder)
+            except Exception as e:
+                failures += 1
+                logger.warning(f"Sesja nieudana: {e}")
+
+    reset_stage_stats()
+    add_stage_listener(recorder)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[run_limited(item) for item in queries])
+    finally:
+        remove_stage_listener(recorder)
+    wall = time.perf_counter() - started
+
+    return {
+        "stages": recorder.summary(),
+        "throughput": {
+            "sessions": len(queries),
+            "failed": failures,
+            "sessions_per_s": round(len(queries) / wall, 3),
+            "llm_calls": env.llm.calls - llm_calls,
+        },
+    }
+
+
+async def run_benchmarks(
+    config: BenchmarkConfig,
+    workdir: Path,
+    queries: List[BenchmarkQuery],
+    concurrency_levels: List[int],
+    only: Optional[List[str]] = None,
+    ingest_runs: int = 3
+) -> Dict[str, Any]:
+    """
+    Uruchamia wybrane benchmarki i zwraca wyniki z metadanymi.
+
+    Args:
+        config: Parametry
+        workdir: Katalog roboczy (tymczasowy)
+        queries: Zapytania dla search i analysis
+        concurrency_levels: Poziomy współbieżności sesji (np. [1, 4, 16])
+        only: Podzbiór z "ingest", "search", "analysis" (None = wszystkie)
+        ingest_runs: Liczba przebiegów ingestion
+    """
+    install_default_executor()
+    selected = only or ["ingest", "search", "analysis"]
+    env = BenchmarkEnvironment(config, workdir)
+    results: Dict[str, Any] = {}
+
+    if "ingest" in selected:
+        logger.info("Benchmark: ingest")
+        results["ingest"] = await bench_ingest(env, runs=ingest_runs)
+
+    if "search" in selected or "analysis" in selected:
+        chunks = await populate(env)
+        logger.info(f"Korpus załadowany: {chunks} chunków")
+
+    if "search" in selected:
+        for level in concurrency_levels:
+            logger.info(f"Benchmark: search (concurrency {level})")
+            results[f"search_c{level}"] = await asyncio.to_thread(bench_search, env, queries, level)
+
+    if "analysis" in selected:
+        with env.install():
+            for level in concurrency_levels:
+                logger.info(f"Benchmark: analysis (concurrency {level})")
+                results[f"analysis_c{level}"] = await bench_analysis(env, queries, level)
+
+    return {
+        "meta": _metadata(),
+        "config": asdict(config),
+        "results": results,
+    }
+
+
+def _metadata() -> Dict[str, Any]:
+    """Commit, czas i środowisko przebiegu."""
+    def git(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, timeout=10, check=True
+            ).stdout.strip()
+        except Exception:
+            return None
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def save_results(results: Dict[str, Any], path: Path) -> None:
+    """Zapisuje wyniki (baseline) jako JSON."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    """Wczytuje zapisane wyniki."""
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def compare_results(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    threshold: float = 0.10
+) -> List[Dict[str, Any]]:
+    """
+    Porównuje percentyle etapów z baseline.
+
+    Args:
+        current: Wyniki bieżącego przebiegu
+        baseline: Wyniki zapisane wcześniej
+        threshold: Względny wzrost p95/p99 uznawany za regresję (0.10 = 10%)
+
+    Returns:
+        Wiersze {benchmark, stage, metric, baseline, current, change, regression}
+        dla etapów obecnych w obu wynikach
+    """
+    if current.get("config") != baseline.get("config"):
+        logger.warning("Różna konfiguracja benchmarku niż w baseline - porównanie orientacyjne")
+
+    rows = []
+    for benchmark, result in current.get("results", {}).items():
+        base_stages = baseline.get("results", {}).get(benchmark, {}).get("stages", {})
+        for stage, stats in result.get("stages", {}).items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            for metric in (f"p{q}_ms" for q in PERCENTILES):
+                before, after = base.get(metric, 0), stats.get(metric, 0)
+                change = (after - before) / before if before else 0.0
+                rows.append({
+                    "benchmark": benchmark,
+                    "stage": stage,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": after,
+                    "change": round(change, 4),
+                    "regression": metric != "p50_ms" and change > threshold,
+                })
+    return rows
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmarki pipeline'u analizy z deterministycznymi atrapami usług.
+
+Gemini LLM, embeddingi i DuckDuckGo są zastąpione atrapami (benchmarks/fakes.py)
+o opóźnieniach z rozkładu log-normalnego, baza jest wypełniana syntetycznym
+korpusem (benchmarks/corpus.py) w katalogu tymczasowym - dane w data/ nie są
+dotykane, a wyniki są powtarzalne dla tego samego ziarna.
+
+Raportowane są p50/p95/p99 per etap dla ingestion, wyszukiwania
+i run_mvp_analysis przy kolejnych poziomach współbieżności sesji.
+
+Użycie:
+    python benchmarks/run_benchmarks.py                                  # Wszystkie benchmarki
+    python benchmarks/run_benchmarks.py --only analysis --concurrency 1,4,16
+    python benchmarks/run_benchmarks.py --save benchmarks/baselines/main.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/baselines/main.json --fail-on-regression
+"""
+
+import sys
+import asyncio
+import logging
+import argparse
+import tempfile
+from pathlib import Path
+
+# Dodaj root projektu do ścieżki
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.corpus import generate_queries
+from benchmarks.harness import (
+    BenchmarkConfig,
+    compare_results,
+    load_results,
+    run_benchmarks,
+    save_results,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def print_results(results: dict) -> None:
+    """Tabela percentyli per benchmark i etap."""
+    meta = results["meta"]
+    print(f"\nCommit: {meta['commit']}{' (zmiany lokalne)' if meta['dirty'] else ''}, {meta['timestamp']}")
+
+    for benchmark, result in results["results"].items():
+        print("\n" + "=" * 78)
+        print(f"{benchmark}: {result['throughput']}")
+        print("=" * 78)
+        print(f"{'etap':<28}{'n':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'max ms':>11}")
+        for stage, stats in result["stages"].items():
+            print(
+                f"{stage:<28}{stats['count']:>6}{stats['p50_ms']:>11.1f}"
+                f"{stats['p95_ms']:>11.1f}{stats['p99_ms']:>11.1f}{stats['max_ms']:>11.1f}"
+            )
+
+
+def print_comparison(rows: list, baseline: dict) -> int:
+    """Wypisuje zmiany względem baseline; zwraca liczbę regresji."""
+    print("\n" + "=" * 78)
+    print(f"PORÓWNANIE Z BASELINE (commit {baseline['meta'].get('commit')})")
+    print("=" * 78)
+    print(f"{'benchmark':<16}{'etap':<26}{'metryka':<9}{'przed':>10}{'teraz':>10}{'zmiana':>9}")
+    for row in rows:
+        marker = "  << REGRESJA" if row["regression"] else ""
+        print(
+            f"{row['benchmark']:<16}{row['stage']:<26}{row['metric']:<9}"
+            f"{row['baseline']:>10.1f}{row['current']:>10.1f}{row['change'] * 100:>8.1f}%{marker}"
+        )
+    regressions = sum(1 for row in rows if row["regression"])
+    print(f"\nRegresje: {regressions}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarki ingestion, wyszukiwania i analizy z atrapami Gemini/DuckDuckGo"
+    )
+    parser.add_argument(
+        "--only",
+        type=str,
+        help="Lista benchmarków po przecinku: ingest, search, analysis"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Ziarno korpusu i atrap")
+    parser.add_argument("--documents", type=int, default=200, help="Liczba dokumentów korpusu")
+    parser.add_argument("--sessions", type=int, default=16, help="Liczba zapytań (sesji) na poziom")
+    parser.add_argument(
+        "--concurrency",
+        type=str,
+        default="1,4,16",
+        help="Poziomy współbieżności sesji, np. 1,4,16"
+    )
+    parser.add_argument("--ingest-runs", type=int, default=3, help="Liczba przebiegów ingestion")
+    parser.add_argument("--llm-ttft-ms", type=float, default=400.0, help="Mediana czasu do 1. tokenu LLM")
+    parser.add_argument("--llm-ttft-p95-ms", type=float, default=1200.0, help="p95 czasu do 1. tokenu LLM")
+    parser.add_argument("--llm-words-per-s", type=float, default=80.0, help="Tempo generowania LLM")
+    parser.add_argument("--llm-output-words", type=int, default=600, help="Długość odpowiedzi LLM")
+    parser.add_argument("--embed-ms", type=float, default=60.0, help="Mediana opóźnienia embeddingów")
+    parser.add_argument("--embed-p95-ms", type=float, default=150.0, help="p95 opóźnienia embeddingów")
+    parser.add_argument("--web-ms", type=float, default=300.0, help="Mediana opóźnienia web search")
+    parser.add_argument("--web-p95-ms", type=float, default=900.0, help="p95 opóźnienia web search")
+    parser.add_argument(
+        "--no-limiter",
+        action="store_true",
+        help="Wywołania atrapy LLM bez limitera Gemini"
+    )
+    parser.add_argument(
+        "--scenario-mode",
+        choices=["parallel", "context_cache"],
+        default="parallel",
+        help="Tryb generowania scenariuszy (batched wymaga structured output - poza atrapą)"
+    )
+    parser.add_argument("--save", type=str, help="Zapisz wyniki jako baseline (JSON)")
+    parser.add_argument("--compare", type=str, help="Porównaj z baseline (JSON)")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Względny wzrost p95/p99 uznawany za regresję (domyślnie 0.10)"
+    )
+    parser.add_argument(
+        "--fail-on-regression",
+        action="store_true",
+        help="Kod wyjścia 1, gdy porównanie wykaże regresję"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Logi INFO aplikacji")
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = BenchmarkConfig(
+        seed=args.seed,
+        documents=args.documents,
+        llm_ttft_ms=args.llm_ttft_ms,
+        llm_ttft_p95_ms=args.llm_ttft_p95_ms,
+        llm_words_per_second=args.llm_words_per_s,
+        llm_output_words=args.llm_output_words,
+        embed_ms=args.embed_ms,
+        embed_p95_ms=args.embed_p95_ms,
+        web_ms=args.web_ms,
+        web_p95_ms=args.web_p95_ms,
+        use_limiter=not args.no_limiter,
+        scenario_mode=args.scenario_mode,
+    )
+    concurrency_levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    only = [name.strip() for name in args.only.split(",")] if args.only else None
+    queries = generate_queries(args.sessions, seed=args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as workdir:
+        results = asyncio.run(run_benchmarks(
+            config,
+            Path(workdir),
+            queries,
+            concurrency_levels,
+            only=only,
+            ingest_runs=args.ingest_runs
+        ))
+
+    print_results(results)
+
+    if args.save:
+        save_results(results, Path(args.save))
+        print(f"\nZapisano baseline: {args.save}")
+
+    if args.compare:
+        baseline = load_results(Path(args.compare))
+        regressions = print_comparison(compare_results(results, baseline, args.threshold), baseline)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 """
 Konfiguracja aplikacji - settings, prompts, stałe.
 """
-from typing import Optional
+from typing import List, Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -11,6 +11,107 @@ class Settings(BaseSettings):
     hf_token: Optional[str] = None
     debug: bool = False
 
+    # Pula wątków dla etapów blokujących (services/executor.py)
+    blocking_pool_size: int = 32
+
+    # Kolejka analiz (api/jobs.py) - równoległe analizy i limit oczekujących
+    analysis_max_workers: int = 4
+    analysis_queue_size: int = 20
+    # Priorytet zgłoszeń z /api/analyze (0 = najwyższy) - nadawany przez serwer,
+    # niższe wartości zostają dla zadań wewnętrznych
+    analysis_request_priority: int = 5
+
+    # Cache całych analiz (services/analysis_cache.py)
+    analysis_cache_enabled: bool = True
+    analysis_cache_path: str = "./data/analysis_cache.sqlite3"
+    analysis_cache_ttl_seconds: int = 6 * 3600
+    analysis_cache_similarity_threshold: float = 0.95
+    analysis_cache_max_entries: int = 500
+
+    # Streaming tokenów raportu/scenariuszy - odstęp między ramkami *_delta
+    stream_frame_interval_ms: int = 100
+
+    # Śledzenie etapów (services/tracing.py): spany w eventach progress (pole timing)
+    # i histogramy na /metrics; wyłączone = spany są no-op
+    tracing_enabled: bool = False
+
+    # Cache odpowiedzi LLM (services/llm_cache.py) - tylko dla wymienionych węzłów;
+    # węzły z kreatywnymi promptami (region, country - agenci z narzędziami) bez cache
+    llm_cache_enabled: bool = True
+    llm_cache_path: str = "./data/llm_cache.sqlite3"
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_max_entries: int = 20000
+    llm_cache_nodes: List[str] = ["supervisor", "analysis", "scenarios", "synthesis", "scenario"]
+
+    # Wyszukiwanie (RAG)
+    web_search_max_results: int = 10
+    web_search_cache_ttl: int = 900
+    web_search_cache_size: int = 256
+    # Indeks BM25 (services/rag/lexical_index.py) łączony z wektorowym przez RRF
+    lexical_index_enabled: bool = True
+    lexical_index_path: str = "./data/lexical_index.sqlite3"
+    rrf_k: int = 60
+    # Reranking fragmentów przed promptem (services/rag/reranker.py)
+    rerank_enabled: bool = True
+    rerank_top_k: int = 8
+    rerank_max_candidates: int = 30
+    rerank_mmr_lambda: float = 0.7
+    rerank_budget_ms: int = 1500
+    # Lokalny cross-encoder, np. "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1" ("" = tylko MMR)
+    rerank_cross_encoder_model: str = ""
+
+    # Budżety tokenów promptów MVP (agents/context_packer.py)
+    context_docs_token_budget: int = 6000
+    context_report_token_budget: int = 2500
+    context_min_chunk_tokens: int = 80
+    tokenizer_encoding: str = "cl100k_base"  # tiktoken - przybliżenie tokenizera Gemini
+
+    # Generowanie scenariuszy: "parallel" (4 wywołania ze wspólnym prefiksem),
+    # "context_cache" (prefiks w cache kontekstu Gemini), "batched" (jedno wywołanie)
+    scenario_generation_mode: str = "parallel"
+    scenario_context_cache_backend: str = "gemini"  # "gemini" | "fake" (testy, benchmarki)
+    scenario_context_cache_ttl_seconds: int = 600
+    scenario_context_cache_min_tokens: int = 1024  # minimum explicit cache w Gemini API
+
+    # Backend embeddingów (services/rag/embedding_backends.py): "gemini" | "local".
+    # Zmiana backendu/modelu wymaga przebudowy kolekcji (inny wymiar wektorów).
+    embedding_backend: str = "gemini"
+    local_embedding_model: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    local_embedding_device: str = "cpu"
+    local_embedding_threads: int = 4
+    local_embedding_batch_size: int = 32
+    local_embedding_quantize: bool = False  # dynamiczna kwantyzacja int8
+    local_embedding_onnx: bool = False  # wymaga sentence-transformers[onnx]
+
+    # Cache embeddingów (SQLite, współdzielony między procesami)
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "./data/embedding_cache.sqlite3"
+    embedding_cache_max_entries: int = 200000
+
+    # Limiter wywołań Gemini (services/gemini_limiter.py) - wspólny dla procesu;
+    # RPM embeddingów: embedding_requests_per_minute
+    gemini_llm_rpm: int = 1000
+    gemini_llm_tpm: int = 1000000
+    gemini_embedding_tpm: int = 5000000
+    gemini_max_concurrency: int = 16
+    gemini_max_retries: int = 4
+
+    # Batching embeddingów podczas ingestion
+    embedding_batch_size: int = 100  # limit batchEmbedContents w Gemini API
+    embedding_max_concurrent_batches: int = 4
+    embedding_requests_per_minute: int = 1500
+
+    # Sesje analizy (api/session_store.py)
+    session_store_backend: str = "memory"  # "memory" | "redis"
+    session_max_count: int = 200
+    session_ttl_seconds: int = 3600
+    session_max_memory_mb: int = 256
+    redis_url: str = "redis://localhost:6379/0"
+
+    # Cache HTTP scrapera (ETag/Last-Modified)
+    http_cache_enabled: bool = True
+    http_cache_path: str = "./data/http_cache.sqlite3"
+
     class Config:
         env_file = ".env"
         extra = "ignore"
@@ -438,7 +539,9 @@ Przeanalizuj dokumenty i stwórz zwięzły raport analityczny (800-1200 słów).
 Odpowiadaj w formacie Markdown."""
 
 
-MVP_SCENARIO_PROMPT = """Na podstawie raportu analitycznego wygeneruj scenariusz {variant_pl} na {timeframe}.
+# Prompty scenariuszy: wspólny prefiks (raport, zapytanie, zasady - identyczny
+# dla wszystkich 4 wywołań, cache'owalny po stronie Gemini) + krótkie zadanie.
+MVP_SCENARIO_CONTEXT_PROMPT = """Na podstawie raportu analitycznego przygotujesz scenariusze rozwoju sytuacji.
 
 ## RAPORT BAZOWY:
 {report}
@@ -450,13 +553,10 @@ MVP_SCENARIO_PROMPT = """Na podstawie raportu analitycznego wygeneruj scenariusz
 1. Scenariusze mają być REALISTYCZNE, oparte na trendach
 2. NIE wymyślaj konkretnych liczb dla nieprzewidywalnych zdarzeń
 3. WYJAŚNIJ korelacje przyczynowo-skutkowe
-4. ODRÓŻNIAJ fakty od interpretacji
-
-## STRUKTURA SCENARIUSZA ({word_limit} słów):
+4. ODRÓŻNIAJ fakty od interpretacji"""
 
-### Scenariusz {variant_pl} - perspektywa {timeframe}
 
-**1. Sytuacja wyjściowa** (~50 słów)
+MVP_SCENARIO_STRUCTURE = """**1. Sytuacja wyjściowa** (~50 słów)
 Punkty startowe oparte na raporcie.
 
 **2. Rozwój wydarzeń** (~150-200 słów)
@@ -468,6 +568,29 @@ Opis tendencji i procesów (nie pojedynczych nieprzewidywalnych zdarzeń).
 | [fakt z raportu] | [jak działa] | [konkretny wpływ] |
 
 **4. Kluczowe niepewności** (~30-40 słów)
-Co może zmienić ten scenariusz na gorszy/lepszy.
+Co może zmienić ten scenariusz na gorszy/lepszy."""
+
+
+MVP_SCENARIO_TASK_PROMPT = """## ZADANIE:
+Wygeneruj scenariusz {variant_pl} na {timeframe}.
+
+## STRUKTURA SCENARIUSZA ({word_limit} słów):
+
+### Scenariusz {variant_pl} - perspektywa {timeframe}
+
+""" + MVP_SCENARIO_STRUCTURE + """
 
 Format: Markdown."""
+
+
+# Tryb "batched": wszystkie scenariusze jednym wywołaniem (structured output)
+MVP_SCENARIOS_BATCH_TASK_PROMPT = """## ZADANIE:
+Wygeneruj {count} scenariusze, każdy jako osobny element listy `scenarios`:
+{scenario_list}
+
+Każdy scenariusz (pole `content`, Markdown) ma nagłówek
+"### Scenariusz <wariant> - perspektywa <horyzont>" i strukturę:
+
+""" + MVP_SCENARIO_STRUCTURE + """
+
+W polach `timeframe` i `variant` przepisz dokładnie wartości z listy powyżej."""
@@ -3,7 +3,7 @@
  *
  * Użycie:
  * ```tsx
- * const { isAnalyzing, thoughtSteps, scenarios, startAnalysis } = useAnalysis();
+ * const { isAnalyzing, thoughtSteps, scenarios, reports, startAnalysis } = useAnalysis();
  *
  * await startAnalysis("Analiza wpływu...", { regions: ["EU"], ... });
  * ```
@@ -25,6 +25,7 @@ interface UseAnalysisReturn {
   isAnalyzing: boolean;
   thoughtSteps: ThoughtStep[];
   scenarios: ScenarioReport[];
+  reports: Record<string, string>; // sekcja raportu -> treść (budowana z delt)
   error: string | null;
   sessionId: string | null;
   progress: number;
@@ -39,6 +40,7 @@ export function useAnalysis(): UseAnalysisReturn {
   const [isAnalyzing, setIsAnalyzing] = useState(false);
   const [thoughtSteps, setThoughtSteps] = useState<ThoughtStep[]>([]);
   const [scenarios, setScenarios] = useState<ScenarioReport[]>([]);
+  const [reports, setReports] = useState<Record<string, string>>({});
   const [error, setError] = useState<string | null>(null);
   const [sessionId, setSessionId] = useState<string | null>(null);
   const [progress, setProgress] = useState<number>(0);
@@ -239,6 +241,47 @@ export function useAnalysis(): UseAnalysisReturn {
         setProgress(100);
       }
 
+      // Delty raportu - fragment trafia na pozycję offset (powtórki po reconnect nie dublują tekstu)
+      if (event.type === 'report_delta') {
+        const section = event.section || 'main_analysis';
+        const delta = event.content || '';
+
+        setReports((prev) => {
+          const current = prev[section] || '';
+          const offset = typeof event.offset === 'number' ? event.offset : current.length;
+          const content = offset <= current.length ? current.slice(0, offset) + delta : current + delta;
+          return { ...prev, [section]: content };
+        });
+        return;
+      }
+
+      // Gotowy raport zastępuje wersję budowaną z delt (krok w ChainOfThought dodawany niżej)
+      if (event.type === 'report') {
+        const section = event.section || 'main_analysis';
+        setReports((prev) => ({ ...prev, [section]: event.content || '' }));
+      }
+
+      // Delty scenariuszy - tekst dopisywany na bieżąco do scenariusza
+      if (event.type === 'scenario_delta') {
+        const timeframe = (event.timeframe || '12m') as '12m' | '36m';
+        const variant = (event.variant || 'positive') as 'positive' | 'negative';
+        const delta = event.content || '';
+
+        setScenarios((prev) => {
+          const index = prev.findIndex((s) => s.timeframe === timeframe && s.variant === variant);
+          if (index === -1) {
+            return [
+              ...prev,
+              { timeframe, variant, title: `Scenariusz ${variant} (${timeframe})`, content: delta, confidence: 0 },
+            ];
+          }
+          const next = [...prev];
+          next[index] = { ...next[index], content: next[index].content + delta };
+          return next;
+        });
+        return;
+      }
+
       // Scenariusze idą do osobnego stanu
       if (event.type === 'scenario') {
         const timeframe = (event.timeframe || '12m') as '12m' | '36m';
@@ -252,7 +295,14 @@ export function useAnalysis(): UseAnalysisReturn {
           confidence: event.confidence || 0.5,
           chartData: event.chart_data ? (event.chart_data as unknown as ChartData) : null,
         };
-        setScenarios((prev) => [...prev, scenario]);
+        // Gotowy scenariusz zastępuje wersję budowaną z delt
+        setScenarios((prev) => {
+          const index = prev.findIndex((s) => s.timeframe === timeframe && s.variant === variant);
+          if (index === -1) return [...prev, scenario];
+          const next = [...prev];
+          next[index] = scenario;
+          return next;
+        });
         return;
       }
 
@@ -289,6 +339,7 @@ export function useAnalysis(): UseAnalysisReturn {
       setError(null);
       setThoughtSteps([]);
       setScenarios([]);
+      setReports({});
       stepIdCounter.current = 0;
 
       try {
@@ -331,6 +382,7 @@ export function useAnalysis(): UseAnalysisReturn {
   const clearResults = useCallback(() => {
     setThoughtSteps([]);
     setScenarios([]);
+    setReports({});
     setError(null);
     setSessionId(null);
     setProgress(0);
@@ -341,6 +393,7 @@ export function useAnalysis(): UseAnalysisReturn {
     isAnalyzing,
     thoughtSteps,
     scenarios,
+    reports,
     error,
     sessionId,
     progress,
@@ -135,6 +135,14 @@ export class AnalysisSSEClient {
     };
 
     this.eventSource.onerror = (error) => {
+      // Przeglądarka sama wznawia połączenie z nagłówkiem Last-Event-ID,
+      // a backend dosyła tylko brakujące eventy - zamykamy dopiero,
+      // gdy EventSource zrezygnował z ponawiania.
+      if (this.eventSource?.readyState === EventSource.CONNECTING) {
+        console.warn('[SSE] Connection lost, reconnecting...', error);
+        return;
+      }
+
       console.error('[SSE] Connection error:', error);
       onError?.(new Error('Utracono połączenie z serwerem'));
       this.close();
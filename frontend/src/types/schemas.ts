@@ -92,12 +92,14 @@ export interface AnalyzeRequest {
   weights?: Record<string, number>;
   timeframes?: string[]; // default ["12m", "36m"]
   include_synthesis?: boolean; // default true
+  force_refresh?: boolean; // pomiń cache analiz
 }
 
 export interface AnalyzeResponse {
   session_id: string;
-  status: string; // default "processing"
+  status: string; // "queued" - analiza czeka na wolny worker
   message: string;
+  queue_position?: number | null;
 }
 
 export interface SessionStatusResponse {
@@ -117,6 +119,10 @@ export interface StreamEvent {
   query?: string | null;
   docs?: Array<Record<string, any>> | null;
   progress?: number | null;
+  queue_position?: number | null;  // pozycja w kolejce analiz (event progress)
+  offset?: number | null;  // pozycja fragmentu w tekście (report_delta / scenario_delta)
+  telemetry?: Record<string, any> | null;  // tokeny promptu (event telemetry)
+  timing?: Record<string, any> | null;  // czasy spanów od poprzedniego progress (tracing_enabled)
   section?: string | null;
   timeframe?: string | null;
   variant?: string | null;
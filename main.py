@@ -7,8 +7,12 @@ Uruchomienie:
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from api.routes import router as api_router
+from core.config import settings
+from services.executor import add_stage_listener, install_default_executor
+from services.tracing import record_stage_metric, render_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -44,12 +48,24 @@ async def startup_event():
     logger.info("Sedno API - uruchamianie...")
     logger.info("=" * 60)
 
+    # Ograniczona pula wątków jako domyślny executor (asyncio.to_thread, narzędzia LangChain)
+    install_default_executor()
+
+    # Histogramy etapów run_blocking na /metrics (tylko przy włączonym śledzeniu)
+    if settings.tracing_enabled:
+        add_stage_listener(record_stage_metric)
+        logger.info("Śledzenie etapów włączone (/metrics, timing w eventach progress)")
+
     # Walidacja ChromaDB
     try:
         from services.rag.vector_store import get_vector_store_manager
+        from services.tools import get_search_service
         vsm = get_vector_store_manager()
         stats = vsm.get_collection_stats()
 
+        # Inicjalizacja serwisu wyszukiwania przy starcie, nie w pierwszym requeście
+        get_search_service()
+
         doc_count = stats.get("count", 0)
 
         if doc_count == 0:
@@ -61,6 +77,15 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ Błąd sprawdzania ChromaDB: {e}")
 
+    # Klienci LLM flow MVP budowani przy starcie (współdzieleni przez wszystkie analizy)
+    try:
+        from services.llm import get_llm
+        get_llm(temperature=0.4, node="analysis")
+        get_llm(temperature=0.5, node="scenarios")
+        get_llm(temperature=0.3, node="scenarios")
+    except Exception as e:
+        logger.error(f"❌ Błąd inicjalizacji klientów LLM: {e}")
+
     logger.info("=" * 60)
     logger.info("✓ Aplikacja gotowa")
     logger.info("=" * 60)
@@ -79,6 +104,7 @@ def root():
             "session": "GET /api/session/{session_id} - Status sesji",
             "regions": "GET /api/regions - Lista regionów",
             "countries": "GET /api/countries - Lista krajów",
+            "metrics": "GET /metrics - Metryki Prometheus (TRACING_ENABLED=true)",
         }
     }
 
@@ -89,6 +115,12 @@ def health():
     return {"status": "ok", "version": "2.0.0"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Histogramy czasu spanów i etapów oraz tokeny LLM (format tekstowy Prometheus)."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -113,6 +113,20 @@ class FullReport(BaseModel):
     confidence_score: float = 0.0
 
 
+# === SCENARIUSZE (tryb batched - jedno wywołanie, structured output) ===
+
+class ScenarioDraft(BaseModel):
+    """Pojedynczy scenariusz z wywołania zbiorczego."""
+    timeframe: str = Field(description="Horyzont, np. '12 miesięcy'")
+    variant: str = Field(description="'positive' lub 'negative'")
+    content: str = Field(description="Treść scenariusza (Markdown)")
+
+
+class ScenarioBatch(BaseModel):
+    """Wszystkie scenariusze analizy."""
+    scenarios: List[ScenarioDraft]
+
+
 # === API REQUEST/RESPONSE ===
 
 class AnalyzeRequest(BaseModel):
@@ -125,6 +139,7 @@ class AnalyzeRequest(BaseModel):
     weights: Dict[str, float] = Field(default_factory=dict)
     timeframes: List[str] = Field(default=["12m", "36m"])
     include_synthesis: bool = True
+    force_refresh: bool = Field(default=False, description="Pomiń cache analiz i policz od nowa")
 
     class Config:
         json_schema_extra = {
@@ -142,8 +157,9 @@ class AnalyzeRequest(BaseModel):
 class AnalyzeResponse(BaseModel):
     """Response z analizy."""
     session_id: str
-    status: str = "processing"
-    message: str = "Analiza rozpoczęta"
+    status: str = "queued"
+    message: str = "Analiza w kolejce"
+    queue_position: Optional[int] = None
 
 
 class SessionStatusResponse(BaseModel):
@@ -165,6 +181,10 @@ class StreamEvent(BaseModel):
     query: Optional[str] = None
     docs: Optional[List[Dict[str, Any]]] = None
     progress: Optional[float] = None
+    queue_position: Optional[int] = None
+    offset: Optional[int] = None
+    telemetry: Optional[Dict[str, Any]] = None
+    timing: Optional[Dict[str, Any]] = None
     section: Optional[str] = None
     timeframe: Optional[str] = None
     variant: Optional[str] = None
@@ -14,7 +14,7 @@ from pathlib import Path
 # Dodaj root do sys.path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from services.data_pipeline import scrape_all_sources, ingest_documents
+from services.data_pipeline import run_streaming_ingestion
 from services.rag.vector_store import get_vector_store_manager
 import logging
 
@@ -32,29 +32,19 @@ async def main():
     logger.info("Rozpoczynam ładowanie danych do ChromaDB")
     logger.info("=" * 60)
 
-    # 1. Scraping
-    logger.info("\n📥 KROK 1/3: Scraping dokumentów z publicznych źródeł...")
-    try:
-        documents = await scrape_all_sources()
-        logger.info(f"✅ Zescrapowano {len(documents)} dokumentów")
-
-        if not documents:
-            logger.warning("⚠️ Brak dokumentów do ingestion. Sprawdź konfigurację scraper i połączenie z internetem.")
-            return
-
-    except Exception as e:
-        logger.error(f"❌ Błąd podczas scrapingu: {e}")
-        return
-
-    # 2. Ingestion do ChromaDB
-    logger.info("\n💾 KROK 2/3: Ingestion do ChromaDB...")
+    # 1-2. Scraping + ingestion (strumieniowo - dokumenty trafiają do bazy w trakcie scrapowania)
+    logger.info("\n📥 KROK 1-2/3: Scraping dokumentów i ingestion do ChromaDB...")
     try:
         vector_store = get_vector_store_manager()
-        chunks_added = await ingest_documents(documents, vector_store, batch_size=50)
-        logger.info(f"✅ Dodano {chunks_added} chunków do ChromaDB")
+        pipeline_stats = await run_streaming_ingestion(vector_store)
+        logger.info(f"✅ Zescrapowano {pipeline_stats.documents_scraped} dokumentów")
+        logger.info(f"✅ Dodano {pipeline_stats.chunks_upserted} chunków do ChromaDB")
+
+        if not pipeline_stats.documents_scraped:
+            logger.warning("⚠️ Brak nowych dokumentów do ingestion. Sprawdź konfigurację scraper i połączenie z internetem.")
 
     except Exception as e:
-        logger.error(f"❌ Błąd podczas ingestion: {e}")
+        logger.error(f"❌ Błąd podczas scrapingu/ingestion: {e}")
         return
 
     # 3. Weryfikacja
@@ -5,11 +5,15 @@ Skrypt do uruchamiania pełnego pipeline'u:
 2. Chunking dokumentów
 3. Zapisywanie do ChromaDB
 
+Etapy działają strumieniowo (services/data_pipeline/streaming.py).
+
 Użycie:
     python scripts/run_pipeline.py                    # Pełny pipeline
     python scripts/run_pipeline.py --source DE_MAE   # Tylko jedno źródło
     python scripts/run_pipeline.py --test            # Tryb testowy (1 dokument)
     python scripts/run_pipeline.py --stats           # Tylko statystyki
+    python scripts/run_pipeline.py --no-http-cache   # Pobierz wszystko od nowa (bez ETag/Last-Modified)
+    python scripts/run_pipeline.py --rebuild-lexical # Odbuduj indeks BM25 z ChromaDB
 """
 
 import sys
@@ -23,13 +27,11 @@ PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from services.data_pipeline.scraper import (
-    scrape_all_sources,
-    scrape_single_source,
     SourceConfig,
     DocumentScraper,
-    ScrapedDocument
 )
 from services.data_pipeline.ingestion import ingest_documents
+from services.data_pipeline.streaming import run_streaming_ingestion
 from services.rag.vector_store import get_vector_store_manager
 
 # Konfiguracja logowania
@@ -44,12 +46,19 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-async def run_full_pipeline(include_json_sources: bool = True) -> dict:
+async def run_full_pipeline(
+    include_json_sources: bool = True,
+    use_http_cache: bool = True
+) -> dict:
     """
-    Uruchamia pełny pipeline scrapingu i ingestion.
+    Uruchamia pełny pipeline scrapingu i ingestion (strumieniowo).
+
+    Dokumenty są chunkowane, embedowane i zapisywane w trakcie scrapowania -
+    pojawiają się w bazie kilka sekund po pobraniu.
 
     Args:
         include_json_sources: Czy uwzględnić źródła z organisations.json
+        use_http_cache: Czy pomijać niezmienione strony (cache HTTP)
 
     Returns:
         Statystyki wykonania
@@ -58,76 +67,68 @@ async def run_full_pipeline(include_json_sources: bool = True) -> dict:
     logger.info("ROZPOCZYNAM PEŁNY PIPELINE")
     logger.info("=" * 60)
 
-    # 1. Scrapowanie
-    logger.info("\n[1/3] SCRAPOWANIE DOKUMENTÓW...")
-    documents = await scrape_all_sources(include_json_sources=include_json_sources)
-    logger.info(f"Zescrapowano: {len(documents)} dokumentów")
-
-    if not documents:
-        logger.warning("Brak dokumentów do przetworzenia!")
-        return {"scraped": 0, "chunks": 0, "sources": 0}
-
-    # 2. Ingestion do ChromaDB
-    logger.info("\n[2/3] INGESTION DO CHROMADB...")
+    # 1-2. Scrapowanie + ingestion (strumieniowo)
+    logger.info("\n[1/2] SCRAPOWANIE I INGESTION DO CHROMADB...")
     vector_store = get_vector_store_manager()
 
-    chunks_added = await ingest_documents(documents, vector_store)
-    logger.info(f"Dodano: {chunks_added} chunków do bazy wektorowej")
+    pipeline_stats = await run_streaming_ingestion(
+        vector_store,
+        include_json_sources=include_json_sources,
+        use_http_cache=use_http_cache
+    )
+    logger.info(f"Zescrapowano: {pipeline_stats.documents_scraped} dokumentów")
+    logger.info(f"Dodano: {pipeline_stats.chunks_upserted} chunków do bazy wektorowej")
+
+    if not pipeline_stats.documents_scraped:
+        logger.warning("Brak nowych dokumentów do przetworzenia!")
 
     # 3. Statystyki
-    logger.info("\n[3/3] STATYSTYKI KOŃCOWE...")
+    logger.info("\n[2/2] STATYSTYKI KOŃCOWE...")
     stats = vector_store.get_collection_stats()
     logger.info(f"Kolekcja: {stats['name']}")
     logger.info(f"Łączna liczba chunków: {stats['count']}")
 
-    # Podsumowanie źródeł
-    sources_summary = {}
-    for doc in documents:
-        sources_summary[doc.source] = sources_summary.get(doc.source, 0) + 1
-
-    logger.info("\nPodsumowanie źródeł:")
-    for source, count in sorted(sources_summary.items()):
-        logger.info(f"  - {source}: {count} dokumentów")
-
     logger.info("=" * 60)
     logger.info("PIPELINE ZAKOŃCZONY POMYŚLNIE")
     logger.info("=" * 60)
 
     return {
-        "scraped": len(documents),
-        "chunks": chunks_added,
-        "sources": len(sources_summary),
+        "scraped": pipeline_stats.documents_scraped,
+        "chunks": pipeline_stats.chunks_upserted,
+        "pipeline": pipeline_stats.to_dict(),
         "collection_total": stats['count']
     }
 
 
-async def run_single_source_pipeline(source_code: str) -> dict:
+async def run_single_source_pipeline(source_code: str, use_http_cache: bool = True) -> dict:
     """
     Uruchamia pipeline dla pojedynczego źródła.
 
     Args:
         source_code: Kod źródła (np. "NATO", "DE_MAE")
+        use_http_cache: Czy pomijać niezmienione strony (cache HTTP)
 
     Returns:
         Statystyki wykonania
     """
     logger.info(f"Uruchamiam pipeline dla źródła: {source_code}")
 
-    documents = await scrape_single_source(source_code)
-
-    if not documents:
-        logger.warning(f"Brak dokumentów z {source_code}")
-        return {"scraped": 0, "chunks": 0}
-
     vector_store = get_vector_store_manager()
-    chunks_added = await ingest_documents(documents, vector_store)
+    pipeline_stats = await run_streaming_ingestion(
+        vector_store,
+        source_code=source_code,
+        use_http_cache=use_http_cache
+    )
+
+    if not pipeline_stats.documents_scraped:
+        logger.warning(f"Brak nowych dokumentów z {source_code}")
 
     stats = vector_store.get_collection_stats()
-    logger.info(f"Dodano {chunks_added} chunków. Łącznie w bazie: {stats['count']}")
+    logger.info(f"Dodano {pipeline_stats.chunks_upserted} chunków. Łącznie w bazie: {stats['count']}")
 
     return {
-        "scraped": len(documents),
-        "chunks": chunks_added,
+        "scraped": pipeline_stats.documents_scraped,
+        "chunks": pipeline_stats.chunks_upserted,
         "collection_total": stats['count']
     }
 
@@ -142,7 +143,8 @@ async def run_test_pipeline() -> dict:
     logger.info("TRYB TESTOWY - pobieranie jednego dokumentu")
 
     # Użyj DE_MAE jako źródło testowe (z organisations.json)
-    scraper = DocumentScraper()
+    # Bez cache HTTP - test zawsze pobiera i przetwarza dokument
+    scraper = DocumentScraper(use_http_cache=False)
     sources = SourceConfig.get_all_sources()
 
     if not sources:
@@ -191,6 +193,9 @@ def show_stats():
     stats = vector_store.get_collection_stats()
     print(f"Kolekcja: {stats['name']}")
     print(f"Liczba chunków: {stats['count']}")
+    print(f"Indeks BM25: {stats.get('lexical_count')}")
+    print(f"Embeddingi: {stats.get('embedding_backend')}:{stats.get('embedding_model')} "
+          f"({stats.get('embedding_dimension')} wym.)")
     print(f"Ścieżka: {stats['persist_path']}")
 
     # Lista wszystkich źródeł w konfiguracji
@@ -226,6 +231,16 @@ def main():
         action="store_true",
         help="Nie uwzględniaj źródeł z organisations.json"
     )
+    parser.add_argument(
+        "--no-http-cache",
+        action="store_true",
+        help="Nie używaj cache HTTP (pobierz i przetwórz wszystkie strony)"
+    )
+    parser.add_argument(
+        "--rebuild-lexical",
+        action="store_true",
+        help="Odbuduj indeks BM25 z zawartości ChromaDB (bez scrapingu)"
+    )
 
     args = parser.parse_args()
 
@@ -236,12 +251,23 @@ def main():
         show_stats()
         return
 
+    if args.rebuild_lexical:
+        indexed = get_vector_store_manager().rebuild_lexical_index()
+        print(f"\nZaindeksowano {indexed} chunków w indeksie BM25")
+        return
+
     if args.test:
         result = asyncio.run(run_test_pipeline())
     elif args.source:
-        result = asyncio.run(run_single_source_pipeline(args.source))
+        result = asyncio.run(run_single_source_pipeline(
+            args.source,
+            use_http_cache=not args.no_http_cache
+        ))
     else:
-        result = asyncio.run(run_full_pipeline(include_json_sources=not args.no_json))
+        result = asyncio.run(run_full_pipeline(
+            include_json_sources=not args.no_json,
+            use_http_cache=not args.no_http_cache
+        ))
 
     print(f"\nWynik: {result}")
 
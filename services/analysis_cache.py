@@ -0,0 +1,338 @@
+"""
+Cache całych analiz (SQLite).
+
+Klucz wpisu to znormalizowane zapytanie z embeddingiem oraz kanoniczny
+hash konfiguracji (regiony, kraje, sektory, wagi, horyzonty). Trafienie
+wymaga identycznego hasha konfiguracji, podobieństwa zapytań
+>= similarity_threshold, wieku < TTL i tej samej wersji danych bazy
+wektorowej (VectorStoreManager.data_version) - po ingestion wszystkie
+wcześniejsze wyniki przestają być ważne.
+
+Przechowywane są eventy SSE i wynik, więc trafienie jest odtwarzane
+w sesji bez wywołań LLM.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from array import array
+from pathlib import Path
+import hashlib
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pola konfiguracji wpływające na wynik analizy
+CONFIG_KEYS = ("regions", "countries", "sectors", "weights", "timeframes", "scenarios")
+
+# Eventy, których nie odtwarzamy (kończące, keep-alive, delty - pełny tekst
+# jest w eventach report/scenario - i telemetria oryginalnego przebiegu)
+SKIPPED_EVENT_TYPES = ("done", "error", "heartbeat", "report_delta", "scenario_delta", "telemetry")
+
+# Agent eventów sterujących przebiegiem (m.in. pozycja w kolejce analiz)
+SYSTEM_AGENT = "system"
+
+
+@dataclass
+class CachedAnalysis:
+    """Trafienie w cache analiz."""
+
+    query: str
+    similarity: float
+    events: List[Dict[str, Any]]
+    result: Dict[str, Any]
+    created_at: float
+
+
+def normalize_query(query: str) -> str:
+    """Normalizacja zapytania: małe litery, pojedyncze spacje, bez końcowej interpunkcji."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.rstrip(" .?!")
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """
+    Kanoniczny hash konfiguracji analizy.
+
+    Listy są sortowane (kolejność regionów/sektorów nie zmienia wyniku),
+    wagi zaokrąglane; model LLM jest częścią klucza.
+    """
+    canonical: Dict[str, Any] = {"model": settings.llm_model}
+    for key in CONFIG_KEYS:
+        value = config.get(key)
+        if isinstance(value, (list, tuple)):
+            value = sorted(str(v) for v in value)
+        elif isinstance(value, dict):
+            value = {str(k): round(float(v), 3) for k, v in sorted(value.items())}
+        canonical[key] = value
+
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cosine(a: List[float], b: List[float]) -> float:
+    """Podobieństwo cosinusowe dwóch wektorów."""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _pack(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class AnalysisCache:
+    """
+    Cache wyników analiz w SQLite.
+
+    - kandydaci filtrowani w SQL po (config_hash, data_version, TTL),
+      podobieństwo zapytań liczone w Pythonie (kandydatów jest niewiele)
+    - wpisy ze starą wersją danych i przeterminowane są usuwane przy zapisie
+    - blokujące (embedding, SQLite) - wywoływać przez run_blocking
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        similarity_threshold: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        embedding_service: Any = None,
+        vector_store: Any = None
+    ):
+        """
+        Args:
+            path: Ścieżka do pliku SQLite (domyślnie settings.analysis_cache_path)
+            ttl_seconds: Czas ważności wyniku (domyślnie settings.analysis_cache_ttl_seconds)
+            similarity_threshold: Minimalne podobieństwo zapytań (domyślnie z settings)
+            max_entries: Maksymalna liczba wpisów (domyślnie settings.analysis_cache_max_entries)
+            embedding_service: Serwis embeddingów zapytań (domyślnie z bazy wektorowej)
+            vector_store: VectorStoreManager - źródło data_version (domyślnie singleton)
+        """
+        self.path = Path(path or settings.analysis_cache_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds or settings.analysis_cache_ttl_seconds
+        self.similarity_threshold = similarity_threshold or settings.analysis_cache_similarity_threshold
+        self.max_entries = max_entries or settings.analysis_cache_max_entries
+        self._embedding_service = embedding_service
+        self._vector_store = vector_store
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                config_hash TEXT NOT NULL,
+                data_version TEXT NOT NULL,
+                query TEXT NOT NULL,
+                query_norm TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                events BLOB NOT NULL,
+                result BLOB NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analyses_config ON analyses(config_hash, data_version)"
+        )
+        self._conn.commit()
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+        logger.info(f"AnalysisCache zainicjalizowany: {self.path}")
+
+    @property
+    def vector_store(self):
+        if self._vector_store is None:
+            from services.rag.vector_store import get_vector_store_manager
+            self._vector_store = get_vector_store_manager()
+        return self._vector_store
+
+    @property
+    def embedding_service(self):
+        if self._embedding_service is None:
+            self._embedding_service = self.vector_store.embedding_service
+        return self._embedding_service
+
+    def current_data_version(self) -> str:
+        """Aktualna wersja danych bazy wektorowej."""
+        return self.vector_store.data_version
+
+    def _embed(self, query_norm: str) -> List[float]:
+        return self.embedding_service.embed_query(query_norm)
+
+    def lookup(self, query: str, config: Dict[str, Any]) -> Optional[CachedAnalysis]:
+        """
+        Szuka wyniku dla zapytania podobnego do `query` z tą samą konfiguracją.
+
+        Returns:
+            CachedAnalysis lub None
+        """
+        query_norm = normalize_query(query)
+        key = config_hash(config)
+        min_created = time.time() - self.ttl_seconds
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT query, query_norm, embedding, events, result, created_at FROM analyses "
+                "WHERE config_hash = ? AND data_version = ? AND created_at >= ? "
+                "ORDER BY created_at DESC",
+                (key, self.current_data_version(), min_created)
+            ).fetchall()
+
+        if not rows:
+            self._misses += 1
+            return None
+
+        # Identyczne znormalizowane zapytanie - bez embeddingu
+        best = next((row for row in rows if row[1] == query_norm), None)
+        similarity = 1.0
+
+        if best is None:
+            embedding = self._embed(query_norm)
+            similarity = 0.0
+            for row in rows:
+                vector = array("f")
+                vector.frombytes(row[2])
+                score = _cosine(embedding, vector.tolist())
+                if score > similarity:
+                    best, similarity = row, score
+
+            if best is None or similarity < self.similarity_threshold:
+                self._misses += 1
+                return None
+
+        self._hits += 1
+        logger.info(f"Cache analiz: trafienie (podobieństwo {similarity:.3f}) dla '{query[:60]}'")
+        return CachedAnalysis(
+            query=best[0],
+            similarity=round(similarity, 4),
+            events=_unpack(best[3]),
+            result=_unpack(best[4]),
+            created_at=best[5],
+        )
+
+    def store(
+        self,
+        query: str,
+        config: Dict[str, Any],
+        events: List[Dict[str, Any]],
+        result: Dict[str, Any],
+        data_version: Optional[str] = None
+    ) -> None:
+        """
+        Zapisuje wynik analizy.
+
+        Args:
+            query: Zapytanie
+            config: Konfiguracja analizy
+            events: Eventy SSE sesji (kończące są pomijane)
+            result: Wynik analizy
+            data_version: Wersja danych z początku analizy (domyślnie aktualna)
+        """
+        if data_version is None:
+            data_version = self.current_data_version()
+        if data_version != self.current_data_version():
+            # Baza zmieniła się w trakcie analizy - wynik nieaktualny
+            logger.debug("Cache analiz: pominięto zapis (zmiana danych w trakcie analizy)")
+            return
+
+        query_norm = normalize_query(query)
+        key = config_hash(config)
+        embedding = self._embed(query_norm)
+        # Czasy etapów (timing) i pozycje w kolejce dotyczą oryginalnego przebiegu, nie odtworzenia
+        replay_events = [
+            {k: v for k, v in e.items() if k != "timing"}
+            for e in events
+            if e.get("type") not in SKIPPED_EVENT_TYPES
+            and e.get("queue_position") is None
+            and e.get("agent") != SYSTEM_AGENT
+        ]
+
+        with self._lock:
+            # Nowszy wynik zastępuje poprzedni dla tego samego zapytania (force_refresh)
+            self._conn.execute(
+                "DELETE FROM analyses WHERE config_hash = ? AND query_norm = ?",
+                (key, query_norm)
+            )
+            self._conn.execute(
+                "INSERT INTO analyses (config_hash, data_version, query, query_norm, embedding, "
+                "events, result, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, data_version, query, query_norm,
+                    array("f", embedding).tobytes(),
+                    _pack(replay_events), _pack(result), time.time(),
+                )
+            )
+            self._purge(data_version)
+            self._conn.commit()
+            self._stores += 1
+
+    def _purge(self, data_version: str) -> None:
+        """Usuwa wpisy przeterminowane, ze starą wersją danych i ponad limit (pod lockiem)."""
+        self._conn.execute(
+            "DELETE FROM analyses WHERE data_version != ? OR created_at < ?",
+            (data_version, time.time() - self.ttl_seconds)
+        )
+        self._conn.execute(
+            "DELETE FROM analyses WHERE id NOT IN ("
+            "SELECT id FROM analyses ORDER BY created_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki cache (hit/miss liczone w tym procesie)."""
+        with self._lock:
+            count, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(events) + LENGTH(result)), 0) FROM analyses"
+            ).fetchone()
+
+        total = self._hits + self._misses
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "size_bytes": size_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "similarity_threshold": self.similarity_threshold,
+            "hits": self._hits,
+            "misses": self._misses,
+            "stores": self._stores,
+            "hit_rate": round(self._hits / total, 3) if total > 0 else 0,
+        }
+
+    def clear(self) -> None:
+        """Czyści cały cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM analyses")
+            self._conn.commit()
+
+
+# Singleton instancja
+_analysis_cache: Optional[AnalysisCache] = None
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Zwraca singleton instancję AnalysisCache."""
+    global _analysis_cache
+    if _analysis_cache is None:
+        _analysis_cache = AnalysisCache()
+    return _analysis_cache
@@ -0,0 +1,194 @@
+"""
+Cache kontekstu Gemini (explicit context caching) dla promptów ze wspólnym prefiksem.
+
+Cztery prompty scenariuszy różnią się tylko krótkim zadaniem na końcu;
+raport, zapytanie i zasady są wspólne. Prefiks zapisywany jest raz jako
+cachedContent, a każde wywołanie wysyła już tylko zadanie - tokeny
+prefiksu są przetwarzane (i rozliczane) raz na analizę.
+
+Backendy (settings.scenario_context_cache_backend):
+- "gemini" - google.generativeai.caching, model dostaje cached_content
+- "fake"   - lokalny słownik; prefiks doklejany do promptu (testy, benchmarki)
+
+Wywołania są blokujące - przez run_blocking.
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+import datetime
+import itertools
+import logging
+import threading
+
+from core.config import settings
+from services.gemini_limiter import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedContext:
+    """Uchwyt do zapisanego prefiksu."""
+
+    name: str
+    model: str
+    tokens: int
+
+
+class ContextCache(ABC):
+    """Interfejs cache kontekstu."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "deleted": 0, "failed": 0, "cached_tokens": 0, "bound": 0}
+
+    @abstractmethod
+    def _create(self, model: str, content: str, ttl_seconds: int) -> CachedContext:
+        """Zapisuje prefiks w cache backendu."""
+
+    @abstractmethod
+    def _delete(self, name: str) -> None:
+        """Usuwa wpis z cache backendu."""
+
+    @abstractmethod
+    def bind(self, llm: Any, context: CachedContext, prompt: str) -> Tuple[Any, str]:
+        """
+        Przygotowuje wywołanie z prefiksem z cache.
+
+        Returns:
+            (model do wywołania, prompt bez prefiksu lub z doklejonym prefiksem)
+        """
+
+    def create(self, model: str, content: str, ttl_seconds: Optional[int] = None) -> Optional[CachedContext]:
+        """
+        Zapisuje prefiks; None gdy backend odmówi (np. za krótki prefiks, brak quoty).
+
+        Args:
+            model: Nazwa modelu (cache jest per model)
+            content: Wspólny prefiks promptów
+            ttl_seconds: Czas życia wpisu (domyślnie z settings)
+        """
+        try:
+            context = self._create(model, content, ttl_seconds or settings.scenario_context_cache_ttl_seconds)
+        except Exception as e:
+            with self._lock:
+                self._stats["failed"] += 1
+            logger.warning(f"Cache kontekstu niedostępny ({e}) - pełne prompty")
+            return None
+
+        with self._lock:
+            self._stats["created"] += 1
+            self._stats["cached_tokens"] += context.tokens
+        logger.info(f"Cache kontekstu: {context.name} ({context.tokens} tokenów)")
+        return context
+
+    def delete(self, context: CachedContext) -> None:
+        """Usuwa wpis (błąd tylko logowany - wpis i tak wygaśnie po TTL)."""
+        try:
+            self._delete(context.name)
+            with self._lock:
+                self._stats["deleted"] += 1
+        except Exception as e:
+            logger.warning(f"Nie udało się usunąć cache kontekstu {context.name}: {e}")
+
+    def _record_bind(self) -> None:
+        with self._lock:
+            self._stats["bound"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": type(self).__name__, **self._stats}
+
+
+class GeminiContextCache(ContextCache):
+    """Explicit context caching Gemini API (cachedContents)."""
+
+    def __init__(self):
+        super().__init__()
+        import google.generativeai as genai
+        genai.configure(api_key=settings.gemini_api_key)
+
+    def _create(self, model: str, content: str, ttl_seconds: int) -> CachedContext:
+        from google.generativeai import caching
+
+        model_name = model if model.startswith("models/") else f"models/{model}"
+        cached = caching.CachedContent.create(
+            model=model_name,
+            display_name="scenario-context",
+            contents=[content],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+        return CachedContext(
+            name=cached.name,
+            model=model_name,
+            tokens=cached.usage_metadata.total_token_count,
+        )
+
+    def _delete(self, name: str) -> None:
+        from google.generativeai import caching
+        caching.CachedContent.get(name).delete()
+
+    def bind(self, llm: Any, context: CachedContext, prompt: str) -> Tuple[Any, str]:
+        self._record_bind()
+        return llm.bind(cached_content=context.name), prompt
+
+
+class FakeContextCache(ContextCache):
+    """
+    Lokalna imitacja cache kontekstu.
+
+    Prefiks jest doklejany do promptu, więc model dostaje tę samą treść
+    co bez cache; liczniki pozwalają sprawdzić w testach i benchmarkach,
+    że ścieżka cache została użyta.
+    """
+
+    def __init__(self, min_tokens: int = 0):
+        super().__init__()
+        self.min_tokens = min_tokens
+        self._contents: Dict[str, str] = {}
+        self._ids = itertools.count(1)
+
+    def _create(self, model: str, content: str, ttl_seconds: int) -> CachedContext:
+        tokens = estimate_tokens(content)
+        if tokens < self.min_tokens:
+            raise ValueError(f"prefiks {tokens} tokenów < minimum {self.min_tokens}")
+        name = f"cachedContents/fake-{next(self._ids)}"
+        with self._lock:
+            self._contents[name] = content
+        return CachedContext(name=name, model=model, tokens=tokens)
+
+    def _delete(self, name: str) -> None:
+        with self._lock:
+            del self._contents[name]
+
+    def bind(self, llm: Any, context: CachedContext, prompt: str) -> Tuple[Any, str]:
+        self._record_bind()
+        with self._lock:
+            content = self._contents[context.name]
+        return llm, content + "\n\n" + prompt
+
+    @property
+    def active(self) -> int:
+        """Liczba niewygasłych (nieusuniętych) wpisów."""
+        with self._lock:
+            return len(self._contents)
+
+
+# Singleton instancja
+_context_cache: Optional[ContextCache] = None
+
+
+def get_context_cache() -> ContextCache:
+    """Zwraca singleton cache kontekstu (backend z settings)."""
+    global _context_cache
+    if _context_cache is None:
+        if settings.scenario_context_cache_backend == "fake":
+            _context_cache = FakeContextCache()
+        else:
+            _context_cache = GeminiContextCache()
+    return _context_cache
+
+
+def get_context_cache_stats() -> Optional[Dict[str, Any]]:
+    """Statystyki cache kontekstu (None, gdy jeszcze nieużywany - bez importu genai)."""
+    return _context_cache.get_stats() if _context_cache is not None else None
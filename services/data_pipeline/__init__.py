@@ -3,12 +3,19 @@ Data pipeline module - scraping i ingestion do ChromaDB.
 """
 
 from .scraper import scrape_all_sources, ScrapedDocument, SourceConfig, DocumentScraper
+from .rate_limit import HostRateLimiter, TokenBucket
 from .ingestion import ingest_documents
+from .streaming import StreamingIngestionPipeline, PipelineStats, run_streaming_ingestion
 
 __all__ = [
     "scrape_all_sources",
     "ScrapedDocument",
     "SourceConfig",
     "DocumentScraper",
-    "ingest_documents"
+    "HostRateLimiter",
+    "TokenBucket",
+    "ingest_documents",
+    "StreamingIngestionPipeline",
+    "PipelineStats",
+    "run_streaming_ingestion",
 ]
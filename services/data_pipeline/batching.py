@@ -0,0 +1,151 @@
+"""
+Batching embeddingów między dokumentami.
+
+Większość komunikatów prasowych daje 1-5 chunków, więc embedowanie per
+dokument oznacza setki małych requestów. EmbeddingBatcher zbiera chunki
+z wielu dokumentów do pełnych batchy (limit modelu), wysyła niepełny batch
+po flush_interval i uruchamia kilka batchy równolegle. Limit RPM/TPM
+egzekwuje wspólny limiter Gemini - batche idą z priorytetem BACKGROUND,
+więc nie blokują embeddingów zapytań z analiz.
+"""
+from typing import Awaitable, Callable, List, Optional, Set
+import asyncio
+import logging
+
+from core.config import settings
+from services.gemini_limiter import Priority, gemini_priority
+from services.rag.embeddings import EmbeddingService
+from services.rag.text_processor import ProcessedChunk
+
+logger = logging.getLogger(__name__)
+
+# Callback dla gotowego batcha: (chunki, embeddingi w tej samej kolejności)
+BatchHandler = Callable[[List[ProcessedChunk], List[List[float]]], Awaitable[None]]
+# Callback dla nieudanego batcha (błąd embeddingu lub on_batch)
+BatchErrorHandler = Callable[[List[ProcessedChunk]], Awaitable[None]]
+
+
+class EmbeddingBatcher:
+    """
+    Akumulator chunków do embedowania.
+
+    - batch wysyłany po osiągnięciu max_batch_size albo po flush_interval
+      od pierwszego oczekującego chunka
+    - do max_concurrent_batches batchy w locie; add() czeka na wolny slot
+      (backpressure dla producenta)
+    - requesty do API przez limiter Gemini z priorytetem BACKGROUND
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        on_batch: BatchHandler,
+        max_batch_size: Optional[int] = None,
+        flush_interval: float = 2.0,
+        max_concurrent_batches: Optional[int] = None,
+        on_error: Optional[BatchErrorHandler] = None
+    ):
+        """
+        Args:
+            embedding_service: Serwis embeddingów
+            on_batch: Korutyna wywoływana z (chunki, embeddingi) po każdym batchu
+            max_batch_size: Maksymalny rozmiar batcha (domyślnie settings.embedding_batch_size)
+            flush_interval: Maksymalny czas oczekiwania niepełnego batcha (sekundy)
+            max_concurrent_batches: Liczba równoległych batchy (domyślnie z settings)
+            on_error: Korutyna wywoływana z chunkami batcha, który się nie powiódł
+        """
+        self.embedding_service = embedding_service
+        self.on_batch = on_batch
+        self.on_error = on_error
+        self.max_batch_size = max_batch_size or settings.embedding_batch_size
+        self.flush_interval = flush_interval
+
+        max_concurrent_batches = max_concurrent_batches or settings.embedding_max_concurrent_batches
+        self._slots = asyncio.Semaphore(max_concurrent_batches)
+
+        self._pending: List[ProcessedChunk] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.chunks_embedded = 0
+        self.errors = 0
+
+    async def add(self, chunks: List[ProcessedChunk]) -> None:
+        """Dodaje chunki; pełne batche są wysyłane od razu."""
+        for chunk in chunks:
+            self._pending.append(chunk)
+            if len(self._pending) >= self.max_batch_size:
+                await self._flush()
+
+        if self._pending and self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def close(self) -> None:
+        """Wysyła resztę i czeka na zakończenie wszystkich batchy."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            await self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def _flush_later(self) -> None:
+        """Wysyła niepełny batch po flush_interval."""
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush()
+        finally:
+            if self._timer is asyncio.current_task():
+                self._timer = None
+
+    async def _flush(self) -> None:
+        """Wysyła oczekujące chunki jako jeden batch (czeka na wolny slot)."""
+        if not self._pending:
+            return
+
+        # Slot przed pobraniem chunków - anulowanie w trakcie czekania nic nie gubi
+        await self._slots.acquire()
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if not batch:
+            self._slots.release()
+            return
+
+        if (
+            not self._pending
+            and self._timer is not None
+            and self._timer is not asyncio.current_task()
+        ):
+            self._timer.cancel()
+            self._timer = None
+
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[ProcessedChunk]) -> None:
+        """Embeduje batch i przekazuje wynik do on_batch."""
+        try:
+            # to_thread kopiuje kontekst, więc priorytet obowiązuje w wątku
+            with gemini_priority(Priority.BACKGROUND):
+                embeddings = await asyncio.to_thread(
+                    self.embedding_service.embed_documents,
+                    [chunk.text for chunk in batch],
+                    len(batch)
+                )
+            await self.on_batch(batch, embeddings)
+
+            self.batches += 1
+            self.chunks_embedded += len(batch)
+            logger.debug(f"Batch embeddingów: {len(batch)} chunków")
+
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Błąd batcha embeddingów ({len(batch)} chunków): {e}")
+            if self.on_error is not None:
+                await self.on_error(batch)
+        finally:
+            self._slots.release()
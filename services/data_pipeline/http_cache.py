@@ -0,0 +1,185 @@
+"""
+Lokalny cache HTTP dla scrapera (SQLite).
+
+Przechowuje treść odpowiedzi i walidatory (ETag, Last-Modified), żeby kolejne
+uruchomienia pipeline'u wysyłały zapytania warunkowe (If-None-Match /
+If-Modified-Since) i pomijały niezmienione strony.
+"""
+from typing import Dict, Optional
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPage:
+    """Wpis cache dla jednego URL."""
+
+    url: str
+    body: str
+    body_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Nagłówki zapytania warunkowego dla tego wpisu."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HttpCache:
+    """
+    Cache stron HTTP w SQLite.
+
+    - treść kompresowana zlib
+    - body_hash pozwala wykryć niezmienioną stronę także u serwerów
+      bez ETag/Last-Modified (200 z identyczną treścią)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Ścieżka do pliku SQLite (domyślnie settings.http_cache_path)
+        """
+        self.path = Path(path or settings.http_cache_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB NOT NULL,
+                body_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+        logger.info(f"HttpCache zainicjalizowany: {self.path}")
+
+    @staticmethod
+    def body_hash(body: str) -> str:
+        """Hash treści strony."""
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Zwraca wpis dla URL lub None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body, body_hash, fetched_at FROM pages WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        etag, last_modified, body, body_hash, fetched_at = row
+        return CachedPage(
+            url=url,
+            body=zlib.decompress(body).decode("utf-8"),
+            body_hash=body_hash,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at,
+        )
+
+    def put(
+        self,
+        url: str,
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> CachedPage:
+        """Zapisuje (nadpisuje) wpis dla URL."""
+        return self.put_page(self.make_page(url, body, etag=etag, last_modified=last_modified))
+
+    @classmethod
+    def make_page(
+        cls,
+        url: str,
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> CachedPage:
+        """Tworzy wpis bez zapisu (do zatwierdzenia później przez put_page)."""
+        return CachedPage(
+            url=url,
+            body=body,
+            body_hash=cls.body_hash(body),
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=time.time(),
+        )
+
+    def put_page(self, page: CachedPage) -> CachedPage:
+        """Zapisuje (nadpisuje) gotowy wpis."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body, body_hash, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    page.url,
+                    page.etag,
+                    page.last_modified,
+                    zlib.compress(page.body.encode("utf-8")),
+                    page.body_hash,
+                    page.fetched_at,
+                )
+            )
+            self._conn.commit()
+
+        return page
+
+    def touch(self, url: str) -> None:
+        """Aktualizuje czas ostatniej walidacji (po 304)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET fetched_at = ? WHERE url = ?",
+                (time.time(), url)
+            )
+            self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """Zwraca statystyki cache."""
+        with self._lock:
+            count, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM pages"
+            ).fetchone()
+
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "size_bytes": size_bytes,
+        }
+
+    def clear(self) -> None:
+        """Czyści cały cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Zamyka połączenie z bazą."""
+        with self._lock:
+            self._conn.close()
@@ -5,79 +5,297 @@ Przetwarza zescrapowane dokumenty, dzieli na chunki, tworzy embeddingi
 i zapisuje do bazy wektorowej ChromaDB.
 """
 
-from typing import List
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, field
+import asyncio
 import logging
 import hashlib
 
-from services.rag.text_processor import DocumentProcessor
+from services.rag.text_processor import DocumentProcessor, ProcessedChunk
 from services.rag.vector_store import VectorStoreManager
 from schemas.schemas import DocumentMetadata, CredibilityScore, CredibilityLevel
+from .batching import EmbeddingBatcher
 from .scraper import ScrapedDocument
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class DocumentPlan:
+    """Plan zapisu jednego dokumentu (wynik porównania z bazą)."""
+
+    document_id: str
+    to_upsert: List[ProcessedChunk] = field(default_factory=list)
+    # Niezmienione chunki z nieaktualnym document_hash (tylko metadane)
+    to_refresh: List[ProcessedChunk] = field(default_factory=list)
+    to_delete: List[str] = field(default_factory=list)
+    unchanged_chunks: int = 0
+    # True gdy cały dokument jest w bazie w identycznej wersji
+    unchanged: bool = False
+
+
+def prepare_document(
+    doc: ScrapedDocument,
+    processor: DocumentProcessor,
+    vector_store: VectorStoreManager
+) -> DocumentPlan:
+    """
+    Chunkuje dokument i wyznacza różnicę względem ChromaDB.
+
+    Porównuje hashe nowych chunków z hashami zapisanymi w metadanych:
+    niezmieniony dokument jest pomijany bez chunkowania, do zapisu trafiają
+    tylko nowe/zmienione chunki, niezmienionym odświeżane są metadane
+    (document_hash), a chunki, które zniknęły, są do usunięcia.
+
+    Args:
+        doc: Zescrapowany dokument
+        processor: DocumentProcessor (chunking)
+        vector_store: Instancja VectorStoreManager
+
+    Returns:
+        DocumentPlan
+    """
+    # Twórz metadata
+    metadata = DocumentMetadata(
+        source=doc.source,
+        date=doc.date,
+        region=doc.region,
+        country=doc.country,
+        url=doc.url,
+        title=doc.title,
+        document_type=doc.document_type,
+        credibility=_evaluate_source_credibility(doc.source)
+    )
+    document_id = _generate_doc_id(doc.url)
+    manifest = vector_store.get_chunk_manifest(document_id)
+
+    # Szybka ścieżka: identyczny dokument jest już w bazie w komplecie
+    # (liczba chunków zgodna z total_chunks - brak chunków po przerwanym zapisie)
+    document_hash = processor.compute_document_hash(doc.content, metadata)
+    if manifest and all(
+        entry["document_hash"] == document_hash and entry.get("total_chunks") == len(manifest)
+        for entry in manifest.values()
+    ):
+        return DocumentPlan(
+            document_id=document_id,
+            unchanged_chunks=len(manifest),
+            unchanged=True
+        )
+
+    # Przetwarzaj dokument na chunki
+    chunks = processor.process_document(
+        content=doc.content,
+        metadata=metadata,
+        document_id=document_id
+    )
+
+    to_upsert, to_refresh, to_delete = _plan_document(chunks, manifest)
+    return DocumentPlan(
+        document_id=document_id,
+        to_upsert=to_upsert,
+        to_refresh=to_refresh,
+        to_delete=to_delete,
+        unchanged_chunks=len(chunks) - len(to_upsert)
+    )
+
+
+# Zatwierdzenie dokumentu: (dokument, plan) po zapisaniu wszystkich jego chunków
+CommitHandler = Callable[[ScrapedDocument, DocumentPlan], Awaitable[None]]
+
+
+@dataclass
+class _PendingDocument:
+    doc: ScrapedDocument
+    plan: DocumentPlan
+    remaining: Set[str]
+
+
+class DocumentCommits:
+    """
+    Śledzi zapis chunków per dokument i zatwierdza dokument po ostatnim batchu.
+
+    Usunięcie starych chunków i odświeżenie metadanych (nowy document_hash)
+    wolno wykonać dopiero, gdy wszystkie nowe chunki dokumentu są w bazie -
+    inaczej błąd batcha zostawia dokument niekompletny, a szybka ścieżka
+    prepare_document uznaje go za aktualny. Dokument z nieudanym batchem
+    nie jest zatwierdzany; kolejny przebieg wyznaczy plan od nowa.
+    """
+
+    def __init__(self, on_commit: CommitHandler):
+        """
+        Args:
+            on_commit: Korutyna zatwierdzająca dokument (usunięcia, odświeżenie metadanych)
+        """
+        self.on_commit = on_commit
+        self._pending: Dict[str, _PendingDocument] = {}
+        self.committed = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        """Liczba dokumentów czekających na zapis chunków."""
+        return len(self._pending)
+
+    async def add(self, doc: ScrapedDocument, plan: DocumentPlan) -> None:
+        """Rejestruje plan; dokument bez chunków do zapisu jest zatwierdzany od razu."""
+        if not plan.to_upsert:
+            await self._commit(doc, plan)
+            return
+        self._pending[plan.document_id] = _PendingDocument(
+            doc=doc,
+            plan=plan,
+            remaining={chunk.chunk_id for chunk in plan.to_upsert}
+        )
+
+    async def written(self, chunks: List[ProcessedChunk]) -> None:
+        """Oznacza chunki jako zapisane; zatwierdza dokumenty zapisane w całości."""
+        completed = []
+        for chunk in chunks:
+            entry = self._pending.get(chunk.document_id)
+            if entry is None:
+                continue
+            entry.remaining.discard(chunk.chunk_id)
+            if not entry.remaining:
+                completed.append(self._pending.pop(chunk.document_id))
+
+        for entry in completed:
+            await self._commit(entry.doc, entry.plan)
+
+    async def failed_batch(self, chunks: List[ProcessedChunk]) -> None:
+        """Porzuca dokumenty, których chunki nie zostały zapisane."""
+        for document_id in {chunk.document_id for chunk in chunks}:
+            entry = self._pending.pop(document_id, None)
+            if entry is not None:
+                self.failed += 1
+                logger.warning(f"Dokument niezatwierdzony (błąd zapisu chunków): {entry.doc.url}")
+
+    async def _commit(self, doc: ScrapedDocument, plan: DocumentPlan) -> None:
+        try:
+            await self.on_commit(doc, plan)
+            self.committed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Błąd zatwierdzania dokumentu {doc.url}: {e}")
+
+
 async def ingest_documents(
     documents: List[ScrapedDocument],
     vector_store: VectorStoreManager,
-    batch_size: int = 50
+    batch_size: Optional[int] = None
 ) -> int:
     """
-    Ingestuje dokumenty do ChromaDB.
+    Ingestuje dokumenty do ChromaDB (przyrostowo).
+
+    Embedowane i zapisywane są tylko nowe/zmienione chunki
+    (patrz prepare_document). Chunki z wielu dokumentów są łączone w pełne
+    batche embeddingów (EmbeddingBatcher); usunięcie starych chunków
+    i odświeżenie metadanych następuje po zapisie wszystkich chunków
+    dokumentu (DocumentCommits).
 
     Args:
         documents: Lista zescrapowanych dokumentów
         vector_store: Instancja VectorStoreManager
-        batch_size: Rozmiar batcha dla dodawania chunków
+        batch_size: Rozmiar batcha embeddingów (domyślnie settings.embedding_batch_size)
 
     Returns:
-        Liczba dodanych chunków
+        Liczba dodanych/zaktualizowanych chunków
     """
     processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
     total_chunks = 0
+    unchanged_docs = 0
+    unchanged_chunks = 0
+    deleted_chunks = 0
+
+    async def commit_document(doc: ScrapedDocument, plan: DocumentPlan) -> None:
+        nonlocal deleted_chunks
+        if plan.to_delete:
+            deleted_chunks += await asyncio.to_thread(vector_store.delete_chunks, plan.to_delete)
+        if plan.to_refresh:
+            await asyncio.to_thread(vector_store.update_chunk_metadata, plan.to_refresh)
+
+    commits = DocumentCommits(commit_document)
+
+    async def write_batch(chunks: List[ProcessedChunk], embeddings: List[List[float]]) -> None:
+        nonlocal total_chunks
+        total_chunks += await asyncio.to_thread(vector_store.upsert_chunks, chunks, embeddings)
+        await commits.written(chunks)
+
+    batcher = EmbeddingBatcher(
+        vector_store.embedding_service,
+        on_batch=write_batch,
+        max_batch_size=batch_size,
+        on_error=commits.failed_batch
+    )
 
     logger.info(f"Rozpoczynam ingestion {len(documents)} dokumentów...")
 
-    for idx, doc in enumerate(documents, 1):
-        try:
-            # Twórz metadata
-            metadata = DocumentMetadata(
-                source=doc.source,
-                date=doc.date,
-                region=doc.region,
-                country=doc.country,
-                url=doc.url,
-                title=doc.title,
-                document_type=doc.document_type,
-                credibility=_evaluate_source_credibility(doc.source)
-            )
-
-            # Przetwarzaj dokument na chunki
-            chunks = processor.process_document(
-                content=doc.content,
-                metadata=metadata,
-                document_id=_generate_doc_id(doc.url)
-            )
-
-            if chunks:
-                # Dodaj do ChromaDB
-                added = vector_store.add_chunks(
-                    chunks,
-                    batch_size=batch_size
-                )
-                total_chunks += added
-                logger.debug(f"[{idx}/{len(documents)}] Dodano {added} chunków: {doc.title[:50]}...")
-            else:
-                logger.warning(f"[{idx}/{len(documents)}] Brak chunków dla: {doc.url}")
+    try:
+        for idx, doc in enumerate(documents, 1):
+            try:
+                plan = await asyncio.to_thread(prepare_document, doc, processor, vector_store)
+                unchanged_chunks += plan.unchanged_chunks
 
-        except Exception as e:
-            logger.error(f"Błąd ingestion dokumentu {doc.url}: {e}")
-            continue
+                if plan.unchanged:
+                    unchanged_docs += 1
+                    logger.debug(f"[{idx}/{len(documents)}] Bez zmian: {doc.title[:50]}...")
+                    continue
+
+                if not plan.to_upsert and not plan.unchanged_chunks:
+                    logger.warning(f"[{idx}/{len(documents)}] Brak chunków dla: {doc.url}")
+
+                await commits.add(doc, plan)
+                if plan.to_upsert:
+                    await batcher.add(plan.to_upsert)
+                    logger.debug(
+                        f"[{idx}/{len(documents)}] Do zapisu {len(plan.to_upsert)} chunków "
+                        f"(usunięto {len(plan.to_delete)}): {doc.title[:50]}..."
+                    )
+
+            except Exception as e:
+                logger.error(f"Błąd ingestion dokumentu {doc.url}: {e}")
+                continue
+    finally:
+        await batcher.close()
 
-    logger.info(f"Ingestion zakończona. Dodano {total_chunks} chunków.")
+    logger.info(
+        f"Ingestion zakończona. Dodano/zaktualizowano {total_chunks} chunków "
+        f"w {batcher.batches} batchach, bez zmian: {unchanged_chunks} chunków "
+        f"({unchanged_docs} dokumentów), usunięto: {deleted_chunks}, "
+        f"niezatwierdzone dokumenty: {commits.failed + commits.pending}."
+    )
     return total_chunks
 
 
+def _plan_document(
+    chunks: List[ProcessedChunk],
+    manifest: Dict[str, Dict[str, str]]
+) -> Tuple[List[ProcessedChunk], List[ProcessedChunk], List[str]]:
+    """
+    Porównuje nowe chunki z zapisanymi w bazie.
+
+    Args:
+        chunks: Chunki po przetworzeniu aktualnej wersji dokumentu
+        manifest: chunk_id -> hashe zapisane w ChromaDB (get_chunk_manifest)
+
+    Returns:
+        (chunki do embedowania i zapisu, chunki do odświeżenia metadanych,
+        ID chunków do usunięcia)
+    """
+    to_upsert = []
+    to_refresh = []
+    for chunk in chunks:
+        stored = manifest.get(chunk.chunk_id, {})
+        if stored.get("content_hash") != chunk.metadata.get("content_hash"):
+            to_upsert.append(chunk)
+        elif stored.get("document_hash") != chunk.metadata.get("document_hash"):
+            to_refresh.append(chunk)
+
+    current_ids = {chunk.chunk_id for chunk in chunks}
+    to_delete = [chunk_id for chunk_id in manifest if chunk_id not in current_ids]
+
+    return to_upsert, to_refresh, to_delete
+
+
 def _generate_doc_id(url: str) -> str:
     """
     Generuje unikalny ID dokumentu z URL.
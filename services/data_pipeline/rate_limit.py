@@ -0,0 +1,80 @@
+"""
+Rate limiting dla pipeline'u danych (asyncio).
+
+TokenBucket - ogólny limiter (np. requesty/min do API embeddingów),
+HostRateLimiter - osobny bucket per host dla scrapera.
+"""
+from typing import Any, Dict
+from urllib.parse import urlparse
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket (asyncio) - `rate` tokenów na sekundę, pojemność `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        # Lock trzymany podczas czekania = kolejka FIFO dla oczekujących
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> float:
+        """Pobiera token, czekając jeśli trzeba. Zwraca czas oczekiwania (s)."""
+        waited = 0.0
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+
+class HostRateLimiter:
+    """
+    Rate limiting per host (domena).
+
+    Każdy host ma własny token bucket, więc różne domeny są scrapowane
+    równolegle, a źródła współdzielące host (np. www.gov.uk) dzielą limit.
+    """
+
+    def __init__(self, min_interval: float = 1.5, burst: int = 1):
+        """
+        Args:
+            min_interval: Minimalny odstęp między requestami do jednego hosta (sekundy)
+            burst: Liczba requestów, które mogą pójść bez czekania
+        """
+        self.min_interval = min_interval
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._wait_time: Dict[str, float] = {}
+
+    async def acquire(self, url: str) -> None:
+        """Czeka na pozwolenie na request do hosta z URL."""
+        if self.min_interval <= 0:
+            return
+
+        host = urlparse(url).netloc.lower()
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = TokenBucket(rate=1 / self.min_interval, burst=self.burst)
+            self._buckets[host] = bucket
+
+        waited = await bucket.acquire()
+        self._wait_time[host] = self._wait_time.get(host, 0.0) + waited
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Zwraca statystyki oczekiwania per host."""
+        return {
+            "hosts": len(self._buckets),
+            "wait_seconds": {host: round(w, 1) for host, w in self._wait_time.items()},
+        }
@@ -5,10 +5,11 @@ Obsługuje: NATO.int, EC.europa.eu, US State Department, UK FCDO
 + źródła z organisations.json (ministerstwa krajowe)
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlparse
 import asyncio
 import json
 import httpx
@@ -17,6 +18,10 @@ import trafilatura
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
 
+from core.config import settings
+from .http_cache import CachedPage, HttpCache
+from .rate_limit import HostRateLimiter
+
 logger = logging.getLogger(__name__)
 
 # Ścieżka do pliku konfiguracji ministerstw
@@ -35,6 +40,8 @@ class ScrapedDocument:
     country: Optional[str] = None
     document_type: str = "article"  # "report", "statement", "article"
     metadata: Dict[str, Any] = field(default_factory=dict)
+    # Wpis cache HTTP do zapisania po udanym ingestion (defer_document_cache)
+    http_page: Optional[CachedPage] = None
 
 
 class SourceConfig:
@@ -426,17 +433,51 @@ class SourceConfig:
         return hardcoded + from_json
 
 
+@dataclass
+class FetchResult:
+    """Wynik pobrania strony (z uwzględnieniem cache HTTP)."""
+
+    html: Optional[str]
+    # True gdy strona nie zmieniła się od poprzedniego pobrania (304 lub identyczna treść)
+    not_modified: bool = False
+    # Niezapisany wpis cache (fetch z defer_cache=True)
+    page: Optional[CachedPage] = None
+
+
 class DocumentScraper:
-    """Główna klasa scrapera z retry logic i rate limiting."""
+    """Główna klasa scrapera z retry logic i rate limiting per host."""
 
-    def __init__(self, timeout: int = 30, rate_limit_delay: float = 1.5):
+    def __init__(
+        self,
+        timeout: int = 30,
+        rate_limit_delay: float = 1.5,
+        max_concurrency: int = 8,
+        use_http_cache: Optional[bool] = None,
+        defer_document_cache: bool = False
+    ):
         """
         Args:
             timeout: Timeout dla requestów HTTP (sekundy)
-            rate_limit_delay: Opóźnienie między requestami (sekundy)
+            rate_limit_delay: Minimalny odstęp między requestami do jednego hosta (sekundy)
+            max_concurrency: Maksymalna liczba równoległych requestów (globalnie)
+            use_http_cache: Czy używać cache HTTP (domyślnie settings.http_cache_enabled)
+            defer_document_cache: Wpis cache stron dokumentów nie jest zapisywany
+                przy pobraniu, tylko przekazywany w ScrapedDocument.http_page -
+                konsument zapisuje go po udanym ingestion. Tylko w tym trybie
+                niezmienione strony są pomijane (wpis w cache oznacza wtedy,
+                że dokument jest w bazie); bez niego są przetwarzane normalnie.
         """
         self.timeout = timeout
         self.rate_limit_delay = rate_limit_delay
+        self.rate_limiter = HostRateLimiter(min_interval=rate_limit_delay)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+        if use_http_cache is None:
+            use_http_cache = settings.http_cache_enabled
+        self.http_cache: Optional[HttpCache] = HttpCache() if use_http_cache else None
+        self.defer_document_cache = defer_document_cache
+        # source_code -> {"requests", "not_modified", "downloaded"}
+        self.cache_stats: Dict[str, Dict[str, int]] = {}
         self.client = httpx.AsyncClient(
             timeout=timeout,
             follow_redirects=True,
@@ -445,39 +486,123 @@ class DocumentScraper:
             }
         )
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10))
-    async def fetch_url(self, url: str) -> Optional[str]:
+    async def fetch_url(self, url: str, source_code: str = "") -> Optional[str]:
         """
-        Pobiera HTML z retry logic.
+        Pobiera HTML (z cache HTTP, jeśli włączony).
 
         Args:
             url: URL do pobrania
+            source_code: Kod źródła (do statystyk cache)
 
         Returns:
             HTML jako string lub None jeśli błąd
         """
+        result = await self.fetch(url, source_code)
+        return result.html
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(min=2, max=10))
+    async def fetch(self, url: str, source_code: str = "", defer_cache: bool = False) -> FetchResult:
+        """
+        Pobiera stronę z retry logic i zapytaniem warunkowym.
+
+        Gdy strona jest w cache, wysyła If-None-Match/If-Modified-Since.
+        Przy 304 (lub 200 z identyczną treścią) zwraca treść z cache
+        z flagą not_modified=True.
+
+        Args:
+            url: URL do pobrania
+            source_code: Kod źródła (do statystyk cache)
+            defer_cache: Nie zapisuj nowego wpisu - zwróć go w FetchResult.page
+
+        Returns:
+            FetchResult (html=None jeśli błąd)
+        """
+        cached = self.http_cache.get(url) if self.http_cache else None
+        headers = cached.conditional_headers() if cached else {}
+
         try:
-            response = await self.client.get(url)
+            # Najpierw limit hosta, potem globalny slot - czekanie na host nie blokuje innych
+            await self.rate_limiter.acquire(url)
+            async with self._semaphore:
+                response = await self.client.get(url, headers=headers)
+
+            if response.status_code == 304 and cached:
+                self.http_cache.touch(url)
+                self._record_fetch(source_code, not_modified=True)
+                return FetchResult(html=cached.body, not_modified=True)
+
             response.raise_for_status()
-            return response.text
+            html = response.text
         except httpx.HTTPError as e:
             logger.warning(f"Błąd HTTP dla {url}: {e}")
-            return None
+            return FetchResult(html=None)
         except Exception as e:
             logger.error(f"Nieoczekiwany błąd dla {url}: {e}")
-            return None
+            return FetchResult(html=None)
 
-    async def scrape_source(self, source_config: Dict[str, Any]) -> List[ScrapedDocument]:
+        if not self.http_cache:
+            return FetchResult(html=html)
+
+        # Serwery bez walidatorów: porównaj treść
+        not_modified = cached is not None and cached.body_hash == HttpCache.body_hash(html)
+        page = HttpCache.make_page(
+            url,
+            html,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+        )
+        self._record_fetch(source_code, not_modified=not_modified)
+        if defer_cache and not not_modified:
+            return FetchResult(html=html, not_modified=not_modified, page=page)
+        self.http_cache.put_page(page)
+        return FetchResult(html=html, not_modified=not_modified)
+
+    def _record_fetch(self, source_code: str, not_modified: bool) -> None:
+        """Aktualizuje statystyki cache dla źródła."""
+        stats = self.cache_stats.setdefault(
+            source_code or "unknown",
+            {"requests": 0, "not_modified": 0, "downloaded": 0}
+        )
+        stats["requests"] += 1
+        if not_modified:
+            stats["not_modified"] += 1
+        else:
+            stats["downloaded"] += 1
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Zwraca statystyki cache HTTP per źródło.
+
+        Returns:
+            source_code -> {"requests", "not_modified", "downloaded", "hit_rate"}
+        """
+        return {
+            source: {
+                **stats,
+                "hit_rate": round(stats["not_modified"] / stats["requests"], 3) if stats["requests"] else 0,
+            }
+            for source, stats in self.cache_stats.items()
+        }
+
+    async def scrape_source(
+        self,
+        source_config: Dict[str, Any],
+        on_document: Optional[Callable[[ScrapedDocument], Awaitable[None]]] = None
+    ) -> List[ScrapedDocument]:
         """
         Scrapuje dokumenty z jednego źródła.
 
         Args:
             source_config: Konfiguracja źródła (z SourceConfig)
+            on_document: Opcjonalny callback wywoływany od razu po zescrapowaniu
+                dokumentu (np. wstawienie do kolejki pipeline'u - backpressure)
 
         Returns:
-            Lista zescrapowanych dokumentów
+            Lista zescrapowanych dokumentów (pusta, gdy podano on_document -
+            dokumenty są wtedy tylko przekazywane do callbacku)
         """
         documents = []
+        scraped_count = 0
         base_url = source_config["base_url"]
         max_documents = source_config.get("max_documents", 30)
 
@@ -487,7 +612,7 @@ class DocumentScraper:
             listing_url = f"{base_url}{search_path}"
             logger.info(f"Pobieram listing: {listing_url}")
 
-            html = await self.fetch_url(listing_url)
+            html = await self.fetch_url(listing_url, source_config["source_code"])
             if not html:
                 logger.warning(f"Nie udało się pobrać {listing_url}")
                 continue
@@ -505,19 +630,30 @@ class DocumentScraper:
             for article_url in article_urls[:max_documents]:
                 doc = await self._scrape_single_document(article_url, source_config)
                 if doc:
-                    documents.append(doc)
+                    scraped_count += 1
                     logger.debug(f"Zescrapowano: {doc.title[:60]}...")
+                    if on_document is not None:
+                        await on_document(doc)
+                    else:
+                        documents.append(doc)
 
-                # Rate limiting
-                await asyncio.sleep(self.rate_limit_delay)
-
-                if len(documents) >= max_documents:
+                if scraped_count >= max_documents:
                     break
 
-            if len(documents) >= max_documents:
+            if scraped_count >= max_documents:
                 break
 
-        logger.info(f"Zakończono scraping {source_config['source_code']}: {len(documents)} dokumentów")
+        cache_info = ""
+        source_stats = self.get_cache_stats().get(source_config["source_code"])
+        if self.http_cache and source_stats:
+            cache_info = (
+                f" (cache HTTP: {source_stats['not_modified']}/{source_stats['requests']} "
+                f"bez zmian, hit rate {source_stats['hit_rate']:.0%})"
+            )
+
+        logger.info(
+            f"Zakończono scraping {source_config['source_code']}: {scraped_count} dokumentów{cache_info}"
+        )
         return documents
 
     async def _scrape_single_document(
@@ -528,17 +664,27 @@ class DocumentScraper:
         """
         Scrapuje pojedynczy dokument używając trafilatura.
 
+        Niezmienione strony (304 / identyczna treść) są pomijane bez
+        ekstrakcji w trybie defer_document_cache - wpis w cache istnieje
+        wtedy tylko dla stron zapisanych w bazie (lub odrzuconych).
+
         Args:
             url: URL dokumentu
             config: Konfiguracja źródła
 
         Returns:
-            ScrapedDocument lub None jeśli błąd
+            ScrapedDocument lub None jeśli błąd lub strona bez zmian
         """
-        html = await self.fetch_url(url)
-        if not html:
+        result = await self.fetch(url, config["source_code"], defer_cache=self.defer_document_cache)
+        if not result.html:
+            return None
+
+        if result.not_modified and self.defer_document_cache:
+            logger.debug(f"Bez zmian od ostatniego pobrania: {url}")
             return None
 
+        html = result.html
+
         # Ekstrakcja treści przez trafilatura
         content = trafilatura.extract(
             html,
@@ -550,6 +696,7 @@ class DocumentScraper:
 
         if not content or len(content) < 200:
             logger.debug(f"Za krótki content dla {url}: {len(content) if content else 0} znaków")
+            self._store_rejected_page(result)
             return None
 
         # Parsowanie metadanych
@@ -566,6 +713,7 @@ class DocumentScraper:
                     year = int(year_str)
                     if year < 2021:
                         logger.debug(f"Pominięto stary dokument (rok {year}): {url}")
+                        self._store_rejected_page(result)
                         return None
             except Exception as e:
                 logger.debug(f"Nie udało się sparsować daty '{date_str}' dla {url}: {e}")
@@ -586,9 +734,15 @@ class DocumentScraper:
             metadata={
                 "scraped_at": datetime.now().isoformat(),
                 "base_url": config["base_url"]
-            }
+            },
+            http_page=result.page
         )
 
+    def _store_rejected_page(self, result: FetchResult) -> None:
+        """Zapisuje od razu wpis cache strony odrzuconej przed ingestion (nie trafi do bazy)."""
+        if result.page is not None and self.http_cache:
+            self.http_cache.put_page(result.page)
+
     def _extract_article_urls(
         self,
         html: str,
@@ -610,7 +764,6 @@ class DocumentScraper:
         urls = set()
 
         # Wyciągnij bazową domenę do walidacji
-        from urllib.parse import urlparse
         parsed_base = urlparse(base_url)
         base_domain = f"{parsed_base.scheme}://{parsed_base.netloc}"
 
@@ -700,21 +853,42 @@ class DocumentScraper:
         return "article"
 
     async def close(self):
-        """Zamyka HTTP client."""
+        """Zamyka HTTP client i cache."""
         await self.client.aclose()
+        if self.http_cache:
+            self.http_cache.close()
 
 
-async def scrape_all_sources(include_json_sources: bool = True) -> List[ScrapedDocument]:
+async def scrape_all_sources(
+    include_json_sources: bool = True,
+    max_concurrency: int = 8,
+    use_http_cache: Optional[bool] = None,
+    on_document: Optional[Callable[[ScrapedDocument], Awaitable[None]]] = None,
+    defer_document_cache: bool = False
+) -> List[ScrapedDocument]:
     """
-    Scrapuje wszystkie skonfigurowane źródła.
+    Scrapuje wszystkie skonfigurowane źródła równolegle.
+
+    Źródła są przetwarzane współbieżnie; odstęp między requestami jest
+    pilnowany per host (HostRateLimiter), a liczba równoległych requestów
+    ograniczona globalnie. Czas całości ≈ czas najwolniejszego hosta.
 
     Args:
         include_json_sources: Czy uwzględnić źródła z organisations.json
+        max_concurrency: Maksymalna liczba równoległych requestów HTTP
+        use_http_cache: Czy używać cache HTTP (domyślnie z settings)
+        on_document: Callback dla każdego dokumentu (tryb strumieniowy -
+            dokumenty nie są wtedy zbierane w liście)
+        defer_document_cache: Zapis cache stron dokumentów po ingestion (patrz DocumentScraper)
 
     Returns:
-        Lista wszystkich zescrapowanych dokumentów
+        Lista wszystkich zescrapowanych (nowych lub zmienionych) dokumentów
     """
-    scraper = DocumentScraper()
+    scraper = DocumentScraper(
+        max_concurrency=max_concurrency,
+        use_http_cache=use_http_cache,
+        defer_document_cache=defer_document_cache
+    )
 
     if include_json_sources:
         sources = SourceConfig.get_all_sources()
@@ -725,36 +899,66 @@ async def scrape_all_sources(include_json_sources: bool = True) -> List[ScrapedD
             SourceConfig.US_STATE
         ]
 
-    all_documents = []
-
     logger.info(f"Rozpoczynam scrapowanie {len(sources)} źródeł...")
 
-    for source in sources:
+    async def _scrape(source: Dict[str, Any]) -> List[ScrapedDocument]:
         try:
-            docs = await scraper.scrape_source(source)
-            all_documents.extend(docs)
-            logger.info(f"✓ {source['source_code']}: {len(docs)} dokumentów")
+            docs = await scraper.scrape_source(source, on_document=on_document)
+            if on_document is None:
+                logger.info(f"✓ {source['source_code']}: {len(docs)} dokumentów")
+            return docs
         except Exception as e:
             logger.error(f"✗ Błąd scrapowania {source['source_code']}: {e}")
-            continue
+            return []
 
-    await scraper.close()
+    try:
+        results = await asyncio.gather(*(_scrape(source) for source in sources))
+    finally:
+        await scraper.close()
 
-    logger.info(f"Łącznie zescrapowano {len(all_documents)} dokumentów z {len(sources)} źródeł")
+    all_documents = [doc for docs in results for doc in docs]
+
+    if on_document is None:
+        logger.info(f"Łącznie zescrapowano {len(all_documents)} dokumentów z {len(sources)} źródeł")
+    logger.debug(f"Rate limiting per host: {scraper.rate_limiter.get_stats()}")
+    _log_cache_summary(scraper)
     return all_documents
 
 
-async def scrape_single_source(source_code: str) -> List[ScrapedDocument]:
+def _log_cache_summary(scraper: DocumentScraper) -> None:
+    """Loguje łączny hit rate cache HTTP."""
+    if not scraper.http_cache:
+        return
+
+    stats = scraper.get_cache_stats()
+    requests = sum(s["requests"] for s in stats.values())
+    not_modified = sum(s["not_modified"] for s in stats.values())
+    if requests:
+        logger.info(
+            f"Cache HTTP: {not_modified}/{requests} stron bez zmian "
+            f"({not_modified / requests:.0%}) w {len(stats)} źródłach"
+        )
+
+
+async def scrape_single_source(
+    source_code: str,
+    use_http_cache: Optional[bool] = None,
+    on_document: Optional[Callable[[ScrapedDocument], Awaitable[None]]] = None,
+    defer_document_cache: bool = False
+) -> List[ScrapedDocument]:
     """
     Scrapuje pojedyncze źródło po kodzie.
 
     Args:
         source_code: Kod źródła (np. "NATO", "DE_MAE")
+        use_http_cache: Czy używać cache HTTP (domyślnie z settings)
+        on_document: Callback dla każdego dokumentu (tryb strumieniowy)
+        defer_document_cache: Zapis cache stron dokumentów po ingestion (patrz DocumentScraper)
 
     Returns:
         Lista zescrapowanych dokumentów
     """
-    scraper = DocumentScraper()
+    scraper = DocumentScraper(use_http_cache=use_http_cache, defer_document_cache=defer_document_cache)
     all_sources = SourceConfig.get_all_sources()
 
     source = next((s for s in all_sources if s["source_code"] == source_code), None)
@@ -764,8 +968,9 @@ async def scrape_single_source(source_code: str) -> List[ScrapedDocument]:
         return []
 
     try:
-        docs = await scraper.scrape_source(source)
-        logger.info(f"Zescrapowano {len(docs)} dokumentów z {source_code}")
+        docs = await scraper.scrape_source(source, on_document=on_document)
+        if on_document is None:
+            logger.info(f"Zescrapowano {len(docs)} dokumentów z {source_code}")
     except Exception as e:
         logger.error(f"Błąd scrapowania {source_code}: {e}")
         docs = []
@@ -0,0 +1,294 @@
+"""
+Strumieniowy pipeline ingestion: scraping → chunking → embedding → upsert.
+
+Etapy połączone ograniczonymi kolejkami asyncio (backpressure): gdy zapis
+lub embedding nie nadąża, scraper czeka na miejsce w kolejce zamiast
+zbierać cały korpus w pamięci. Dokumenty trafiają do ChromaDB partiami
+kilka sekund po pobraniu, a przerwanie w połowie nie traci już zapisanych
+wyników.
+"""
+from typing import Any, Awaitable, Callable, List, Optional
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import time
+
+from core.config import settings
+from services.rag.text_processor import DocumentProcessor, ProcessedChunk
+from services.rag.vector_store import VectorStoreManager
+from .batching import EmbeddingBatcher
+from .http_cache import HttpCache
+from .ingestion import DocumentCommits, DocumentPlan, prepare_document
+from .scraper import ScrapedDocument, scrape_all_sources, scrape_single_source
+
+logger = logging.getLogger(__name__)
+
+# Znacznik końca strumienia w kolejkach
+_DONE = object()
+
+# Producent dokumentów: dostaje callback i woła go dla każdego dokumentu
+DocumentProducer = Callable[[Callable[[ScrapedDocument], Awaitable[None]]], Awaitable[Any]]
+
+
+@dataclass
+class PipelineStats:
+    """Statystyki przebiegu pipeline'u."""
+
+    documents_scraped: int = 0
+    documents_unchanged: int = 0
+    chunks_upserted: int = 0
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
+    # Dokumenty, których chunki nie zostały zapisane w całości (bez usunięć i odświeżenia)
+    documents_uncommitted: int = 0
+    embedding_batches: int = 0
+    errors: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+    # Czas od startu do pierwszego zapisu w ChromaDB (sekundy)
+    first_write_after: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        """Konwertuje statystyki do słownika."""
+        return {
+            "documents_scraped": self.documents_scraped,
+            "documents_unchanged": self.documents_unchanged,
+            "chunks_upserted": self.chunks_upserted,
+            "chunks_unchanged": self.chunks_unchanged,
+            "chunks_deleted": self.chunks_deleted,
+            "documents_uncommitted": self.documents_uncommitted,
+            "embedding_batches": self.embedding_batches,
+            "errors": self.errors,
+            "first_write_after": round(self.first_write_after, 1) if self.first_write_after else None,
+            "elapsed": round(time.monotonic() - self.started_at, 1),
+        }
+
+
+@dataclass
+class _WriteTask:
+    """Zadanie dla etapu zapisu."""
+
+    chunks: List[ProcessedChunk] = field(default_factory=list)
+    embeddings: List[List[float]] = field(default_factory=list)
+
+
+class StreamingIngestionPipeline:
+    """
+    Pipeline z ograniczonymi kolejkami między etapami.
+
+    - producent (scraper) → doc_queue
+    - N workerów chunkujących (prepare_document - diff z bazą) → chunk_queue
+    - worker embeddingów: EmbeddingBatcher (pełne batche albo flush po
+      flush_interval, kilka batchy równolegle pod limitem RPM)
+    - writer: upsert w ChromaDB; po zapisie ostatniego chunka dokumentu
+      usunięcie jego starych chunków i odświeżenie metadanych (DocumentCommits)
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStoreManager,
+        chunk_workers: int = 2,
+        queue_size: int = 64,
+        embed_batch_size: Optional[int] = None,
+        flush_interval: float = 2.0,
+        http_cache: Optional[HttpCache] = None
+    ):
+        """
+        Args:
+            vector_store: Instancja VectorStoreManager
+            chunk_workers: Liczba workerów chunkujących
+            queue_size: Pojemność każdej kolejki (backpressure)
+            embed_batch_size: Maksymalny rozmiar batcha embeddingów (domyślnie z settings)
+            flush_interval: Maksymalny czas czekania na zapełnienie batcha (sekundy)
+            http_cache: Cache HTTP - wpisy stron (ScrapedDocument.http_page) są
+                zapisywane dopiero po zatwierdzeniu dokumentu
+        """
+        self.vector_store = vector_store
+        self.processor = DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+        self.chunk_workers = chunk_workers
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.flush_interval = flush_interval
+        self.http_cache = http_cache
+        self.stats = PipelineStats()
+
+    async def run(self, producer: DocumentProducer) -> PipelineStats:
+        """
+        Uruchamia pipeline.
+
+        Args:
+            producer: Korutyna scrapująca, np.
+                lambda on_document: scrape_all_sources(on_document=on_document)
+
+        Returns:
+            PipelineStats
+        """
+        self.stats = PipelineStats()
+        self._doc_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size * 4)
+        self._write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._commits = DocumentCommits(self._commit_document)
+
+        chunkers = [asyncio.create_task(self._chunk_worker()) for _ in range(self.chunk_workers)]
+        embedder = asyncio.create_task(self._embed_worker())
+        writer = asyncio.create_task(self._write_worker())
+
+        try:
+            await producer(self._on_document)
+        except Exception as e:
+            logger.error(f"Błąd producenta dokumentów: {e}")
+            self.stats.errors += 1
+        finally:
+            # Zamykanie etapów po kolei - każdy kończy po opróżnieniu swojej kolejki
+            for _ in chunkers:
+                await self._doc_queue.put(_DONE)
+            await asyncio.gather(*chunkers)
+            await self._chunk_queue.put(_DONE)
+            await embedder
+            await writer
+            self.stats.documents_uncommitted = self._commits.failed + self._commits.pending
+
+        logger.info(f"Pipeline zakończony: {self.stats.to_dict()}")
+        return self.stats
+
+    async def _on_document(self, doc: ScrapedDocument) -> None:
+        """Callback producenta - czeka, gdy kolejka jest pełna."""
+        self.stats.documents_scraped += 1
+        await self._doc_queue.put(doc)
+
+    async def _chunk_worker(self) -> None:
+        """Chunkuje dokumenty i wyznacza różnicę względem bazy."""
+        while True:
+            doc = await self._doc_queue.get()
+            if doc is _DONE:
+                return
+
+            try:
+                plan = await asyncio.to_thread(
+                    prepare_document, doc, self.processor, self.vector_store
+                )
+            except Exception as e:
+                logger.error(f"Błąd chunkowania dokumentu {doc.url}: {e}")
+                self.stats.errors += 1
+                continue
+
+            self.stats.chunks_unchanged += plan.unchanged_chunks
+            if plan.unchanged:
+                self.stats.documents_unchanged += 1
+
+            # Przed wysłaniem chunków - zapis batcha może skończyć się od razu
+            await self._commits.add(doc, plan)
+            for chunk in plan.to_upsert:
+                await self._chunk_queue.put(chunk)
+
+    async def _embed_worker(self) -> None:
+        """Zbiera chunki z wielu dokumentów w batche (EmbeddingBatcher) i embeduje."""
+        async def to_writer(chunks: List[ProcessedChunk], embeddings: List[List[float]]) -> None:
+            await self._write_queue.put(_WriteTask(chunks=chunks, embeddings=embeddings))
+
+        batcher = EmbeddingBatcher(
+            self.vector_store.embedding_service,
+            on_batch=to_writer,
+            max_batch_size=self.embed_batch_size,
+            flush_interval=self.flush_interval,
+            on_error=self._commits.failed_batch
+        )
+
+        try:
+            while True:
+                item = await self._chunk_queue.get()
+                if item is _DONE:
+                    break
+                await batcher.add([item])
+        finally:
+            await batcher.close()
+            self.stats.embedding_batches += batcher.batches
+            self.stats.errors += batcher.errors
+            await self._write_queue.put(_DONE)
+
+    async def _write_worker(self) -> None:
+        """Zapisuje batche w ChromaDB i zatwierdza dokumenty zapisane w całości."""
+        while True:
+            task = await self._write_queue.get()
+            if task is _DONE:
+                return
+
+            try:
+                if task.chunks:
+                    self.stats.chunks_upserted += await asyncio.to_thread(
+                        self.vector_store.upsert_chunks, task.chunks, task.embeddings
+                    )
+                    if self.stats.first_write_after is None:
+                        self.stats.first_write_after = time.monotonic() - self.stats.started_at
+                    logger.info(
+                        f"Zapisano {len(task.chunks)} chunków "
+                        f"(łącznie {self.stats.chunks_upserted}, "
+                        f"dokumentów: {self.stats.documents_scraped})"
+                    )
+            except Exception as e:
+                logger.error(f"Błąd zapisu do ChromaDB: {e}")
+                self.stats.errors += 1
+                await self._commits.failed_batch(task.chunks)
+                continue
+
+            await self._commits.written(task.chunks)
+
+    async def _commit_document(self, doc: ScrapedDocument, plan: DocumentPlan) -> None:
+        """Usuwa stare chunki, odświeża metadane i zapisuje cache HTTP dokumentu zapisanego w całości."""
+        if plan.to_delete:
+            self.stats.chunks_deleted += await asyncio.to_thread(
+                self.vector_store.delete_chunks, plan.to_delete
+            )
+        if plan.to_refresh:
+            await asyncio.to_thread(self.vector_store.update_chunk_metadata, plan.to_refresh)
+        if doc.http_page is not None and self.http_cache is not None:
+            await asyncio.to_thread(self.http_cache.put_page, doc.http_page)
+
+
+async def run_streaming_ingestion(
+    vector_store: VectorStoreManager,
+    include_json_sources: bool = True,
+    source_code: Optional[str] = None,
+    use_http_cache: Optional[bool] = None,
+    **pipeline_kwargs
+) -> PipelineStats:
+    """
+    Scrapuje źródła i strumieniowo zapisuje dokumenty do ChromaDB.
+
+    Args:
+        vector_store: Instancja VectorStoreManager
+        include_json_sources: Czy uwzględnić źródła z organisations.json
+        source_code: Jeśli podany - tylko to jedno źródło
+        use_http_cache: Czy używać cache HTTP (domyślnie z settings)
+        **pipeline_kwargs: Parametry StreamingIngestionPipeline
+
+    Returns:
+        PipelineStats
+    """
+    if use_http_cache is None:
+        use_http_cache = settings.http_cache_enabled
+    # Cache stron dokumentów zapisywany po udanym zapisie do bazy - strona,
+    # której ingestion się nie powiódł, nie wygląda w kolejnym przebiegu na "bez zmian"
+    pipeline = StreamingIngestionPipeline(
+        vector_store,
+        http_cache=HttpCache() if use_http_cache else None,
+        **pipeline_kwargs
+    )
+
+    if source_code:
+        async def producer(on_document):
+            return await scrape_single_source(
+                source_code,
+                use_http_cache=use_http_cache,
+                on_document=on_document,
+                defer_document_cache=True
+            )
+    else:
+        async def producer(on_document):
+            return await scrape_all_sources(
+                include_json_sources=include_json_sources,
+                use_http_cache=use_http_cache,
+                on_document=on_document,
+                defer_document_cache=True
+            )
+
+    return await pipeline.run(producer)
@@ -0,0 +1,163 @@
+"""
+Warstwa wykonawcza dla blokujących etapów analizy.
+
+ChromaDB, embeddingi Gemini, DuckDuckGo i ocena wiarygodności są
+synchroniczne. Uruchamiane są w ograniczonej puli wątków, żeby event loop
+(SSE, heartbeaty, inne analizy) pozostał responsywny. Każde wywołanie
+jest mierzone per etap (stage).
+
+Pula jest też ustawiana jako domyślny executor pętli (install_default_executor),
+więc asyncio.to_thread i narzędzia LangChain korzystają z tego samego limitu.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageTiming:
+    """Statystyki czasu jednego etapu."""
+
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    # Czas oczekiwania na wolny wątek (kolejka puli)
+    queue_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.count * 1000, 1) if self.count else 0,
+            "max_ms": round(self.max_seconds * 1000, 1),
+            "avg_queue_ms": round(self.queue_seconds / self.count * 1000, 1) if self.count else 0,
+        }
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_timings: Dict[str, StageTiming] = {}
+_timings_lock = threading.Lock()
+
+# Odbiorcy pojedynczych pomiarów (stage, elapsed, failed) - np. benchmarki
+StageListener = Callable[[str, float, bool], None]
+_listeners: List[StageListener] = []
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    """Zwraca singleton puli wątków dla etapów blokujących."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.blocking_pool_size,
+                    thread_name_prefix="blocking"
+                )
+                logger.info(f"Pula wątków blokujących: {settings.blocking_pool_size} wątków")
+    return _executor
+
+
+def install_default_executor(loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    """Ustawia pulę jako domyślny executor pętli (asyncio.to_thread, LangChain)."""
+    loop = loop or asyncio.get_running_loop()
+    loop.set_default_executor(get_blocking_executor())
+
+
+def _record(stage: str, elapsed: float, queued: float, failed: bool) -> None:
+    with _timings_lock:
+        timing = _timings.setdefault(stage, StageTiming())
+        timing.count += 1
+        timing.total_seconds += elapsed
+        timing.queue_seconds += queued
+        timing.max_seconds = max(timing.max_seconds, elapsed)
+        if failed:
+            timing.errors += 1
+        listeners = list(_listeners)
+
+    for listener in listeners:
+        try:
+            listener(stage, elapsed, failed)
+        except Exception as e:
+            logger.warning(f"Błąd odbiorcy pomiarów etapu {stage}: {e}")
+
+
+async def run_blocking(stage: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Uruchamia blokującą funkcję w puli wątków i mierzy czas etapu.
+
+    Args:
+        stage: Nazwa etapu (np. "search.vector", "search.web")
+        fn: Funkcja synchroniczna
+        *args, **kwargs: Argumenty funkcji
+
+    Returns:
+        Wynik fn
+    """
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+    started: Dict[str, float] = {}
+    # Kontekst wywołującego (priorytet Gemini, śledzenie) - jak asyncio.to_thread
+    context = contextvars.copy_context()
+
+    def call() -> T:
+        started["at"] = time.perf_counter()
+        return fn(*args, **kwargs)
+
+    failed = False
+    try:
+        return await loop.run_in_executor(get_blocking_executor(), context.run, call)
+    except Exception:
+        failed = True
+        raise
+    finally:
+        finished = time.perf_counter()
+        start = started.get("at", finished)
+        _record(stage, finished - start, start - submitted, failed)
+
+
+def record_stage(stage: str, elapsed: float, failed: bool = False) -> None:
+    """Rejestruje czas etapu wykonanego poza run_blocking (np. podetapy w wątku)."""
+    _record(stage, elapsed, 0.0, failed)
+
+
+def add_stage_listener(listener: StageListener) -> None:
+    """
+    Rejestruje odbiorcę każdego pomiaru etapu.
+
+    Statystyki etapów są zagregowane (średnia, max); odbiorca dostaje
+    pojedyncze pomiary, np. do percentyli w benchmarkach.
+    """
+    with _timings_lock:
+        _listeners.append(listener)
+
+
+def remove_stage_listener(listener: StageListener) -> None:
+    """Wyrejestrowuje odbiorcę pomiarów."""
+    with _timings_lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def get_stage_stats() -> Dict[str, Dict[str, Any]]:
+    """Zwraca statystyki czasu per etap."""
+    with _timings_lock:
+        return {stage: timing.to_dict() for stage, timing in sorted(_timings.items())}
+
+
+def reset_stage_stats() -> None:
+    """Czyści statystyki etapów."""
+    with _timings_lock:
+        _timings.clear()
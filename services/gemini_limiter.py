@@ -0,0 +1,462 @@
+"""
+Wspólny limiter wywołań Gemini (LLM i embeddingi).
+
+Każde wywołanie API przechodzi przez GeminiRateLimiter danego rodzaju
+("llm", "embedding"), który łączy:
+- token bucket na requesty/min (RPM) i tokeny/min (TPM)
+- limit równoległych wywołań
+- AIMD: ResourceExhausted zmniejsza dopuszczalne tempo o połowę
+  (raz na okno), każde udane wywołanie podnosi je addytywnie
+- klasy priorytetu: INTERACTIVE (analizy) wyprzedza BACKGROUND (ingestion)
+- retry tylko dla ResourceExhausted / ServiceUnavailable (także opakowanych,
+  np. w GoogleGenerativeAIError z embeddingów), z pełnym jitterem,
+  żeby korutyny nie ponawiały jednocześnie
+
+Limiter działa zarówno dla korutyn (LLM), jak i wątków (embeddingi w puli).
+Oczekujący są budzeni przy zwolnieniu slotu lub zmianie czoła kolejki
+(bez odpytywania); na uzupełnienie bucketu czekają dokładnie wyliczony czas.
+Priorytet wywołania ustawia się kontekstowo: with gemini_priority(Priority.BACKGROUND).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple, TypeVar
+import asyncio
+import itertools
+import logging
+import random
+import threading
+import time
+
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Klasy priorytetu (niższa wartość = wyższy priorytet)."""
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+_priority: ContextVar[Priority] = ContextVar("gemini_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def gemini_priority(priority: Priority) -> Iterator[None]:
+    """Ustawia priorytet wywołań Gemini w bieżącym kontekście (także asyncio.to_thread)."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def retryable_error(e: BaseException) -> Optional[Exception]:
+    """
+    Znajduje ResourceExhausted / ServiceUnavailable w łańcuchu wyjątku.
+
+    GoogleGenerativeAIEmbeddings opakowuje błędy API w GoogleGenerativeAIError
+    (raise ... from e), więc 429 z embeddingów jest dostępne tylko przez __cause__.
+
+    Returns:
+        Wyjątek API do klasyfikacji albo None, gdy błąd nie kwalifikuje się do ponowienia
+    """
+    seen = set()
+    current: Optional[BaseException] = e
+    while current is not None and id(current) not in seen:
+        if isinstance(current, (ResourceExhausted, ServiceUnavailable)):
+            return current
+        seen.add(id(current))
+        current = current.__cause__ or current.__context__
+    return None
+
+
+def is_throttled(e: BaseException) -> bool:
+    """Czy wyjątek (lub jego przyczyna) to ResourceExhausted."""
+    return isinstance(retryable_error(e), ResourceExhausted)
+
+
+def estimate_tokens(text: str) -> int:
+    """Przybliżona liczba tokenów tekstu (~4 znaki na token)."""
+    return len(text) // 4 + 1
+
+
+class GeminiRateLimiter:
+    """
+    Token bucket RPM/TPM z AIMD, limitem współbieżności i priorytetami.
+
+    Oczekujący dostają pozwolenia w kolejności (priorytet, numer zgłoszenia),
+    więc w obrębie klasy obowiązuje FIFO, a BACKGROUND czeka, dopóki
+    w kolejce jest jakiekolwiek wywołanie INTERACTIVE. Wątki czekają na
+    warunku (threading.Condition), korutyny na własnym asyncio.Event
+    ustawianym przez loop.call_soon_threadsafe.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        min_scale: float = 0.1,
+        increase_step: float = 0.02
+    ):
+        """
+        Args:
+            name: Nazwa limitera (do logów i statystyk)
+            requests_per_minute: Limit requestów na minutę (0 = bez limitu)
+            tokens_per_minute: Limit tokenów na minutę (0 = bez limitu)
+            max_concurrency: Maksymalna liczba wywołań w locie (domyślnie z settings)
+            max_retries: Liczba ponowień po throttlingu (domyślnie z settings)
+            min_scale: Minimalny ułamek quoty po redukcjach AIMD
+            increase_step: Przyrost ułamka quoty po każdym udanym wywołaniu
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency or settings.gemini_max_concurrency
+        self.max_retries = max_retries if max_retries is not None else settings.gemini_max_retries
+        self.min_scale = min_scale
+        self.increase_step = increase_step
+
+        self._lock = threading.Lock()
+        # Budzenie oczekujących wątków (ten sam lock co stan bucketów)
+        self._changed = threading.Condition(self._lock)
+        # ticket -> (pętla, event) oczekujących korutyn
+        self._async_waiters: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = {}
+        self._scale = 1.0
+        # Pojemność bucketów = 1 s quoty (min. 1 request), pełne na starcie
+        self._request_capacity = max(1.0, requests_per_minute / 60)
+        self._token_capacity = max(1.0, tokens_per_minute / 60) if tokens_per_minute else 0.0
+        self._requests = self._request_capacity
+        self._tokens = self._token_capacity
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+
+        self._in_flight = 0
+        self._tickets = itertools.count()
+        self._waiting: Dict[int, Priority] = {}
+
+        self._stats = {
+            p.name.lower(): {"requests": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+            for p in Priority
+        }
+        self._throttled = 0
+        self._unavailable = 0
+        self._retries = 0
+
+    # === Stan bucketów (wywoływane pod lockiem) ===
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(
+            self._request_capacity,
+            self._requests + elapsed * self.requests_per_minute / 60 * self._scale
+        )
+        if self._token_capacity:
+            self._tokens = min(
+                self._token_capacity,
+                self._tokens + elapsed * self.tokens_per_minute / 60 * self._scale
+            )
+
+    def _is_next(self, ticket: int) -> bool:
+        """Czy zgłoszenie jest pierwsze w kolejce (priorytet, numer)."""
+        head = min(self._waiting.items(), key=lambda item: (item[1], item[0]))[0]
+        return head == ticket
+
+    def _try_acquire(self, ticket: int, tokens: int) -> Optional[float]:
+        """
+        Próbuje przydzielić pozwolenie (wywoływane pod lockiem).
+
+        Returns:
+            0 (przydzielone), czas do uzupełnienia bucketu albo None -
+            czekaj na powiadomienie (nie czoło kolejki / brak wolnego slotu)
+        """
+        if not self._is_next(ticket) or self._in_flight >= self.max_concurrency:
+            return None
+
+        self._refill(time.monotonic())
+        cost = min(float(tokens), self._token_capacity) if self._token_capacity else 0.0
+
+        delay = 0.0
+        if self.requests_per_minute and self._requests < 1:
+            delay = (1 - self._requests) / (self.requests_per_minute / 60 * self._scale)
+        if cost and self._tokens < cost:
+            delay = max(delay, (cost - self._tokens) / (self.tokens_per_minute / 60 * self._scale))
+        if delay > 0:
+            # Tempo mogło w międzyczasie wzrosnąć (AIMD) - nie czekamy dłużej niż 1 s
+            return min(delay, 1.0)
+
+        self._requests -= 1
+        self._tokens -= cost
+        self._in_flight += 1
+        del self._waiting[ticket]
+        # Nowe czoło kolejki może dostać kolejny wolny slot
+        self._notify()
+        return 0.0
+
+    def _notify(self) -> None:
+        """Budzi wszystkich oczekujących (wywoływane pod lockiem)."""
+        self._changed.notify_all()
+        for loop, event in self._async_waiters.values():
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # Pętla zamknięta - jej korutyna już nie czeka
+                pass
+
+    def _enqueue(self, priority: Priority) -> int:
+        ticket = next(self._tickets)
+        with self._lock:
+            self._waiting[ticket] = priority
+        return ticket
+
+    def _abandon(self, ticket: int) -> None:
+        with self._lock:
+            self._async_waiters.pop(ticket, None)
+            if self._waiting.pop(ticket, None) is not None:
+                self._notify()
+
+    def _record_wait(self, priority: Priority, waited: float) -> None:
+        with self._lock:
+            stats = self._stats[priority.name.lower()]
+            stats["requests"] += 1
+            stats["wait_seconds"] += waited
+            stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+
+    # === Pozwolenia ===
+
+    async def acquire(self, tokens: int = 1, priority: Optional[Priority] = None) -> float:
+        """Czeka na pozwolenie (korutyny). Zwraca czas oczekiwania w sekundach."""
+        priority = priority if priority is not None else _priority.get()
+        ticket = self._enqueue(priority)
+        start = time.monotonic()
+        event = asyncio.Event()
+        try:
+            with self._lock:
+                self._async_waiters[ticket] = (asyncio.get_running_loop(), event)
+            while True:
+                with self._lock:
+                    # Czyszczenie pod lockiem - powiadomienie po sprawdzeniu nie zginie
+                    event.clear()
+                    delay = self._try_acquire(ticket, tokens)
+                    if delay == 0:
+                        del self._async_waiters[ticket]
+                        break
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+        waited = time.monotonic() - start
+        self._record_wait(priority, waited)
+        return waited
+
+    def acquire_sync(self, tokens: int = 1, priority: Optional[Priority] = None) -> float:
+        """Czeka na pozwolenie (wątki). Zwraca czas oczekiwania w sekundach."""
+        priority = priority if priority is not None else _priority.get()
+        ticket = self._enqueue(priority)
+        start = time.monotonic()
+        try:
+            with self._changed:
+                while True:
+                    delay = self._try_acquire(ticket, tokens)
+                    if delay == 0:
+                        break
+                    self._changed.wait(timeout=delay)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+
+        waited = time.monotonic() - start
+        self._record_wait(priority, waited)
+        return waited
+
+    def release(self, throttled: bool = False, tokens_used: Optional[int] = None, tokens_reserved: int = 0) -> None:
+        """
+        Zwalnia slot i aktualizuje tempo (AIMD).
+
+        Args:
+            throttled: Czy wywołanie zakończyło się ResourceExhausted
+            tokens_used: Faktyczne zużycie tokenów (jeśli znane) - koryguje bucket TPM
+            tokens_reserved: Liczba tokenów pobrana przy acquire
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            now = time.monotonic()
+
+            if throttled:
+                self._throttled += 1
+                # Jedna redukcja na okno - równoczesne 429 nie zbijają tempa do zera
+                if now - self._last_decrease > 1.0:
+                    self._scale = max(self.min_scale, self._scale / 2)
+                    self._last_decrease = now
+                    self._requests = min(self._requests, 0.0)
+                    logger.warning(f"Gemini[{self.name}]: throttling, tempo {self._scale:.0%} quoty")
+            else:
+                self._scale = min(1.0, self._scale + self.increase_step)
+
+            if tokens_used is not None and self._token_capacity:
+                self._refill(now)
+                self._tokens -= tokens_used - min(tokens_reserved, self._token_capacity)
+
+            self._notify()
+
+    # === Wywołania z retry ===
+
+    def _backoff(self, attempt: int) -> float:
+        """Pełny jitter: losowo z [0, min(60, 2 * 2^attempt)]."""
+        return random.uniform(0, min(60.0, 2.0 * 2 ** attempt))
+
+    def retry_delay(self, e: Exception, attempt: int) -> float:
+        """Zwraca opóźnienie przed ponowieniem (throttling/503) albo rzuca wyjątek dalej."""
+        cause = retryable_error(e)
+        if cause is None or attempt >= self.max_retries:
+            raise e
+        if isinstance(cause, ServiceUnavailable):
+            self._unavailable += 1
+        self._retries += 1
+        delay = self._backoff(attempt)
+        logger.warning(
+            f"Gemini[{self.name}]: {type(cause).__name__}, ponowienie {attempt + 1}/{self.max_retries} za {delay:.1f}s"
+        )
+        return delay
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        tokens: int = 1,
+        usage: Optional[Callable[[T], Optional[int]]] = None
+    ) -> T:
+        """
+        Wywołuje korutynę pod limiterem z retry po throttlingu.
+
+        Args:
+            fn: Funkcja bez argumentów zwracająca korutynę (wywoływana przy każdej próbie)
+            tokens: Szacowana liczba tokenów wywołania
+            usage: Opcjonalnie - faktyczne zużycie tokenów z wyniku (korekta TPM)
+        """
+        attempt = 0
+        while True:
+            await self.acquire(tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                self.release(throttled=is_throttled(e))
+                delay = self.retry_delay(e, attempt)
+            except BaseException:
+                self.release()
+                raise
+            else:
+                self.release(tokens_used=usage(result) if usage else None, tokens_reserved=tokens)
+                return result
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def call(
+        self,
+        fn: Callable[..., T],
+        *args: Any,
+        tokens: int = 1,
+        usage: Optional[Callable[[T], Optional[int]]] = None,
+        **kwargs: Any
+    ) -> T:
+        """
+        Wywołuje funkcję synchroniczną pod limiterem z retry po throttlingu.
+
+        Args:
+            fn: Funkcja wywoływana z *args i **kwargs przy każdej próbie
+            tokens: Szacowana liczba tokenów wywołania
+            usage: Opcjonalnie - faktyczne zużycie tokenów z wyniku (korekta TPM)
+        """
+        attempt = 0
+        while True:
+            self.acquire_sync(tokens)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.release(throttled=is_throttled(e))
+                delay = self.retry_delay(e, attempt)
+            except BaseException:
+                self.release()
+                raise
+            else:
+                self.release(tokens_used=usage(result) if usage else None, tokens_reserved=tokens)
+                return result
+            attempt += 1
+            time.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki kolejki, throttlingu i aktualnego tempa."""
+        with self._lock:
+            queued = {p.name.lower(): 0 for p in Priority}
+            for priority in self._waiting.values():
+                queued[priority.name.lower()] += 1
+
+            per_priority = {
+                name: {
+                    "requests": s["requests"],
+                    "avg_wait_ms": round(s["wait_seconds"] / s["requests"] * 1000, 1) if s["requests"] else 0,
+                    "max_wait_ms": round(s["max_wait_seconds"] * 1000, 1),
+                }
+                for name, s in self._stats.items()
+            }
+            return {
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "rate_scale": round(self._scale, 3),
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "queued": queued,
+                "priorities": per_priority,
+                "throttled": self._throttled,
+                "unavailable": self._unavailable,
+                "retries": self._retries,
+            }
+
+
+_limiters: Dict[str, GeminiRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_gemini_limiter(kind: str = "llm") -> GeminiRateLimiter:
+    """
+    Zwraca limiter procesu dla rodzaju wywołań.
+
+    Args:
+        kind: "llm" (generowanie) lub "embedding" - osobne quoty w Gemini API
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(kind)
+        if limiter is None:
+            if kind == "embedding":
+                limiter = GeminiRateLimiter(
+                    "embedding",
+                    requests_per_minute=settings.embedding_requests_per_minute,
+                    tokens_per_minute=settings.gemini_embedding_tpm
+                )
+            else:
+                limiter = GeminiRateLimiter(
+                    kind,
+                    requests_per_minute=settings.gemini_llm_rpm,
+                    tokens_per_minute=settings.gemini_llm_tpm
+                )
+            _limiters[kind] = limiter
+        return limiter
+
+
+def get_limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """Statystyki wszystkich limiterów."""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {kind: limiter.get_stats() for kind, limiter in sorted(limiters.items())}
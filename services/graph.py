@@ -7,16 +7,21 @@ Obsługuje dwa tryby:
 """
 from typing import Dict, Any, List, Callable, Optional
 from functools import partial
+import logging
 
 from langchain_core.messages import HumanMessage, BaseMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
 
 from services.llm import get_llm
-from core.config import SUPERVISOR_PROMPT, REGIONS
+from services.registry import get_registry
+from core.config import settings, SUPERVISOR_PROMPT, REGIONS
 from schemas.schemas import RouteResponse
 from agents.nodes import region_node, country_node, synthesis_node, scenario_node, EmitCallback
 
+logger = logging.getLogger(__name__)
+
 
 # Dostępni agenci
 AGENTS = {
@@ -26,14 +31,19 @@ AGENTS = {
 }
 
 
-def create_supervisor_node(emit: Optional[EmitCallback] = None):
+def _config_emit(config: Optional[RunnableConfig]) -> Optional[EmitCallback]:
+    """Callback SSE przekazany w config["configurable"]["emit"]."""
+    return ((config or {}).get("configurable") or {}).get("emit")
+
+
+def create_supervisor_node():
     """
     Tworzy node supervisora decydującego o routingu.
 
-    Args:
-        emit: Opcjonalny callback SSE
+    Callback SSE przychodzi w config wywołania (configurable.emit),
+    więc ten sam node (i łańcuch LLM) obsługuje wszystkie analizy.
     """
-    llm = get_llm(temperature=0.3)
+    llm = get_llm(temperature=0.3, node="supervisor")
     options = ["FINISH"] + list(AGENTS.keys())
     members_desc = "\n".join([f"- {name}: {data['desc']}" for name, data in AGENTS.items()])
 
@@ -45,7 +55,8 @@ def create_supervisor_node(emit: Optional[EmitCallback] = None):
 
     chain = prompt | llm.with_structured_output(RouteResponse)
 
-    async def supervisor_node(state: Dict[str, Any]) -> Dict[str, Any]:
+    async def supervisor_node(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        emit = _config_emit(config)
         messages = state.get("messages", [])
         query = messages[0].content if messages else ""
 
@@ -57,7 +68,7 @@ def create_supervisor_node(emit: Optional[EmitCallback] = None):
                 "content": f"Analizuję zapytanie i wybieram następnego agenta..."
             })
 
-        result = chain.invoke({
+        result = await chain.ainvoke({
             "messages": messages,
             "members_desc": members_desc,
             "query": query
@@ -72,18 +83,19 @@ def create_supervisor_node(emit: Optional[EmitCallback] = None):
                 "content": f"Przekazuję do: {next_step}"
             })
 
-        print(f"[SUPERVISOR] -> {next_step}")
+        logger.info(f"[SUPERVISOR] -> {next_step}")
         return {"next": next_step}
 
     return supervisor_node
 
 
-def build_graph(emit: Optional[EmitCallback] = None) -> StateGraph:
+def build_graph() -> StateGraph:
     """
-    Buduje graf agentów.
+    Buduje i kompiluje graf agentów.
 
-    Args:
-        emit: Opcjonalny callback SSE dla streaming
+    Callback SSE nie jest wkompilowany w graf - przekazuje się go
+    w config: graph.ainvoke(state, config={"configurable": {"emit": emit}}).
+    Dzięki temu skompilowany graf jest współdzielony (get_graph).
     """
     from typing import TypedDict, Annotated, Sequence
     import operator
@@ -105,18 +117,13 @@ def build_graph(emit: Optional[EmitCallback] = None) -> StateGraph:
 
     workflow = StateGraph(GraphState)
 
-    # Dodaj supervisor z emit
-    workflow.add_node("supervisor", create_supervisor_node(emit))
+    workflow.add_node("supervisor", create_supervisor_node())
 
-    # Dodaj agentów z emit callback
+    # Agenci dostają emit z config wywołania
     for name, data in AGENTS.items():
-        # Wrap node z emit
-        if emit:
-            async def node_with_emit(state, node_fn=data["node"], emit_fn=emit):
-                return await node_fn(state, emit_fn)
-            workflow.add_node(name, node_with_emit)
-        else:
-            workflow.add_node(name, data["node"])
+        async def node_with_emit(state, config: RunnableConfig, node_fn=data["node"]):
+            return await node_fn(state, _config_emit(config))
+        workflow.add_node(name, node_with_emit)
 
         workflow.add_edge(name, "supervisor")
 
@@ -129,6 +136,11 @@ def build_graph(emit: Optional[EmitCallback] = None) -> StateGraph:
     return workflow.compile()
 
 
+def get_graph():
+    """Zwraca skompilowany graf agentów (kompilowany raz na proces)."""
+    return get_registry("graph").get_or_create((settings.llm_model,), build_graph)
+
+
 def run_analysis(
     query: str,
     region: str = None,
@@ -149,7 +161,7 @@ def run_analysis(
     Returns:
         Dict ze stanem końcowym grafu
     """
-    graph = build_graph()
+    graph = get_graph()
     initial_state = {
         "messages": [HumanMessage(content=query)],
         "next": "",
@@ -377,6 +389,14 @@ async def run_mvp_analysis(
         })
         raise
 
+    # Postęp z czasami etapów analizy (pole timing, gdy włączone śledzenie)
+    await emit({
+        "type": "progress",
+        "agent": "analysis",
+        "content": "Raport gotowy",
+        "progress": 50
+    })
+
     # === KROK 2: Scenariusze ===
     try:
         state = await scenarios_node(state, emit)
@@ -388,6 +408,13 @@ async def run_mvp_analysis(
         })
         raise
 
+    await emit({
+        "type": "progress",
+        "agent": "scenarios",
+        "content": f"Scenariusze gotowe ({len(state.get('scenarios', []))})",
+        "progress": 95
+    })
+
     return {
         "analysis_report": state.get("analysis_report", ""),
         "scenarios": state.get("scenarios", []),
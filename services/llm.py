@@ -1,37 +1,322 @@
-"""Wrapper LLM z retry logic."""
-from typing import List
+"""Wrapper LLM z limiterem Gemini, cache odpowiedzi i scalaniem identycznych żądań."""
+from typing import Any, AsyncIterator, Dict, List, Optional
+import asyncio
+import hashlib
+
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import BaseMessage, AIMessage
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+from langchain_core.load import dumps
+from langchain_core.caches import BaseCache
+from langchain_core.messages import BaseMessage, AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatResult
 
 from core.config import settings
+from services.gemini_limiter import estimate_tokens, get_gemini_limiter, is_throttled
+from services.llm_cache import get_llm_cache
+from services.registry import get_registry
+from services.tracing import span
+
+
+# Żądania w toku (ainvoke i astream): klucz (llm_string + wiadomości) -> future z ChatResult
+_inflight: Dict[str, asyncio.Future] = {}
+_singleflight_stats = {"leaders": 0, "coalesced": 0}
+
+# Rezerwacja TPM na odpowiedź (korygowana po wywołaniu z usage_metadata)
+_OUTPUT_TOKENS_ESTIMATE = 1000
+
+
+def _estimate_request_tokens(messages: List[BaseMessage]) -> int:
+    """Szacunkowe zużycie tokenów wywołania (prompt + odpowiedź)."""
+    return sum(estimate_tokens(str(m.content)) for m in messages) + _OUTPUT_TOKENS_ESTIMATE
+
+
+def _result_tokens(result: ChatResult) -> Optional[int]:
+    """Faktyczne zużycie tokenów z odpowiedzi (None gdy brak usage_metadata)."""
+    if not result.generations:
+        return None
+    usage = getattr(result.generations[0].message, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+def _usage_attributes(message: Any) -> Dict[str, int]:
+    """Tokeny wywołania (prompt/completion) jako atrybuty spanu."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    return {
+        "prompt_tokens": usage.get("input_tokens", 0),
+        "completion_tokens": usage.get("output_tokens", 0),
+    }
+
+
+def _inflight_key(llm_string: str, prompt_key: str) -> str:
+    """Klucz single-flight - wspólny dla _agenerate i astream."""
+    return hashlib.sha256((llm_string + prompt_key).encode("utf-8")).hexdigest()
+
+
+async def _join_inflight(key: str) -> Optional[ChatResult]:
+    """
+    Czeka na identyczne żądanie w toku.
+
+    Returns:
+        Kopia wyniku lidera albo None, gdy nic nie jest w toku (wołający zostaje liderem)
+    """
+    while key in _inflight:
+        future = _inflight[key]
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Lider został anulowany - spróbuj ponownie (przejmij żądanie)
+            if future.cancelled():
+                continue
+            raise
+        _singleflight_stats["coalesced"] += 1
+        return result.model_copy(deep=True)
+    return None
+
+
+def _lead_inflight(key: str) -> asyncio.Future:
+    """Rejestruje żądanie w toku (wołający jest liderem)."""
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    _singleflight_stats["leaders"] += 1
+    return future
+
+
+def _fail_inflight(future: asyncio.Future, e: Exception) -> None:
+    future.set_exception(e)
+    # Oznacz wyjątek jako odebrany (gdy nikt nie czekał)
+    future.exception()
+
+
+class GeminiChatModel(ChatGoogleGenerativeAI):
+    """
+    ChatGoogleGenerativeAI ze scalaniem równoległych identycznych żądań (single-flight).
+
+    Dotyczy tylko modeli z włączonym cache (ainvoke i astream): gdy to samo zapytanie
+    (ten sam model, temperatura i wiadomości) jest już w toku, kolejne
+    wywołania czekają na jego wynik zamiast pytać API ponownie.
+    Po zakończeniu wynik trafia do cache, więc późniejsze wywołania
+    obsługuje już BaseCache.
+
+    Każde wywołanie API przechodzi przez wspólny limiter Gemini
+    (services/gemini_limiter.py) - on też odpowiada za retry po 429/503.
+    """
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        with span("llm.generate", model=self.model) as s:
+            result = get_gemini_limiter("llm").call(
+                super()._generate, messages, stop=stop, run_manager=run_manager,
+                tokens=_estimate_request_tokens(messages), usage=_result_tokens, **kwargs
+            )
+            if result.generations:
+                s.set(**_usage_attributes(result.generations[0].message))
+        return result
+
+    async def _limited_agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        """Wywołanie API pod limiterem."""
+        parent = super()._agenerate
+        with span("llm.generate", model=self.model) as s:
+            result = await get_gemini_limiter("llm").acall(
+                lambda: parent(messages, stop=stop, run_manager=run_manager, **kwargs),
+                tokens=_estimate_request_tokens(messages),
+                usage=_result_tokens,
+            )
+            if result.generations:
+                s.set(**_usage_attributes(result.generations[0].message))
+        return result
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        """Streaming pod limiterem; ponowienie tylko przed pierwszym fragmentem."""
+        limiter = get_gemini_limiter("llm")
+        tokens = _estimate_request_tokens(messages)
+        attempt = 0
+        with span("llm.stream", model=self.model) as s:
+            # Fragmenty niosą przyrosty usage_metadata - sumujemy
+            usage = {"prompt_tokens": 0, "completion_tokens": 0}
+            while True:
+                await limiter.acquire(tokens)
+                started = False
+                try:
+                    async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                        started = True
+                        for key, value in _usage_attributes(chunk.message).items():
+                            usage[key] += value or 0
+                        yield chunk
+                except Exception as e:
+                    limiter.release(throttled=is_throttled(e))
+                    if started:
+                        raise
+                    delay = limiter.retry_delay(e, attempt)
+                except BaseException:
+                    limiter.release()
+                    raise
+                else:
+                    limiter.release(
+                        tokens_used=usage["prompt_tokens"] + usage["completion_tokens"] or None,
+                        tokens_reserved=tokens
+                    )
+                    s.set(retries=attempt, **usage)
+                    return
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        if not self.cache:
+            return await self._limited_agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        key = _inflight_key(self._get_llm_string(stop=stop, **kwargs), dumps(messages))
+
+        result = await _join_inflight(key)
+        if result is not None:
+            return result
+
+        future = _lead_inflight(key)
+        try:
+            result = await self._limited_agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            _fail_inflight(future, e)
+            raise
+        finally:
+            _inflight.pop(key, None)
+
+    async def astream(
+        self,
+        input: Any,
+        config: Any = None,
+        *,
+        stop: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[AIMessageChunk]:
+        """
+        Streaming z obsługą cache odpowiedzi i single-flight.
+
+        BaseChatModel.astream pomija cache - tu trafienie zwraca całą
+        odpowiedź jednym fragmentem, a odpowiedź ze streamingu jest zapisywana.
+        Identyczne żądanie w toku (stream albo ainvoke) nie idzie do API:
+        wołający czeka na lidera i dostaje jego odpowiedź jednym fragmentem.
+        """
+        if not isinstance(self.cache, BaseCache):
+            async for chunk in super().astream(input, config, stop=stop, **kwargs):
+                yield chunk
+            return
+
+        prompt_key = dumps(self._convert_input(input).to_messages())
+        llm_string = self._get_llm_string(stop=stop, **kwargs)
+
+        cached = await self.cache.alookup(prompt_key, llm_string)
+        if cached:
+            yield AIMessageChunk(content=cached[0].text)
+            return
+
+        key = _inflight_key(llm_string, prompt_key)
+        result = await _join_inflight(key)
+        if result is not None:
+            yield AIMessageChunk(content=result.generations[0].message.content if result.generations else "")
+            return
+
+        future = _lead_inflight(key)
+        try:
+            parts: List[str] = []
+            async for chunk in super().astream(input, config, stop=stop, **kwargs):
+                if isinstance(chunk.content, str):
+                    parts.append(chunk.content)
+                yield chunk
+
+            generations = [ChatGeneration(message=AIMessage(content="".join(parts)))]
+            await self.cache.aupdate(prompt_key, llm_string, generations)
+            future.set_result(ChatResult(generations=generations))
+        except Exception as e:
+            _fail_inflight(future, e)
+            raise
+        except BaseException:
+            # Anulowanie albo przerwany odbiór streamu - czekający przejmą żądanie
+            future.cancel()
+            raise
+        finally:
+            _inflight.pop(key, None)
+
+
+def _node_cache(node: Optional[str]):
+    """Cache odpowiedzi dla węzła (None = bez cache)."""
+    if not settings.llm_cache_enabled or node is None or node not in settings.llm_cache_nodes:
+        return None
+    return get_llm_cache()
 
 
 class GeminiLLM:
-    def __init__(self, model: str = None, temperature: float = 0.7):
+    def __init__(self, model: str = None, temperature: float = 0.7, node: Optional[str] = None):
         self.model_name = model or settings.llm_model
         self.temperature = temperature
-        self._llm = ChatGoogleGenerativeAI(
+        self._llm = GeminiChatModel(
             model=self.model_name,
             google_api_key=settings.gemini_api_key,
             temperature=self.temperature,
             convert_system_message_to_human=True,
+            cache=_node_cache(node),
+            # Retry po 429/503 obsługuje limiter (z backoffem i AIMD)
+            max_retries=1,
         )
 
     @property
     def llm(self) -> ChatGoogleGenerativeAI:
         return self._llm
 
-    @retry(
-        retry=retry_if_exception_type((ResourceExhausted, ServiceUnavailable)),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=4, max=60),
-    )
     def invoke(self, messages: List[BaseMessage]) -> AIMessage:
         return self._llm.invoke(messages)
 
 
-def get_llm(model: str = None, temperature: float = 0.7) -> ChatGoogleGenerativeAI:
-    """Zwraca instancję LLM."""
-    return GeminiLLM(model=model, temperature=temperature).llm
+def get_llm(model: str = None, temperature: float = 0.7, node: Optional[str] = None) -> ChatGoogleGenerativeAI:
+    """
+    Zwraca współdzieloną instancję LLM.
+
+    Klienci są poolowani per (model, temperatura, cache) - jeden klient
+    (i jego pula połączeń HTTP/gRPC) na proces zamiast nowego przy każdym
+    wywołaniu. Instancje są bezstanowe, więc bezpieczne współbieżnie.
+
+    Args:
+        model: Nazwa modelu (domyślnie settings.llm_model)
+        temperature: Temperatura
+        node: Nazwa węzła - cache odpowiedzi jest włączony dla węzłów
+            z settings.llm_cache_nodes (deterministyczne prompty)
+    """
+    model_name = model or settings.llm_model
+    cached = _node_cache(node) is not None
+    return get_registry("llm").get_or_create(
+        (model_name, round(temperature, 3), cached),
+        lambda: GeminiLLM(model=model_name, temperature=temperature, node=node).llm
+    )
+
+
+def get_llm_stats() -> Dict[str, Any]:
+    """Statystyki cache odpowiedzi i scalania żądań."""
+    return {
+        "cache": get_llm_cache().get_stats() if settings.llm_cache_enabled else None,
+        "singleflight": {**_singleflight_stats, "in_flight": len(_inflight)},
+    }
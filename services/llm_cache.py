@@ -0,0 +1,197 @@
+"""
+Persystentny cache odpowiedzi LLM (SQLite) dla LangChain.
+
+Implementuje BaseCache, więc działa dla każdego wywołania modelu
+(ainvoke, łańcuchy z with_structured_output, agenci ReAct). Klucz to
+(sha256(llm_string), sha256(prompt)) - llm_string zawiera model
+i temperaturę, więc ten sam prompt z inną temperaturą to osobny wpis.
+
+Cache włączany jest per węzeł (settings.llm_cache_nodes) w get_llm().
+"""
+from typing import Any, Dict, Optional, Sequence
+from pathlib import Path
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Cache generacji LLM w SQLite z TTL i eviction LRU.
+
+    - generacje serializowane przez langchain_core.load (AIMessage z tool_calls)
+    - wpisy starsze niż ttl_seconds są ignorowane i usuwane przy zapisie
+    - plik współdzielony między workerami (WAL)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None
+    ):
+        """
+        Args:
+            path: Ścieżka do pliku SQLite (domyślnie settings.llm_cache_path)
+            ttl_seconds: Czas ważności odpowiedzi (domyślnie settings.llm_cache_ttl_seconds)
+            max_entries: Maksymalna liczba wpisów (domyślnie settings.llm_cache_max_entries)
+        """
+        self.path = Path(path or settings.llm_cache_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds or settings.llm_cache_ttl_seconds
+        self.max_entries = max_entries or settings.llm_cache_max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                llm_hash TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                model TEXT NOT NULL,
+                generations BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (llm_hash, prompt_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_responses_last_access ON llm_responses(last_access)"
+        )
+        self._conn.commit()
+
+        self._hits = 0
+        self._misses = 0
+
+        logger.info(f"SQLiteLLMCache zainicjalizowany: {self.path}")
+
+    @staticmethod
+    def _model_name(llm_string: str) -> str:
+        """Nazwa modelu z llm_string (tylko do statystyk)."""
+        for key in ("'model': '", "'model_name': '"):
+            start = llm_string.find(key)
+            if start >= 0:
+                start += len(key)
+                return llm_string[start:llm_string.find("'", start)]
+        return "unknown"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """Zwraca zapisane generacje lub None."""
+        key = (_hash(llm_string), _hash(prompt))
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generations, created_at FROM llm_responses "
+                "WHERE llm_hash = ? AND prompt_hash = ?",
+                key
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                self._misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_responses SET last_access = ? WHERE llm_hash = ? AND prompt_hash = ?",
+                (now, *key)
+            )
+            self._conn.commit()
+            self._hits += 1
+
+        try:
+            return [loads(raw) for raw in json.loads(zlib.decompress(row[0]).decode("utf-8"))]
+        except Exception as e:
+            logger.warning(f"LLM cache: nie udało się odczytać wpisu ({e})")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        """Zapisuje generacje dla (llm_string, prompt)."""
+        payload = zlib.compress(
+            json.dumps([dumps(gen) for gen in return_val]).encode("utf-8")
+        )
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses "
+                "(llm_hash, prompt_hash, model, generations, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (_hash(llm_string), _hash(prompt), self._model_name(llm_string), payload, now, now)
+            )
+            self._evict_if_needed(now)
+            self._conn.commit()
+
+    def _evict_if_needed(self, now: float) -> None:
+        """Usuwa przeterminowane i najdawniej używane wpisy ponad limit (pod lockiem)."""
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE created_at < ?",
+            (now - self.ttl_seconds,)
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        to_remove = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE rowid IN ("
+            "SELECT rowid FROM llm_responses ORDER BY last_access ASC LIMIT ?)",
+            (to_remove,)
+        )
+
+    def clear(self, **kwargs: Any) -> None:
+        """Czyści cały cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+            self._hits = 0
+            self._misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki cache (hit/miss liczone w tym procesie)."""
+        with self._lock:
+            count, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(generations)), 0) FROM llm_responses"
+            ).fetchone()
+
+        total = self._hits + self._misses
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "max_entries": self.max_entries,
+            "size_bytes": size_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / total, 3) if total > 0 else 0,
+        }
+
+
+# Singleton instancja
+_llm_cache: Optional[SQLiteLLMCache] = None
+
+
+def get_llm_cache() -> SQLiteLLMCache:
+    """Zwraca singleton instancję SQLiteLLMCache."""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = SQLiteLLMCache()
+    return _llm_cache
@@ -2,18 +2,28 @@
 Moduł RAG - Retrieval Augmented Generation.
 
 Zawiera komponenty do przetwarzania dokumentów, embeddingu i wyszukiwania
-hybrydowego (vector search + web search).
+hybrydowego (vector search + BM25 + web search).
 """
 from .embeddings import EmbeddingService
+from .embedding_backends import EmbeddingBackend, GeminiEmbeddingBackend, LocalEmbeddingBackend
 from .text_processor import DocumentProcessor, ProcessedChunk
+from .lexical_index import LexicalIndex
 from .vector_store import VectorStoreManager
-from .search import HybridSearchService, HybridSearchResult
+from .search import HybridSearchService, HybridSearchResult, SearchFilter
+from .reranker import Reranker, RerankResult
 
 __all__ = [
     "EmbeddingService",
+    "EmbeddingBackend",
+    "GeminiEmbeddingBackend",
+    "LocalEmbeddingBackend",
     "DocumentProcessor",
     "ProcessedChunk",
+    "LexicalIndex",
     "VectorStoreManager",
     "HybridSearchService",
     "HybridSearchResult",
+    "SearchFilter",
+    "Reranker",
+    "RerankResult",
 ]
@@ -0,0 +1,183 @@
+"""
+Backendy embeddingów.
+
+EmbeddingService (cache, batching) deleguje samo liczenie wektorów do
+backendu wybranego w settings.embedding_backend:
+- "gemini" - GoogleGenerativeAIEmbeddings przez limiter Gemini (sieć, quota)
+- "local"  - model sentence-transformers na CPU (bez sieci, kilka ms na zapytanie)
+
+Backend identyfikuje się przez `cache_key` (backend + model) - ten klucz
+adresuje persystentny cache embeddingów i jest zapisywany w metadanych
+kolekcji ChromaDB razem z wymiarem wektorów.
+"""
+from abc import ABC, abstractmethod
+from typing import List, Optional
+import logging
+import threading
+
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+from core.config import settings
+from services.gemini_limiter import estimate_tokens, get_gemini_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(ABC):
+    """Interfejs backendu embeddingów (wywołania blokujące)."""
+
+    name: str = ""
+
+    def __init__(self, model: str):
+        self.model_name = model
+        self._dimension: Optional[int] = None
+
+    @property
+    def cache_key(self) -> str:
+        """Identyfikator wektorów (cache, metadane kolekcji)."""
+        return f"{self.name}:{self.model_name}"
+
+    @property
+    def dimension(self) -> int:
+        """Wymiar wektorów (liczony przy pierwszym użyciu)."""
+        if self._dimension is None:
+            self._dimension = len(self.embed_query("dimension probe"))
+        return self._dimension
+
+    @abstractmethod
+    def embed_query(self, text: str) -> List[float]:
+        """Embedding pojedynczego zapytania."""
+
+    @abstractmethod
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeddingi dokumentów (jeden batch API / inferencji)."""
+
+
+class GeminiEmbeddingBackend(EmbeddingBackend):
+    """Embeddingi Gemini API; RPM/TPM i retry po 429 obsługuje limiter."""
+
+    name = "gemini"
+    DEFAULT_MODEL = "models/gemini-embedding-001"
+
+    def __init__(self, model: Optional[str] = None):
+        super().__init__(model or self.DEFAULT_MODEL)
+        self._embeddings = GoogleGenerativeAIEmbeddings(
+            model=self.model_name,
+            google_api_key=settings.gemini_api_key
+        )
+
+    @property
+    def cache_key(self) -> str:
+        # Sama nazwa modelu - zgodność z wpisami cache sprzed backendów lokalnych
+        return self.model_name
+
+    def embed_query(self, text: str) -> List[float]:
+        tokens = estimate_tokens(text)
+        return get_gemini_limiter("embedding").call(
+            self._embeddings.embed_query, text, tokens=tokens, usage=lambda _: tokens
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Embeddingi kosztują tylko tokeny wejścia, a API nie zwraca usage - zużycie
+        # to pełna liczba tokenów batcha. Przy acquire bucket pobiera najwyżej swoją
+        # pojemność, resztę dużego batcha odlicza dopiero release(tokens_used=...)
+        tokens = sum(estimate_tokens(t) for t in texts)
+        return get_gemini_limiter("embedding").call(
+            self._embeddings.embed_documents, texts, tokens=tokens, usage=lambda _: tokens
+        )
+
+
+class LocalEmbeddingBackend(EmbeddingBackend):
+    """
+    Model sentence-transformers na CPU.
+
+    - inferencja w batchach (batch_size), liczba wątków torch z settings
+    - opcjonalnie ONNX Runtime (backend="onnx", wymaga sentence-transformers[onnx])
+      albo dynamiczna kwantyzacja int8 warstw Linear
+    - wektory normalizowane (cosine w ChromaDB)
+    - wywołania serializowane lockiem - równoległość jest wewnątrz inferencji
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        device: Optional[str] = None,
+        threads: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        quantize: Optional[bool] = None,
+        onnx: Optional[bool] = None
+    ):
+        """
+        Args:
+            model: Nazwa modelu HF (domyślnie settings.local_embedding_model)
+            device: Urządzenie (domyślnie settings.local_embedding_device)
+            threads: Wątki inferencji (domyślnie settings.local_embedding_threads)
+            batch_size: Rozmiar batcha inferencji (domyślnie z settings)
+            quantize: Dynamiczna kwantyzacja int8 (domyślnie z settings)
+            onnx: Backend ONNX Runtime (domyślnie z settings)
+        """
+        super().__init__(model or settings.local_embedding_model)
+        self.device = device or settings.local_embedding_device
+        self.threads = threads or settings.local_embedding_threads
+        self.batch_size = batch_size or settings.local_embedding_batch_size
+        self.quantize = settings.local_embedding_quantize if quantize is None else quantize
+        self.onnx = settings.local_embedding_onnx if onnx is None else onnx
+
+        self._lock = threading.Lock()
+        self._model = self._load_model()
+        self._dimension = self._model.get_sentence_embedding_dimension()
+
+        logger.info(
+            f"Lokalny model embeddingów: {self.model_name} ({self._dimension} wym., "
+            f"{self.device}, {self.threads} wątków, onnx={self.onnx}, int8={self.quantize})"
+        )
+
+    def _load_model(self):
+        # Import leniwy - torch i sentence-transformers potrzebne tylko dla backendu lokalnego
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(self.threads)
+
+        if self.onnx:
+            return SentenceTransformer(self.model_name, device=self.device, backend="onnx")
+
+        model = SentenceTransformer(self.model_name, device=self.device)
+        if self.quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            vectors = self._model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return vectors.tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._encode([text])[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._encode(texts)
+
+
+def create_embedding_backend(backend: Optional[str] = None, model: Optional[str] = None) -> EmbeddingBackend:
+    """
+    Tworzy backend embeddingów.
+
+    Args:
+        backend: "gemini" lub "local" (domyślnie settings.embedding_backend)
+        model: Nazwa modelu (domyślnie model backendu z settings)
+    """
+    backend = backend or settings.embedding_backend
+    if backend == LocalEmbeddingBackend.name:
+        return LocalEmbeddingBackend(model=model)
+    if backend == GeminiEmbeddingBackend.name:
+        return GeminiEmbeddingBackend(model=model)
+    raise ValueError(f"Nieznany backend embeddingów: {backend}")
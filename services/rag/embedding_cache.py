@@ -0,0 +1,237 @@
+"""
+Persystentny cache embeddingów (SQLite).
+
+Embeddingi są adresowane treścią: klucz to (model, typ zadania, sha256(tekst)).
+Typ zadania ("query" / "document") jest częścią klucza, bo Gemini liczy
+inne wektory dla RETRIEVAL_QUERY i RETRIEVAL_DOCUMENT. Plik bazy jest współdzielony między workerami uvicorn i przetrwa restart,
+więc ponowna ingestion niezmienionych chunków nie kosztuje wywołań API.
+"""
+from typing import List, Optional, Sequence
+from array import array
+from pathlib import Path
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TASK_QUERY = "query"
+TASK_DOCUMENT = "document"
+
+# last_access odświeżany najwyżej raz na tyle sekund - odczyt nie zapisuje bazy przy każdym trafieniu
+_ACCESS_REFRESH_INTERVAL = 3600.0
+
+
+class PersistentEmbeddingCache:
+    """
+    Cache embeddingów w SQLite z eviction LRU.
+
+    - wektory przechowywane jako float32 (BLOB)
+    - last_access aktualizowany przy odczycie (LRU), najwyżej raz na
+      _ACCESS_REFRESH_INTERVAL - dla eviction wystarcza przybliżona kolejność
+    - po przekroczeniu max_entries usuwane są najdawniej używane wpisy
+    - tryb WAL pozwala na równoległe odczyty z wielu procesów
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            path: Ścieżka do pliku SQLite (domyślnie settings.embedding_cache_path)
+            max_entries: Maksymalna liczba wpisów (domyślnie settings.embedding_cache_max_entries)
+        """
+        self.path = Path(path or settings.embedding_cache_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries or settings.embedding_cache_max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if columns and "task_type" not in columns:
+            # Stary schemat bez typu zadania - wektory zapytań i dokumentów są
+            # nierozróżnialne, więc cache budujemy od nowa
+            logger.info("Embedding cache: stary schemat bez task_type - czyszczenie")
+            self._conn.execute("DROP TABLE embeddings")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                task_type TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, task_type, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)"
+        )
+        self._conn.commit()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        logger.info(f"PersistentEmbeddingCache zainicjalizowany: {self.path}")
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """Klucz treści - pełny sha256 tekstu."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(
+        self,
+        model: str,
+        texts: Sequence[str],
+        task_type: str = TASK_DOCUMENT
+    ) -> List[Optional[List[float]]]:
+        """
+        Pobiera embeddingi dla listy tekstów.
+
+        Args:
+            model: Klucz modelu (backend + model)
+            texts: Teksty do wyszukania
+            task_type: TASK_QUERY albo TASK_DOCUMENT
+
+        Returns:
+            Lista embeddingów (None dla brakujących), w kolejności `texts`
+        """
+        if not texts:
+            return []
+
+        hashes = [self.text_hash(t) for t in texts]
+        found = {}
+        stale = []
+        now = time.time()
+
+        with self._lock:
+            # SQLite ma limit parametrów w zapytaniu - pytamy w porcjach
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), 500):
+                chunk = unique_hashes[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector, last_access FROM embeddings "
+                    f"WHERE model = ? AND task_type = ? AND text_hash IN ({placeholders})",
+                    [model, task_type, *chunk]
+                ).fetchall()
+                for text_hash, blob, last_access in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[text_hash] = vector.tolist()
+                    if now - last_access >= _ACCESS_REFRESH_INTERVAL:
+                        stale.append(text_hash)
+
+            if stale:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? "
+                    "WHERE model = ? AND task_type = ? AND text_hash = ?",
+                    [(now, model, task_type, h) for h in stale]
+                )
+                self._conn.commit()
+
+            results = [found.get(h) for h in hashes]
+            hits = sum(1 for r in results if r is not None)
+            self._hits += hits
+            self._misses += len(results) - hits
+
+        return results
+
+    def get(self, model: str, text: str, task_type: str = TASK_DOCUMENT) -> Optional[List[float]]:
+        """Pobiera embedding pojedynczego tekstu."""
+        return self.get_many(model, [text], task_type)[0]
+
+    def put_many(
+        self,
+        model: str,
+        texts: Sequence[str],
+        embeddings: Sequence[List[float]],
+        task_type: str = TASK_DOCUMENT
+    ) -> None:
+        """Zapisuje embeddingi (puste są pomijane) i egzekwuje limit rozmiaru."""
+        now = time.time()
+        rows = [
+            (model, task_type, self.text_hash(text), len(embedding), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+            if embedding
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, task_type, text_hash, dim, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._evict_if_needed()
+
+    def put(self, model: str, text: str, embedding: List[float], task_type: str = TASK_DOCUMENT) -> None:
+        """Zapisuje embedding pojedynczego tekstu."""
+        self.put_many(model, [text], [embedding], task_type)
+
+    def _evict_if_needed(self) -> None:
+        """Usuwa najdawniej używane wpisy ponad limit (wywoływane pod lockiem)."""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count <= self.max_entries:
+            return
+
+        # Usuń z zapasem 10%, żeby nie sprzątać przy każdym zapisie
+        to_remove = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN ("
+            "SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (to_remove,)
+        )
+        self._conn.commit()
+        self._evictions += to_remove
+        logger.debug(f"Embedding cache: usunięto {to_remove} najstarszych wpisów")
+
+    def get_stats(self) -> dict:
+        """Zwraca statystyki cache (hit/miss liczone w tym procesie)."""
+        with self._lock:
+            count, size_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+            ).fetchone()
+
+        total = self._hits + self._misses
+        return {
+            "path": str(self.path),
+            "entries": count,
+            "max_entries": self.max_entries,
+            "size_bytes": size_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "hit_rate": round(self._hits / total, 3) if total > 0 else 0,
+        }
+
+    def clear(self) -> None:
+        """Czyści cały cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
+
+
+# Singleton instancja (współdzielona przez wszystkie EmbeddingService w procesie)
+_persistent_embedding_cache: Optional[PersistentEmbeddingCache] = None
+
+
+def get_persistent_embedding_cache() -> PersistentEmbeddingCache:
+    """Zwraca singleton instancję PersistentEmbeddingCache."""
+    global _persistent_embedding_cache
+    if _persistent_embedding_cache is None:
+        _persistent_embedding_cache = PersistentEmbeddingCache()
+    return _persistent_embedding_cache
@@ -1,17 +1,24 @@
 """
 Serwis embeddingu z cache i batch processing.
 
-Używa Google Generative AI Embeddings (Gemini) do generowania
-wektorowych reprezentacji tekstu.
+Wektory liczy backend z settings.embedding_backend (embedding_backends.py):
+Gemini API albo lokalny model sentence-transformers.
 """
 from typing import List, Optional
+from collections import OrderedDict
 import hashlib
 import logging
-
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import threading
 
 from core.config import settings
+from services.tracing import span
+from .embedding_backends import EmbeddingBackend, GeminiEmbeddingBackend, create_embedding_backend
+from .embedding_cache import (
+    TASK_DOCUMENT,
+    TASK_QUERY,
+    PersistentEmbeddingCache,
+    get_persistent_embedding_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -20,47 +27,53 @@ class EmbeddingService:
     """
     Serwis do generowania embeddingów z:
     - Batch processing dla wydajności
-    - Cache dla powtarzających się zapytań
-    - Retry logic dla API errors
+    - Cache dla powtarzających się zapytań (in-memory LRU + persystentny SQLite)
+    - Wymiennym backendem (Gemini API / lokalny model)
     """
 
-    DEFAULT_MODEL = "models/gemini-embedding-001"
+    DEFAULT_MODEL = GeminiEmbeddingBackend.DEFAULT_MODEL
 
     def __init__(
         self,
         model: str = None,
         cache_enabled: bool = True,
-        max_cache_size: int = 10000
+        max_cache_size: int = 10000,
+        persistent_cache: Optional[PersistentEmbeddingCache] = None,
+        backend: Optional[EmbeddingBackend] = None
     ):
         """
         Inicjalizuje serwis embeddingu.
 
         Args:
-            model: Nazwa modelu embeddingu (domyślnie gemini-embedding-001)
+            model: Nazwa modelu embeddingu (domyślnie model backendu z settings)
             cache_enabled: Czy włączyć cache dla zapytań
-            max_cache_size: Maksymalny rozmiar cache
+            max_cache_size: Maksymalny rozmiar cache in-memory
+            persistent_cache: Persystentny cache (domyślnie singleton,
+                jeśli settings.embedding_cache_enabled)
+            backend: Backend embeddingów (domyślnie settings.embedding_backend)
         """
-        self.model_name = model or self.DEFAULT_MODEL
+        self._backend = backend or create_embedding_backend(model=model)
+        # Klucz cache (backend + model) - wektory różnych backendów się nie mieszają
+        self.model_name = self._backend.cache_key
         self.cache_enabled = cache_enabled
         self.max_cache_size = max_cache_size
 
-        self._embeddings = GoogleGenerativeAIEmbeddings(
-            model=self.model_name,
-            google_api_key=settings.gemini_api_key
-        )
-
-        self._cache: dict[str, List[float]] = {}
+        self._persistent_cache: Optional[PersistentEmbeddingCache] = None
+        if cache_enabled:
+            if persistent_cache is not None:
+                self._persistent_cache = persistent_cache
+            elif settings.embedding_cache_enabled:
+                try:
+                    self._persistent_cache = get_persistent_embedding_cache()
+                except Exception as e:
+                    logger.warning(f"Persystentny cache embeddingów niedostępny: {e}")
+
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        # embed_query wołane jest z wielu wątków (run_blocking) - LRU pod blokadą
+        self._cache_lock = threading.Lock()
         self._cache_hits = 0
         self._cache_misses = 0
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((Exception,)),
-        before_sleep=lambda retry_state: logger.warning(
-            f"Embedding retry {retry_state.attempt_number}/3..."
-        )
-    )
     def embed_query(self, text: str) -> List[float]:
         """
         Generuje embedding dla pojedynczego zapytania.
@@ -75,31 +88,31 @@ class EmbeddingService:
             logger.warning("Próba embeddingu pustego tekstu")
             return []
 
-        # Sprawdź cache
+        # Sprawdź cache (in-memory, potem persystentny)
         if self.cache_enabled:
             cache_key = self._get_cache_key(text)
-            if cache_key in self._cache:
-                self._cache_hits += 1
-                return self._cache[cache_key]
-            self._cache_misses += 1
+            embedding = self._get_from_cache(cache_key)
+            if embedding is not None:
+                return embedding
+
+            if self._persistent_cache is not None:
+                embedding = self._persistent_cache.get(self.model_name, text, TASK_QUERY)
+                if embedding is not None:
+                    self._add_to_cache(cache_key, embedding)
+                    return embedding
 
         # Generuj embedding
-        embedding = self._embeddings.embed_query(text)
+        with span("embedding.query", backend=self._backend.name):
+            embedding = self._backend.embed_query(text)
 
         # Zapisz do cache
         if self.cache_enabled:
             self._add_to_cache(cache_key, embedding)
+            if self._persistent_cache is not None:
+                self._persistent_cache.put(self.model_name, text, embedding, TASK_QUERY)
 
         return embedding
 
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        retry=retry_if_exception_type((Exception,)),
-        before_sleep=lambda retry_state: logger.warning(
-            f"Batch embedding retry {retry_state.attempt_number}/3..."
-        )
-    )
     def embed_documents(
         self,
         texts: List[str],
@@ -108,6 +121,8 @@ class EmbeddingService:
         """
         Generuje embeddingi dla listy dokumentów w batchach.
 
+        Teksty obecne w persystentnym cache nie są wysyłane do API.
+
         Args:
             texts: Lista tekstów do zakodowania
             batch_size: Rozmiar batcha (domyślnie 100)
@@ -126,6 +141,21 @@ class EmbeddingService:
         # Przetwarzaj w batchach
         all_embeddings: List[Optional[List[float]]] = [None] * len(texts)
 
+        # Pobierz z persystentnego cache to, co już było embedowane
+        if self.cache_enabled and self._persistent_cache is not None:
+            cached = self._persistent_cache.get_many(
+                self.model_name, [t for _, t in valid_texts], TASK_DOCUMENT
+            )
+            missing = []
+            for (idx, text), embedding in zip(valid_texts, cached):
+                if embedding is not None:
+                    all_embeddings[idx] = embedding
+                else:
+                    missing.append((idx, text))
+            if len(missing) < len(valid_texts):
+                logger.debug(f"Embedding cache: {len(valid_texts) - len(missing)}/{len(valid_texts)} z cache")
+            valid_texts = missing
+
         indices = [i for i, _ in valid_texts]
         filtered_texts = [t for _, t in valid_texts]
 
@@ -135,26 +165,50 @@ class EmbeddingService:
 
             logger.debug(f"Embedding batch {i // batch_size + 1}, size: {len(batch_texts)}")
 
-            batch_embeddings = self._embeddings.embed_documents(batch_texts)
+            with span("embedding.documents", backend=self._backend.name, texts=len(batch_texts)):
+                batch_embeddings = self._backend.embed_documents(batch_texts)
 
             for idx, embedding in zip(batch_indices, batch_embeddings):
                 all_embeddings[idx] = embedding
 
+            if self.cache_enabled and self._persistent_cache is not None:
+                self._persistent_cache.put_many(
+                    self.model_name, batch_texts, batch_embeddings, TASK_DOCUMENT
+                )
+
         # Zastąp None pustymi listami
         return [e if e is not None else [] for e in all_embeddings]
 
+    @property
+    def backend(self) -> EmbeddingBackend:
+        """Backend liczący wektory."""
+        return self._backend
+
     def _get_cache_key(self, text: str) -> str:
         """Generuje klucz cache dla tekstu."""
         return hashlib.sha256(text.encode()).hexdigest()[:16]
 
+    def _get_from_cache(self, key: str) -> Optional[List[float]]:
+        """Zwraca embedding z cache in-memory (i oznacza go jako ostatnio użyty)."""
+        with self._cache_lock:
+            embedding = self._cache.get(key)
+            if embedding is None:
+                self._cache_misses += 1
+                return None
+            self._cache_hits += 1
+            self._cache.move_to_end(key)
+            return embedding
+
     def _add_to_cache(self, key: str, embedding: List[float]) -> None:
         """Dodaje embedding do cache z kontrolą rozmiaru."""
-        if len(self._cache) >= self.max_cache_size:
-            # Usuń najstarszy element (FIFO)
-            oldest_key = next(iter(self._cache))
-            del self._cache[oldest_key]
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+            elif len(self._cache) >= self.max_cache_size:
+                # Usuń najdawniej używany element (LRU)
+                self._cache.popitem(last=False)
 
-        self._cache[key] = embedding
+            self._cache[key] = embedding
 
     def get_cache_stats(self) -> dict:
         """Zwraca statystyki cache."""
@@ -162,16 +216,26 @@ class EmbeddingService:
         hit_rate = self._cache_hits / total if total > 0 else 0
 
         return {
+            "backend": self.model_name,
             "cache_size": len(self._cache),
             "max_cache_size": self.max_cache_size,
             "cache_hits": self._cache_hits,
             "cache_misses": self._cache_misses,
             "hit_rate": round(hit_rate, 3),
+            "persistent": self._persistent_cache.get_stats() if self._persistent_cache is not None else None,
         }
 
-    def clear_cache(self) -> None:
-        """Czyści cache."""
-        self._cache.clear()
-        self._cache_hits = 0
-        self._cache_misses = 0
+    def clear_cache(self, persistent: bool = False) -> None:
+        """
+        Czyści cache.
+
+        Args:
+            persistent: Czy wyczyścić również cache persystentny (współdzielony)
+        """
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_hits = 0
+            self._cache_misses = 0
+        if persistent and self._persistent_cache is not None:
+            self._persistent_cache.clear()
         logger.info("Cache embeddingów wyczyszczony")
@@ -0,0 +1,260 @@
+"""
+Indeks leksykalny (BM25) chunków bazy wektorowej.
+
+Embeddingi słabo radzą sobie z dokładnymi nazwami (traktaty, skróty
+ministerstw, kody reżimów sankcyjnych). Ten sam zbiór chunków, który trafia
+do ChromaDB, jest indeksowany w SQLite FTS5 (ranking bm25) obok
+data/chromadb. Indeks utrzymuje VectorStoreManager przy każdym zapisie
+i usunięciu, a HybridSearchService łączy jego wyniki z wektorowymi przez RRF.
+
+Wyszukiwanie jest lokalne (bez wywołań sieciowych) i blokujące -
+wywoływać przez run_blocking.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+from pathlib import Path
+import json
+import logging
+import re
+import sqlite3
+import threading
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Maksymalna liczba termów zapytania przekazywana do MATCH
+MAX_QUERY_TERMS = 32
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> str:
+    """
+    Zapytanie FTS5 z tekstu: termy w cudzysłowach połączone OR.
+
+    Cudzysłowy wyłączają składnię FTS5 (AND/NOT/*, dwukropki) w treści
+    zapytania użytkownika; ranking bm25 nagradza dokumenty z wieloma termami.
+    """
+    terms: List[str] = []
+    for term in _TERM_RE.findall(query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return " OR ".join(f'"{term}"' for term in terms[:MAX_QUERY_TERMS])
+
+
+class LexicalIndex:
+    """
+    Odwrócony indeks chunków (SQLite FTS5, ranking bm25).
+
+    - tabela `chunks` trzyma identyfikatory i metadane do filtrowania,
+      `chunks_fts` treść (rowid = chunks.id)
+    - tokenizer unicode61 bez diakrytyków - "sankcje"/"sankcję" różnią się
+      tylko końcówką, ale "Łódź" i "Lodz" trafiają w ten sam term
+    - filtry region/country/source jak w ChromaDB (równości)
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Ścieżka do pliku SQLite (domyślnie settings.lexical_index_path)
+        """
+        self.path = Path(path or settings.lexical_index_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                document_id TEXT,
+                region TEXT,
+                country TEXT,
+                source TEXT,
+                metadata TEXT NOT NULL,
+                UNIQUE (collection, chunk_id)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks(collection, document_id)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+            "text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        self._conn.commit()
+
+        self._queries = 0
+
+        logger.info(f"LexicalIndex zainicjalizowany: {self.path}")
+
+    def upsert(
+        self,
+        collection: str,
+        chunk_ids: Sequence[str],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]]
+    ) -> int:
+        """
+        Dodaje lub zastępuje chunki w indeksie.
+
+        Args:
+            collection: Nazwa kolekcji ChromaDB
+            chunk_ids: ID chunków (te same co w ChromaDB)
+            texts: Treści chunków
+            metadatas: Metadane (już zsanityzowane dla ChromaDB)
+
+        Returns:
+            Liczba zapisanych chunków
+        """
+        with self._lock:
+            for chunk_id, text, metadata in zip(chunk_ids, texts, metadatas):
+                self._delete_ids(collection, [chunk_id])
+                cursor = self._conn.execute(
+                    "INSERT INTO chunks (collection, chunk_id, document_id, region, country, source, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        collection, chunk_id,
+                        metadata.get("document_id"), metadata.get("region"),
+                        metadata.get("country"), metadata.get("source"),
+                        json.dumps(metadata, ensure_ascii=False),
+                    )
+                )
+                self._conn.execute(
+                    "INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)",
+                    (cursor.lastrowid, text or "")
+                )
+            self._conn.commit()
+        return len(chunk_ids)
+
+    def _delete_ids(self, collection: str, chunk_ids: Sequence[str]) -> int:
+        """Usuwa chunki po ID (pod lockiem, bez commit)."""
+        deleted = 0
+        for chunk_id in chunk_ids:
+            row = self._conn.execute(
+                "SELECT id FROM chunks WHERE collection = ? AND chunk_id = ?",
+                (collection, chunk_id)
+            ).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM chunks_fts WHERE rowid = ?", (row[0],))
+                self._conn.execute("DELETE FROM chunks WHERE id = ?", (row[0],))
+                deleted += 1
+        return deleted
+
+    def delete_chunks(self, collection: str, chunk_ids: Sequence[str]) -> int:
+        """Usuwa chunki po ID."""
+        with self._lock:
+            deleted = self._delete_ids(collection, chunk_ids)
+            self._conn.commit()
+        return deleted
+
+    def delete_document(self, collection: str, document_id: str) -> int:
+        """Usuwa wszystkie chunki dokumentu."""
+        with self._lock:
+            ids = [
+                row[0] for row in self._conn.execute(
+                    "SELECT chunk_id FROM chunks WHERE collection = ? AND document_id = ?",
+                    (collection, document_id)
+                )
+            ]
+            deleted = self._delete_ids(collection, ids)
+            self._conn.commit()
+        return deleted
+
+    def clear(self, collection: Optional[str] = None) -> None:
+        """Czyści indeks kolekcji (None = cały indeks)."""
+        with self._lock:
+            if collection is None:
+                self._conn.execute("DELETE FROM chunks_fts")
+                self._conn.execute("DELETE FROM chunks")
+            else:
+                self._conn.execute(
+                    "DELETE FROM chunks_fts WHERE rowid IN (SELECT id FROM chunks WHERE collection = ?)",
+                    (collection,)
+                )
+                self._conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,))
+            self._conn.commit()
+
+    def search(
+        self,
+        collection: str,
+        query: str,
+        n_results: int = 5,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Wyszukiwanie bm25 z filtrami metadanych.
+
+        Args:
+            collection: Nazwa kolekcji
+            query: Tekst zapytania
+            n_results: Liczba wyników
+            region: Filtr regionu
+            country: Filtr kraju
+            source: Filtr źródła
+
+        Returns:
+            Wiersze {"id", "document", "metadata", "score"} od najlepszego;
+            score = -bm25 (większy = lepszy)
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        sql = (
+            "SELECT c.chunk_id, f.text, c.metadata, bm25(chunks_fts) AS rank "
+            "FROM chunks_fts f JOIN chunks c ON c.id = f.rowid "
+            "WHERE chunks_fts MATCH ? AND c.collection = ?"
+        )
+        params: List[Any] = [match, collection]
+        for column, value in (("region", region), ("country", country), ("source", source)):
+            if value:
+                sql += f" AND c.{column} = ?"
+                params.append(value)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(n_results)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            self._queries += 1
+
+        return [
+            {"id": chunk_id, "document": text, "metadata": json.loads(metadata), "score": -rank}
+            for chunk_id, text, metadata, rank in rows
+        ]
+
+    def count(self, collection: Optional[str] = None) -> int:
+        """Liczba zaindeksowanych chunków."""
+        with self._lock:
+            if collection is None:
+                return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM chunks WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki indeksu."""
+        return {
+            "path": str(self.path),
+            "chunks": self.count(),
+            "queries": self._queries,
+        }
+
+
+# Singleton instancja
+_lexical_index: Optional[LexicalIndex] = None
+
+
+def get_lexical_index() -> LexicalIndex:
+    """Zwraca singleton instancję LexicalIndex."""
+    global _lexical_index
+    if _lexical_index is None:
+        _lexical_index = LexicalIndex()
+    return _lexical_index
@@ -0,0 +1,274 @@
+"""
+Reranking fragmentów po wyszukiwaniu (MMR + opcjonalny cross-encoder).
+
+Wyniki z kilku wyszukiwań (filtry regionów/krajów, web) trafiają do promptu
+w kolejności przyjścia, a podobne komunikaty prasowe wypierają różnorodne
+źródła. Reranker wybiera top_k fragmentów:
+
+1. embed - embeddingi zapytania i kandydatów (chunki z bazy są w cache
+   embeddingów z ingestion, więc zwykle bez wywołań API)
+2. cross_encoder - opcjonalnie lokalny cross-encoder ocenia pary
+   (zapytanie, fragment); bez niego trafność = cosinus do zapytania
+3. mmr - maximal marginal relevance: trafność minus podobieństwo do już
+   wybranych fragmentów
+
+Cały etap ma twardy budżet czasu (settings.rerank_budget_ms). Etapy
+opcjonalne są pomijane po przekroczeniu budżetu, a gdy budżet minie
+w trakcie, zostaje kolejność wg relevance_score. Czasy etapów trafiają
+do statystyk executora (rerank.*).
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import threading
+import time
+
+import numpy as np
+
+from core.config import settings
+from services.executor import record_stage, run_blocking
+from .embeddings import EmbeddingService
+from .search import HybridSearchResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RerankResult:
+    """Wynik rerankingu."""
+
+    results: List[HybridSearchResult]
+    candidates: int
+    # Czas etapów w ms (embed, cross_encoder, mmr, total)
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Budżet przekroczony - wynik (częściowo) wg relevance_score
+    budget_exceeded: bool = False
+    skipped: List[str] = field(default_factory=list)
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def maximal_marginal_relevance(
+    relevance: np.ndarray,
+    similarity: np.ndarray,
+    top_k: int,
+    mmr_lambda: float,
+    deadline: Optional[float] = None
+) -> List[int]:
+    """
+    Zachłanny wybór MMR: argmax(lambda * trafność - (1 - lambda) * max podobieństwo do wybranych).
+
+    Args:
+        relevance: Trafność kandydatów (n,)
+        similarity: Macierz podobieństw kandydatów (n, n)
+        top_k: Liczba wybieranych
+        mmr_lambda: Waga trafności (1.0 = sama trafność)
+        deadline: time.perf_counter(), po którym reszta uzupełniana jest wg trafności
+
+    Returns:
+        Indeksy wybranych kandydatów w kolejności wyboru
+    """
+    n = len(relevance)
+    top_k = min(top_k, n)
+    selected: List[int] = []
+    max_similarity = np.full(n, -np.inf)
+    available = np.ones(n, dtype=bool)
+
+    while len(selected) < top_k:
+        if deadline is not None and time.perf_counter() > deadline:
+            rest = [i for i in np.argsort(-relevance) if available[i]]
+            selected.extend(int(i) for i in rest[:top_k - len(selected)])
+            break
+
+        penalty = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * penalty
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[best])
+
+    return selected
+
+
+class Reranker:
+    """
+    Reranking MMR z opcjonalnym cross-encoderem i budżetem czasu.
+
+    Cross-encoder (settings.rerank_cross_encoder_model) ładowany jest
+    leniwie przy pierwszym użyciu; pusty model = wyłączony.
+    """
+
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        mmr_lambda: Optional[float] = None,
+        budget_ms: Optional[float] = None,
+        cross_encoder_model: Optional[str] = None,
+        max_candidates: Optional[int] = None
+    ):
+        """
+        Args:
+            embedding_service: Serwis embeddingów (domyślnie z bazy wektorowej)
+            mmr_lambda: Waga trafności w MMR (domyślnie settings.rerank_mmr_lambda)
+            budget_ms: Budżet czasu rerankingu (domyślnie settings.rerank_budget_ms)
+            cross_encoder_model: Model cross-encodera (domyślnie z settings, "" = brak)
+            max_candidates: Maksymalna liczba kandydatów (domyślnie z settings)
+        """
+        self._embedding_service = embedding_service
+        self.mmr_lambda = settings.rerank_mmr_lambda if mmr_lambda is None else mmr_lambda
+        self.budget_ms = budget_ms or settings.rerank_budget_ms
+        self.cross_encoder_model = (
+            settings.rerank_cross_encoder_model if cross_encoder_model is None else cross_encoder_model
+        )
+        self.max_candidates = max_candidates or settings.rerank_max_candidates
+
+        self._cross_encoder = None
+        self._cross_encoder_lock = threading.Lock()
+
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        if self._embedding_service is None:
+            from .vector_store import get_vector_store_manager
+            self._embedding_service = get_vector_store_manager().embedding_service
+        return self._embedding_service
+
+    def _get_cross_encoder(self):
+        """Cross-encoder (leniwie; import sentence-transformers tylko gdy włączony)."""
+        with self._cross_encoder_lock:
+            if self._cross_encoder is None:
+                from sentence_transformers import CrossEncoder
+                self._cross_encoder = CrossEncoder(self.cross_encoder_model, device="cpu")
+                logger.info(f"Cross-encoder załadowany: {self.cross_encoder_model}")
+            return self._cross_encoder
+
+    def rerank(
+        self,
+        query: str,
+        results: List[HybridSearchResult],
+        top_k: Optional[int] = None
+    ) -> RerankResult:
+        """
+        Wybiera top_k najtrafniejszych i zróżnicowanych fragmentów (blokujące).
+
+        Args:
+            query: Zapytanie
+            results: Kandydaci (np. z asearch_many)
+            top_k: Liczba zwracanych fragmentów (domyślnie settings.rerank_top_k)
+
+        Returns:
+            RerankResult z wybranymi fragmentami i czasami etapów
+        """
+        top_k = top_k or settings.rerank_top_k
+        started = time.perf_counter()
+        deadline = started + self.budget_ms / 1000
+
+        # Kandydaci wstępnie wg relevance_score - przy przekroczeniu budżetu to jest wynik
+        candidates = sorted(results, key=lambda r: r.relevance_score, reverse=True)[:self.max_candidates]
+        outcome = RerankResult(results=candidates[:top_k], candidates=len(candidates))
+        if len(candidates) <= 1:
+            return outcome
+
+        def finish_stage(stage: str, stage_start: float) -> None:
+            elapsed = time.perf_counter() - stage_start
+            outcome.timings[stage] = round(elapsed * 1000, 1)
+            record_stage(f"rerank.{stage}", elapsed)
+
+        # 1. Embeddingi
+        stage_start = time.perf_counter()
+        query_vector = self.embedding_service.embed_query(query)
+        doc_vectors = self.embedding_service.embed_documents([r.content for r in candidates])
+        finish_stage("embed", stage_start)
+
+        if not query_vector or any(not v or len(v) != len(query_vector) for v in doc_vectors):
+            logger.warning("Reranking: brak embeddingów części kandydatów - kolejność wg relevance")
+            outcome.skipped.append("mmr")
+            return self._finish(outcome, started)
+
+        docs = _normalize(np.asarray(doc_vectors, dtype=np.float32))
+        relevance = docs @ _normalize(np.asarray(query_vector, dtype=np.float32))
+
+        # 2. Cross-encoder (opcjonalny, tylko w budżecie)
+        if self.cross_encoder_model:
+            if time.perf_counter() < deadline:
+                stage_start = time.perf_counter()
+                scores = self._get_cross_encoder().predict([(query, r.content) for r in candidates])
+                relevance = 1 / (1 + np.exp(-np.asarray(scores, dtype=np.float32)))
+                finish_stage("cross_encoder", stage_start)
+            else:
+                outcome.skipped.append("cross_encoder")
+
+        if time.perf_counter() > deadline:
+            outcome.budget_exceeded = True
+            outcome.skipped.append("mmr")
+            return self._finish(outcome, started)
+
+        # 3. MMR
+        stage_start = time.perf_counter()
+        order = maximal_marginal_relevance(
+            relevance, docs @ docs.T, top_k, self.mmr_lambda, deadline=deadline
+        )
+        finish_stage("mmr", stage_start)
+        outcome.budget_exceeded = time.perf_counter() > deadline
+        outcome.results = [candidates[i] for i in order]
+        return self._finish(outcome, started)
+
+    def _finish(self, outcome: RerankResult, started: float) -> RerankResult:
+        outcome.timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(
+            f"Reranking: {outcome.candidates} -> {len(outcome.results)} fragmentów, "
+            f"etapy {outcome.timings}, pominięte {outcome.skipped or '-'}"
+        )
+        return outcome
+
+    async def arerank(
+        self,
+        query: str,
+        results: List[HybridSearchResult],
+        top_k: Optional[int] = None
+    ) -> RerankResult:
+        """
+        Asynchroniczny reranking z twardym budżetem.
+
+        Gdy wątek nie zmieści się w budżecie (np. wolne embeddingi z API),
+        wynik wg relevance_score wraca od razu, a reranking kończy się
+        w tle bez wpływu na analizę.
+        """
+        top_k = top_k or settings.rerank_top_k
+        try:
+            return await asyncio.wait_for(
+                run_blocking("rerank", self.rerank, query, results, top_k),
+                timeout=self.budget_ms / 1000
+            )
+        except asyncio.TimeoutError:
+            candidates = sorted(results, key=lambda r: r.relevance_score, reverse=True)
+            logger.warning(f"Reranking: przekroczony budżet {self.budget_ms} ms - kolejność wg relevance")
+            return RerankResult(
+                results=candidates[:top_k],
+                candidates=min(len(candidates), self.max_candidates),
+                timings={"total": float(self.budget_ms)},
+                budget_exceeded=True,
+                skipped=["embed", "cross_encoder", "mmr"],
+            )
+        except Exception as e:
+            logger.error(f"Błąd rerankingu: {e}")
+            candidates = sorted(results, key=lambda r: r.relevance_score, reverse=True)
+            return RerankResult(results=candidates[:top_k], candidates=len(candidates))
+
+
+# Singleton instancja
+_reranker: Optional[Reranker] = None
+
+
+def get_reranker() -> Reranker:
+    """Zwraca singleton instancję Reranker."""
+    global _reranker
+    if _reranker is None:
+        _reranker = Reranker()
+    return _reranker
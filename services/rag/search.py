@@ -1,17 +1,24 @@
 """
 Hybrid Search - łączenie wyszukiwania wektorowego z web search.
 
-Obsługuje różne strategie wyszukiwania dla systemu RAG.
+Obsługuje różne strategie wyszukiwania dla systemu RAG. Wyniki z lokalnej
+bazy to fuzja RRF (reciprocal rank fusion) wyszukiwania wektorowego
+(ChromaDB) i leksykalnego (BM25, services/rag/lexical_index.py).
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 from dataclasses import dataclass
 from enum import Enum
+import asyncio
 import logging
+import math
 
+from core.config import settings
 from .vector_store import VectorStoreManager, get_vector_store_manager
 from .embeddings import EmbeddingService
-from services.web_search_engine import WebSearchEngine
+from services.web_search_engine import WebSearchEngine, get_web_search_engine
+from services.executor import run_blocking
 from services.security import get_security_service
+from services.tracing import span
 from schemas.schemas import DocumentMetadata
 
 logger = logging.getLogger(__name__)
@@ -26,6 +33,10 @@ class SearchStrategy(str, Enum):
     FALLBACK = "fallback"            # Vector, web jako fallback gdy brak wyników
 
 
+# Strategie korzystające z bazy wektorowej
+_VECTOR_STRATEGIES = (SearchStrategy.VECTOR_ONLY, SearchStrategy.HYBRID, SearchStrategy.FALLBACK)
+
+
 @dataclass
 class HybridSearchResult:
     """Wynik wyszukiwania hybrydowego."""
@@ -34,6 +45,9 @@ class HybridSearchResult:
     metadata: DocumentMetadata
     relevance_score: float
     source_type: str  # "vector_store" | "web_search"
+    chunk_id: Optional[str] = None
+    # Wynik RRF (tylko wyniki z lokalnej bazy po fuzji z BM25)
+    fusion_score: Optional[float] = None
 
     def to_dict(self) -> Dict[str, Any]:
         """Konwertuje wynik do słownika."""
@@ -46,16 +60,106 @@ class HybridSearchResult:
             "date": self.metadata.date,
             "credibility": self.metadata.credibility.model_dump() if self.metadata.credibility else None,
             "relevance_score": self.relevance_score,
+            "fusion_score": self.fusion_score,
             "source_type": self.source_type,
         }
 
 
+@dataclass
+class SearchFilter:
+    """Filtr pojedynczego wyszukiwania w ramach fan-out (asearch_many)."""
+
+    region: Optional[str] = None
+    country: Optional[str] = None
+    source: Optional[str] = None
+    n_results: int = 5
+    label: str = ""
+
+
+def deduplicate_results(results: List[HybridSearchResult]) -> List[HybridSearchResult]:
+    """
+    Usuwa duplikaty po treści (hash pierwszych 200 znaków).
+
+    Zachowuje kolejność - zostaje pierwsze wystąpienie.
+    """
+    seen_content = set()
+    unique_results = []
+    for r in results:
+        content_hash = hash(r.content[:200])
+        if content_hash not in seen_content:
+            seen_content.add(content_hash)
+            unique_results.append(r)
+    return unique_results
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[List[HybridSearchResult]],
+    k: Optional[int] = None
+) -> List[HybridSearchResult]:
+    """
+    Łączy rankingi metodą RRF: score(d) = sum(1 / (k + pozycja_d)).
+
+    Dokumenty identyfikowane są po chunk_id (lub treści). Przy duplikatach
+    zostaje obiekt z pierwszej listy, z ustawionym fusion_score.
+
+    Args:
+        ranked_lists: Listy wyników, każda posortowana od najlepszego
+        k: Stała wygładzająca (domyślnie settings.rrf_k)
+
+    Returns:
+        Wyniki posortowane po fusion_score malejąco
+    """
+    k = settings.rrf_k if k is None else k
+    scores: Dict[Any, float] = {}
+    first: Dict[Any, HybridSearchResult] = {}
+
+    for results in ranked_lists:
+        for rank, result in enumerate(results, start=1):
+            key = result.chunk_id or hash(result.content[:200])
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            first.setdefault(key, result)
+
+    fused = []
+    for key in sorted(first, key=lambda key: scores[key], reverse=True):
+        result = first[key]
+        result.fusion_score = round(scores[key], 6)
+        fused.append(result)
+    return fused
+
+
+def fuse_store_results(
+    vector_results: List[HybridSearchResult],
+    lexical_results: List[HybridSearchResult],
+    n_results: int
+) -> List[HybridSearchResult]:
+    """
+    Fuzja RRF wyników wektorowych i BM25 z lokalnej bazy.
+
+    RRF wybiera i porządkuje n_results kandydatów (fusion_score), a
+    relevance_score każdego z nich to jego własny cosinus z zapytaniem
+    (wyniki BM25 mają go policzonego w _search_lexical, o ile jest embedding).
+    """
+    if not lexical_results:
+        return vector_results[:n_results]
+
+    return reciprocal_rank_fusion([vector_results, lexical_results])[:n_results]
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    """Podobieństwo cosinusowe dwóch wektorów."""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
 class HybridSearchService:
     """
     Serwis łączący wyszukiwanie wektorowe z web search.
 
     Obsługuje różne strategie:
-    - vector_only: Tylko baza wektorowa (ChromaDB)
+    - vector_only: Tylko lokalna baza (ChromaDB + BM25, fuzja RRF)
     - web_only: Tylko web search (DuckDuckGo)
     - hybrid: Kombinacja obu źródeł
     - fallback: Vector search z web search jako fallback
@@ -75,9 +179,10 @@ class HybridSearchService:
             web_search: Serwis web search (opcjonalny)
             embedding_service: Serwis embeddingów (opcjonalny)
         """
-        self._embedding_service = embedding_service or EmbeddingService()
         self._vector_store = vector_store or get_vector_store_manager()
-        self._web_search = web_search or WebSearchEngine()
+        # Ten sam serwis co baza - jeden backend (np. jeden model lokalny w pamięci)
+        self._embedding_service = embedding_service or self._vector_store.embedding_service
+        self._web_search = web_search or get_web_search_engine()
         self._security_service = get_security_service()
 
         logger.info("HybridSearchService zainicjalizowany")
@@ -91,7 +196,8 @@ class HybridSearchService:
         source: Optional[str] = None,
         strategy: str = "hybrid",
         min_relevance: float = 0.3,
-        web_results_ratio: float = 0.3
+        web_results_ratio: float = 0.3,
+        query_embedding: Optional[List[float]] = None
     ) -> List[HybridSearchResult]:
         """
         Główna metoda wyszukiwania.
@@ -105,54 +211,250 @@ class HybridSearchService:
             strategy: Strategia wyszukiwania
             min_relevance: Minimalny próg relevance score
             web_results_ratio: Proporcja wyników z web search w trybie hybrid
+            query_embedding: Gotowy embedding zapytania (opcjonalny)
 
         Returns:
-            Lista HybridSearchResult posortowana po relevance_score
+            Lista HybridSearchResult: wyniki z bazy (kolejność RRF), potem web search
         """
         results: List[HybridSearchResult] = []
 
-        # 1. Wyszukiwanie wektorowe
-        if strategy in [SearchStrategy.VECTOR_ONLY, SearchStrategy.HYBRID, SearchStrategy.FALLBACK]:
+        # 1. Wyszukiwanie w lokalnej bazie (wektorowe + BM25, fuzja RRF)
+        if strategy in _VECTOR_STRATEGIES:
+            query_embedding = query_embedding or self._embed_query(query)
             vector_results = self._search_vector_store(
                 query=query,
                 n_results=n_results,
                 region=region,
                 country=country,
-                source=source
+                source=source,
+                query_embedding=query_embedding
             )
-            results.extend(vector_results)
+            lexical_results = self._search_lexical(query, n_results, region, country, source, query_embedding)
+            results.extend(fuse_store_results(vector_results, lexical_results, n_results))
+
+        # 2. Web search (hybrid: proporcjonalnie, fallback: gdy brak wyników z vector store)
+        web_count = self._web_count(strategy, n_results, web_results_ratio, len(results))
+        if web_count:
+            results.extend(self._search_web(query, web_count))
+
+        # 3-4. Filtr min_relevance, sortowanie, deduplikacja
+        return self._finalize_results(results, n_results, min_relevance)
+
+    async def asearch(
+        self,
+        query: str,
+        n_results: int = 5,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[str] = None,
+        strategy: str = "hybrid",
+        min_relevance: float = 0.3,
+        web_results_ratio: float = 0.3,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[HybridSearchResult]:
+        """
+        Asynchroniczna wersja search().
+
+        Embedding, ChromaDB, BM25 i DuckDuckGo są blokujące, więc etapy
+        wykonywane są w puli wątków - event loop (SSE) pozostaje responsywny.
+        Wyszukiwanie wektorowe i BM25 (oraz web search w trybie hybrid)
+        idą równolegle.
+        """
+        uses_store = strategy in _VECTOR_STRATEGIES
 
-        # 2. Web search
+        async def store_stage(stage: str, fn, *args) -> List[HybridSearchResult]:
+            if not uses_store:
+                return []
+            return await run_blocking(stage, fn, *args)
+
+        async def web_stage(count: int) -> List[HybridSearchResult]:
+            if not count:
+                return []
+            return await run_blocking("search.web", self._search_web, query, count)
+
+        # Fallback: liczba wyników web zależy od wyników z bazy - po nich
+        web_count = 0 if strategy == SearchStrategy.FALLBACK else self._web_count(
+            strategy, n_results, web_results_ratio, 0
+        )
+
+        async def store_search() -> tuple:
+            embedding = query_embedding
+            if uses_store and not embedding:
+                embedding = await run_blocking("search.embedding", self._embed_query, query)
+            return await asyncio.gather(
+                store_stage(
+                    "search.vector", self._search_vector_store,
+                    query, n_results, region, country, source, embedding
+                ),
+                store_stage(
+                    "search.lexical", self._search_lexical,
+                    query, n_results, region, country, source, embedding
+                ),
+            )
+
+        (vector_results, lexical_results), web_results = await asyncio.gather(
+            store_search(),
+            web_stage(web_count),
+        )
+
+        results = fuse_store_results(vector_results, lexical_results, n_results)
+        if strategy == SearchStrategy.FALLBACK:
+            web_results = await web_stage(
+                self._web_count(strategy, n_results, web_results_ratio, len(results))
+            )
+
+        return self._finalize_results(results + web_results, n_results, min_relevance)
+
+    async def asearch_many(
+        self,
+        query: str,
+        filters: Sequence[SearchFilter],
+        strategy: str = "hybrid",
+        min_relevance: float = 0.3,
+        web_results_ratio: float = 0.3,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[HybridSearchResult]:
+        """
+        Fan-out: wyszukiwanie dla wielu filtrów naraz.
+
+        - embedding zapytania liczony jest raz (lub podany z zewnątrz),
+        - wszystkie filtry idą jednym zapytaniem do ChromaDB (query_many),
+        - BM25 dla filtrów liczony lokalnie, równolegle z ChromaDB,
+        - web search (to samo zapytanie dla każdego filtra) wykonywany jest
+          raz, równolegle z wyszukiwaniem wektorowym.
+
+        Czas odpowiedzi zależy od najwolniejszego etapu, a nie od sumy
+        wyszukiwań. Błąd jednego etapu nie przerywa pozostałych - przy błędzie
+        embeddingu zostają wyniki BM25 (w kolejności RRF, relevance_score 0.0).
+        Etapów jest najwyżej trzy naraz, więc wątki ogranicza sama pula run_blocking.
+
+        Args:
+            query: Tekst zapytania
+            filters: Lista filtrów (region/kraj/źródło + liczba wyników)
+            strategy: Strategia wyszukiwania
+            min_relevance: Minimalny próg relevance score
+            web_results_ratio: Proporcja wyników z web search w trybie hybrid
+            query_embedding: Gotowy embedding zapytania (opcjonalny)
+
+        Returns:
+            Połączone wyniki w kolejności filtrów, bez duplikatów
+        """
+        if not filters:
+            return []
+
+        uses_vector = strategy in _VECTOR_STRATEGIES
+
+        # 1. Embedding raz dla wszystkich filtrów
+        if uses_vector and query_embedding is None:
+            try:
+                query_embedding = await run_blocking("search.embedding", self._embedding_service.embed_query, query)
+            except Exception as e:
+                # BM25 działa bez embeddingu - jego trafienia przechodzą przez RRF
+                logger.error(f"Błąd embeddingu zapytania: {e}")
+                uses_vector = False
+                query_embedding = None
+
+        # 2. Vector search (jedno zapytanie) i web search równolegle
+        max_n = max(f.n_results for f in filters)
+        web_count = 0 if strategy == SearchStrategy.FALLBACK else self._web_count(
+            strategy, max_n, web_results_ratio, 0
+        )
+
+        async def vector_stage() -> List[List[HybridSearchResult]]:
+            if not uses_vector:
+                return [[] for _ in filters]
+            return await run_blocking("search.vector", self._search_vector_store_many, query, filters, query_embedding)
+
+        async def lexical_stage() -> List[List[HybridSearchResult]]:
+            if strategy not in _VECTOR_STRATEGIES:
+                return [[] for _ in filters]
+            return await run_blocking("search.lexical", self._search_lexical_many, query, filters, query_embedding)
+
+        async def web_stage(count: int) -> List[HybridSearchResult]:
+            if not count:
+                return []
+            return await run_blocking("search.web", self._search_web, query, count)
+
+        vector_batches, lexical_batches, web_results = await asyncio.gather(
+            vector_stage(), lexical_stage(), web_stage(web_count)
+        )
+        vector_batches = [
+            fuse_store_results(vector, lexical, f.n_results)
+            for f, vector, lexical in zip(filters, vector_batches, lexical_batches)
+        ]
+
+        # Fallback: web search tylko gdy któryś filtr ma za mało wyników
+        if strategy == SearchStrategy.FALLBACK:
+            missing = max(
+                self._web_count(strategy, f.n_results, web_results_ratio, len(batch))
+                for f, batch in zip(filters, vector_batches)
+            )
+            web_results = await web_stage(missing)
+
+        # 3. Składanie wyników per filtr (jak w search())
+        merged: List[HybridSearchResult] = []
+        for search_filter, vector_results in zip(filters, vector_batches):
+            count = self._web_count(strategy, search_filter.n_results, web_results_ratio, len(vector_results))
+            merged.extend(self._finalize_results(
+                vector_results + web_results[:count],
+                search_filter.n_results,
+                min_relevance
+            ))
+
+        unique_results = deduplicate_results(merged)
+
+        logger.info(
+            f"Fan-out search: {len(filters)} filtrów, {len(unique_results)} unikalnych wyników "
+            f"dla '{query[:50]}...'"
+        )
+        return unique_results
+
+    @staticmethod
+    def _web_count(
+        strategy: str,
+        n_results: int,
+        web_results_ratio: float,
+        vector_count: int
+    ) -> int:
+        """Liczba wyników web search potrzebna dla danej strategii."""
         if strategy == SearchStrategy.WEB_ONLY:
-            web_results = self._search_web(query, n_results)
-            results.extend(web_results)
-
-        elif strategy == SearchStrategy.HYBRID:
-            # Dodaj web results proporcjonalnie
-            web_count = max(1, int(n_results * web_results_ratio))
-            web_results = self._search_web(query, web_count)
-            results.extend(web_results)
-
-        elif strategy == SearchStrategy.FALLBACK and len(results) < n_results:
-            # Web search jako fallback gdy brak wyników z vector store
-            missing = n_results - len(results)
-            web_results = self._search_web(query, missing)
-            results.extend(web_results)
-
-        # 3. Filtruj po min_relevance i sortuj
-        results = [r for r in results if r.relevance_score >= min_relevance]
-        results.sort(key=lambda x: x.relevance_score, reverse=True)
-
-        # 4. Deduplikacja (usuwanie duplikatów po treści)
-        seen_content = set()
-        unique_results = []
-        for r in results:
-            content_hash = hash(r.content[:200])  # Hash pierwszych 200 znaków
-            if content_hash not in seen_content:
-                seen_content.add(content_hash)
-                unique_results.append(r)
-
-        return unique_results[:n_results]
+            return n_results
+        if strategy == SearchStrategy.HYBRID:
+            return max(1, int(n_results * web_results_ratio))
+        if strategy == SearchStrategy.FALLBACK and vector_count < n_results:
+            return n_results - vector_count
+        return 0
+
+    @staticmethod
+    def _finalize_results(
+        results: List[HybridSearchResult],
+        n_results: int,
+        min_relevance: float
+    ) -> List[HybridSearchResult]:
+        """
+        Składa wyniki z bazy i z web search, deduplikuje i przycina do n_results.
+
+        Wyniki z bazy po fuzji z BM25 zachowują kolejność RRF i nie przechodzą
+        przez próg cosinusowy - trafienia leksykalne (dokładne dopasowania)
+        mogą mieć niski cosinus albo nie mieć go wcale. min_relevance filtruje
+        wyniki web search i wyniki samego wyszukiwania wektorowego (bez BM25).
+        Wyniki web zajmują końcowe miejsca listy.
+        """
+        store = [r for r in results if r.source_type == "vector_store"]
+        web = [r for r in results if r.source_type != "vector_store"]
+
+        if any(r.fusion_score is not None for r in store):
+            store.sort(key=lambda x: x.fusion_score or 0.0, reverse=True)
+        else:
+            store = [r for r in store if r.relevance_score >= min_relevance]
+            store.sort(key=lambda x: x.relevance_score, reverse=True)
+
+        web = [r for r in web if r.relevance_score >= min_relevance]
+        web.sort(key=lambda x: x.relevance_score, reverse=True)
+        web = deduplicate_results(web)[:n_results]
+
+        store = deduplicate_results(store)[:max(0, n_results - len(web))]
+        return deduplicate_results(store + web)
 
     def search_by_region(
         self,
@@ -208,16 +510,13 @@ class HybridSearchService:
             strategy=SearchStrategy.WEB_ONLY
         )
 
-    def _search_vector_store(
-        self,
-        query: str,
-        n_results: int,
+    @staticmethod
+    def _build_where(
         region: Optional[str] = None,
         country: Optional[str] = None,
         source: Optional[str] = None
-    ) -> List[HybridSearchResult]:
-        """Wyszukiwanie w bazie wektorowej z filtrowaniem."""
-        # Buduj filtr where
+    ) -> Optional[Dict[str, Any]]:
+        """Buduje filtr where dla ChromaDB."""
         where_conditions = []
 
         if region:
@@ -227,53 +526,33 @@ class HybridSearchService:
         if source:
             where_conditions.append({"source": source})
 
-        where = None
         if len(where_conditions) == 1:
-            where = where_conditions[0]
-        elif len(where_conditions) > 1:
-            where = {"$and": where_conditions}
+            return where_conditions[0]
+        if len(where_conditions) > 1:
+            return {"$and": where_conditions}
+        return None
+
+    def _search_vector_store(
+        self,
+        query: str,
+        n_results: int,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[HybridSearchResult]:
+        """Wyszukiwanie w bazie wektorowej z filtrowaniem."""
+        where = self._build_where(region, country, source)
 
         try:
             raw_results = self._vector_store.query(
                 query_text=query,
                 n_results=n_results,
-                where=where
+                where=where,
+                query_embedding=query_embedding
             )
 
-            results = []
-
-            if raw_results["documents"] and raw_results["documents"][0]:
-                for i, doc in enumerate(raw_results["documents"][0]):
-                    # Pobierz metadane
-                    metadata_dict = {}
-                    if raw_results.get("metadatas") and raw_results["metadatas"][0]:
-                        metadata_dict = raw_results["metadatas"][0][i]
-
-                    # Oblicz relevance score (1 - distance dla cosine)
-                    distance = 1.0
-                    if raw_results.get("distances") and raw_results["distances"][0]:
-                        distance = raw_results["distances"][0][i]
-
-                    relevance = max(0.0, min(1.0, 1.0 - distance))
-
-                    # Ocena wiarygodności
-                    source_name = metadata_dict.get("source", "unknown")
-                    url = metadata_dict.get("url")
-                    credibility = self._security_service.evaluate_credibility(source_name, url, doc)
-
-                    results.append(HybridSearchResult(
-                        content=doc,
-                        metadata=DocumentMetadata(
-                            source=source_name,
-                            date=metadata_dict.get("date"),
-                            region=metadata_dict.get("region"),
-                            country=metadata_dict.get("country"),
-                            url=url,
-                            credibility=credibility
-                        ),
-                        relevance_score=relevance,
-                        source_type="vector_store"
-                    ))
+            results = self._to_vector_results(raw_results)
 
             logger.info(f"Vector search: {len(results)} wyników dla '{query[:50]}...', where={where}")
             return results
@@ -282,6 +561,157 @@ class HybridSearchService:
             logger.error(f"Błąd wyszukiwania wektorowego: {e}")
             return []
 
+    def _search_vector_store_many(
+        self,
+        query: str,
+        filters: Sequence[SearchFilter],
+        query_embedding: Optional[List[float]] = None
+    ) -> List[List[HybridSearchResult]]:
+        """Wyszukiwanie wektorowe dla wielu filtrów jednym zapytaniem (query_many)."""
+        wheres = [self._build_where(f.region, f.country, f.source) for f in filters]
+
+        try:
+            raw_batches = self._vector_store.query_many(
+                query_text=query,
+                wheres=wheres,
+                n_results=max(f.n_results for f in filters),
+                query_embedding=query_embedding
+            )
+
+            batches = [
+                self._to_vector_results(raw)[:f.n_results]
+                for f, raw in zip(filters, raw_batches)
+            ]
+
+            logger.info(
+                f"Vector search (batch): {sum(len(b) for b in batches)} wyników dla "
+                f"'{query[:50]}...', {len(filters)} filtrów"
+            )
+            return batches
+
+        except Exception as e:
+            logger.error(f"Błąd wyszukiwania wektorowego (batch): {e}")
+            return [[] for _ in filters]
+
+    def _to_vector_results(self, raw_results: Dict[str, Any]) -> List[HybridSearchResult]:
+        """Konwertuje surowy wynik ChromaDB na listę HybridSearchResult."""
+        results = []
+
+        if raw_results["documents"] and raw_results["documents"][0]:
+            ids = (raw_results.get("ids") or [[]])[0] or []
+            for i, doc in enumerate(raw_results["documents"][0]):
+                # Pobierz metadane
+                metadata_dict = {}
+                if raw_results.get("metadatas") and raw_results["metadatas"][0]:
+                    metadata_dict = raw_results["metadatas"][0][i]
+
+                # Oblicz relevance score (1 - distance dla cosine)
+                distance = 1.0
+                if raw_results.get("distances") and raw_results["distances"][0]:
+                    distance = raw_results["distances"][0][i]
+
+                relevance = max(0.0, min(1.0, 1.0 - distance))
+
+                results.append(self._store_result(
+                    doc, metadata_dict, relevance, ids[i] if i < len(ids) else None
+                ))
+
+        return results
+
+    def _store_result(
+        self,
+        doc: str,
+        metadata_dict: Dict[str, Any],
+        relevance: float,
+        chunk_id: Optional[str]
+    ) -> HybridSearchResult:
+        """Wynik z lokalnej bazy z oceną wiarygodności."""
+        source_name = metadata_dict.get("source", "unknown")
+        url = metadata_dict.get("url")
+        with span("credibility"):
+            credibility = self._security_service.evaluate_credibility(source_name, url, doc)
+
+        return HybridSearchResult(
+            content=doc,
+            metadata=DocumentMetadata(
+                source=source_name,
+                date=metadata_dict.get("date"),
+                region=metadata_dict.get("region"),
+                country=metadata_dict.get("country"),
+                url=url,
+                credibility=credibility
+            ),
+            relevance_score=relevance,
+            source_type="vector_store",
+            chunk_id=chunk_id
+        )
+
+    def _embed_query(self, query: str) -> Optional[List[float]]:
+        """Embedding zapytania wspólny dla wyszukiwania wektorowego i BM25 (None przy błędzie)."""
+        try:
+            return self._embedding_service.embed_query(query) or None
+        except Exception as e:
+            logger.error(f"Błąd embeddingu zapytania: {e}")
+            return None
+
+    def _search_lexical(
+        self,
+        query: str,
+        n_results: int,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[HybridSearchResult]:
+        """
+        Wyszukiwanie BM25 w indeksie leksykalnym.
+
+        relevance_score = cosinus embeddingu zapytania z zapisanym embeddingiem
+        chunka - ta sama skala co w wyszukiwaniu wektorowym (0.0 bez embeddingu
+        zapytania). Kolejność i dobór wyników wyznacza RRF (_finalize_results).
+        """
+        try:
+            rows = self._vector_store.lexical_query(
+                query,
+                n_results=n_results,
+                region=region,
+                country=country,
+                source=source
+            )
+        except Exception as e:
+            logger.error(f"Błąd wyszukiwania leksykalnego: {e}")
+            return []
+
+        if not rows:
+            return []
+
+        stored = {}
+        if query_embedding:
+            try:
+                stored = self._vector_store.get_chunk_embeddings([row["id"] for row in rows])
+            except Exception as e:
+                logger.error(f"Błąd pobierania embeddingów chunków BM25: {e}")
+
+        results = []
+        for row in rows:
+            embedding = stored.get(row["id"])
+            relevance = max(0.0, min(1.0, _cosine(query_embedding, embedding))) if embedding else 0.0
+            results.append(self._store_result(row["document"], row["metadata"], relevance, row["id"]))
+        logger.info(f"Lexical search: {len(results)} wyników dla '{query[:50]}...'")
+        return results
+
+    def _search_lexical_many(
+        self,
+        query: str,
+        filters: Sequence[SearchFilter],
+        query_embedding: Optional[List[float]] = None
+    ) -> List[List[HybridSearchResult]]:
+        """Wyszukiwanie BM25 dla wielu filtrów (lokalne, bez sieci)."""
+        return [
+            self._search_lexical(query, f.n_results, f.region, f.country, f.source, query_embedding)
+            for f in filters
+        ]
+
     def _search_web(
         self,
         query: str,
@@ -303,11 +733,12 @@ class HybridSearchService:
                 date = doc.get("date")
 
                 # Ocena wiarygodności dla wyników z web search
-                credibility = self._security_service.evaluate_credibility(
-                    "web_search",
-                    url,
-                    content
-                )
+                with span("credibility"):
+                    credibility = self._security_service.evaluate_credibility(
+                        "web_search",
+                        url,
+                        content
+                    )
 
                 results.append(HybridSearchResult(
                     content=content,
@@ -336,9 +767,13 @@ class HybridSearchService:
         vector_stats = self._vector_store.get_collection_stats()
         embedding_stats = self._embedding_service.get_cache_stats()
 
+        lexical_index = self._vector_store.lexical_index
+
         return {
             "vector_store": vector_stats,
+            "lexical_index": lexical_index.get_stats() if lexical_index is not None else None,
             "embedding_cache": embedding_stats,
+            "web_search_cache": self._web_search.get_cache_stats(),
         }
 
 
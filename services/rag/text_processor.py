@@ -116,6 +116,8 @@ class DocumentProcessor:
         if not document_id:
             document_id = self._generate_document_id(content)
 
+        document_hash = self.compute_document_hash(content, metadata)
+
         # Podziel tekst na chunki
         chunks = self.text_splitter.split_text(content)
 
@@ -141,6 +143,7 @@ class DocumentProcessor:
                 has_previous=i > 0,
                 has_next=i < len(chunks) - 1,
                 total_chunks=len(chunks),
+                document_hash=document_hash,
             )
 
             processed_chunks.append(ProcessedChunk(
@@ -205,6 +208,7 @@ class DocumentProcessor:
         has_previous: bool,
         has_next: bool,
         total_chunks: int,
+        document_hash: str = "",
     ) -> dict:
         """Buduje pełne metadane dla chunka."""
         metadata = {
@@ -214,6 +218,10 @@ class DocumentProcessor:
             "chunk_index": chunk_index,
             "total_chunks": total_chunks,
 
+            # Hashe treści (ingestion przyrostowa)
+            "document_hash": document_hash,
+            "content_hash": self._compute_chunk_hash(chunk_text, doc_metadata),
+
             # Źródło
             "source": doc_metadata.source or "",
             "url": doc_metadata.url or "",
@@ -243,6 +251,40 @@ class DocumentProcessor:
 
         return metadata
 
+    @staticmethod
+    def _metadata_fingerprint(metadata: DocumentMetadata) -> str:
+        """Pola metadanych zapisywane w chunkach - ich zmiana wymusza aktualizację."""
+        return "|".join([
+            metadata.source or "",
+            metadata.url or "",
+            metadata.region or "",
+            metadata.country or "",
+            metadata.date or "",
+        ])
+
+    def compute_document_hash(self, content: str, metadata: DocumentMetadata) -> str:
+        """
+        Hash dokumentu: treść + metadane + konfiguracja chunkingu.
+
+        Identyczny hash oznacza, że chunki w bazie są aktualne.
+        """
+        payload = "\x00".join([
+            f"{self.chunk_size}:{self.chunk_overlap}:{self.min_chunk_size}",
+            self._metadata_fingerprint(metadata),
+            content,
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _compute_chunk_hash(self, chunk_text: str, metadata: DocumentMetadata) -> str:
+        """
+        Hash chunka: tekst + metadane dokumentu (bez pól zmiennych jak ingestion_date).
+
+        Bez total_chunks - dopisanie akapitu na końcu dokumentu nie unieważnia
+        wcześniejszych chunków (ich metadane odświeża update_chunk_metadata).
+        """
+        payload = "\x00".join([self._metadata_fingerprint(metadata), chunk_text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
     def _generate_document_id(self, content: str, length: int = 12) -> str:
         """Generuje stabilny ID dokumentu na podstawie treści."""
         return hashlib.sha1(content.encode("utf-8")).hexdigest()[:length]
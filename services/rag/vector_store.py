@@ -6,12 +6,17 @@ embeddingami dokumentów geopolitycznych.
 """
 from typing import List, Dict, Any, Optional
 from pathlib import Path
+import json
 import logging
+import time
 
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 
+from core.config import settings
+from services.tracing import span
 from .embeddings import EmbeddingService
+from .lexical_index import LexicalIndex, get_lexical_index
 from .text_processor import ProcessedChunk
 
 logger = logging.getLogger(__name__)
@@ -26,15 +31,19 @@ class VectorStoreManager:
     - Batch upsert z automatycznym embedowaniem
     - Wyszukiwanie semantyczne z filtrowaniem metadanych
     - Zarządzanie kolekcjami
+    - Indeks BM25 (LexicalIndex) aktualizowany razem z kolekcją
     """
 
     DEFAULT_PERSIST_PATH = "./data/chromadb"
     MAIN_COLLECTION = "geopolitical_documents"
+    # Znacznik wersji danych - zmieniany przy każdym zapisie/usunięciu
+    VERSION_FILE = "data_version"
 
     def __init__(
         self,
         persist_path: Optional[str] = None,
-        embedding_service: Optional[EmbeddingService] = None
+        embedding_service: Optional[EmbeddingService] = None,
+        lexical_index: Optional[LexicalIndex] = None
     ):
         """
         Inicjalizuje VectorStoreManager.
@@ -42,6 +51,8 @@ class VectorStoreManager:
         Args:
             persist_path: Ścieżka do persystentnego storage
             embedding_service: Serwis do generowania embeddingów
+            lexical_index: Indeks BM25 (domyślnie singleton,
+                jeśli settings.lexical_index_enabled)
         """
         self.persist_path = Path(persist_path or self.DEFAULT_PERSIST_PATH)
         self.persist_path.mkdir(parents=True, exist_ok=True)
@@ -57,9 +68,39 @@ class VectorStoreManager:
 
         self._embedding_service = embedding_service or EmbeddingService()
         self._collections: Dict[str, chromadb.Collection] = {}
+        # Kolekcje zbudowane innym backendem embeddingów: nazwa -> opis niezgodności
+        self._incompatible: Dict[str, str] = {}
+
+        self._lexical_index: Optional[LexicalIndex] = lexical_index
+        if self._lexical_index is None and settings.lexical_index_enabled:
+            try:
+                self._lexical_index = get_lexical_index()
+            except Exception as e:
+                logger.warning(f"Indeks leksykalny niedostępny: {e}")
 
         logger.info(f"VectorStoreManager zainicjalizowany: {self.persist_path}")
 
+    @property
+    def data_version(self) -> str:
+        """
+        Wersja danych w bazie (znacznik w pliku obok ChromaDB).
+
+        Zmienia się przy każdej modyfikacji kolekcji, także wykonanej przez
+        inny proces (np. scripts/run_pipeline.py), więc cache zależne od
+        treści bazy (np. cache analiz) mogą się unieważniać.
+        """
+        try:
+            return (self.persist_path / self.VERSION_FILE).read_text().strip() or "0"
+        except FileNotFoundError:
+            return "0"
+
+    def _bump_data_version(self) -> None:
+        """Oznacza zmianę danych (nowy znacznik wersji)."""
+        try:
+            (self.persist_path / self.VERSION_FILE).write_text(str(time.time_ns()))
+        except OSError as e:
+            logger.warning(f"Nie udało się zapisać wersji danych: {e}")
+
     def get_or_create_collection(
         self,
         name: Optional[str] = None,
@@ -68,6 +109,10 @@ class VectorStoreManager:
         """
         Pobiera lub tworzy kolekcję.
 
+        Nowa kolekcja zapisuje w metadanych backend, model i wymiar
+        embeddingów; przy ładowaniu istniejącej są one porównywane
+        z bieżącym backendem.
+
         Args:
             name: Nazwa kolekcji (domyślnie MAIN_COLLECTION)
             distance_metric: Metryka odległości (cosine, l2, ip)
@@ -78,14 +123,56 @@ class VectorStoreManager:
         collection_name = name or self.MAIN_COLLECTION
 
         if collection_name not in self._collections:
-            self._collections[collection_name] = self._client.get_or_create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": distance_metric}
-            )
-            logger.debug(f"Kolekcja '{collection_name}' załadowana/utworzona")
+            try:
+                collection = self._client.get_collection(name=collection_name)
+            except Exception:
+                collection = self._client.get_or_create_collection(
+                    name=collection_name,
+                    metadata={"hnsw:space": distance_metric, **self._embedding_metadata()}
+                )
+                logger.info(f"Kolekcja '{collection_name}' utworzona ({self._embedding_service.model_name})")
+
+            self._check_embedding_metadata(collection)
+            self._collections[collection_name] = collection
+            logger.debug(f"Kolekcja '{collection_name}' załadowana")
 
         return self._collections[collection_name]
 
+    def _embedding_metadata(self) -> Dict[str, Any]:
+        """Backend, model i wymiar embeddingów do metadanych kolekcji."""
+        backend = self._embedding_service.backend
+        return {
+            "embedding_backend": backend.name,
+            "embedding_model": backend.model_name,
+            "embedding_dimension": backend.dimension,
+        }
+
+    def _check_embedding_metadata(self, collection: chromadb.Collection) -> None:
+        """Porównuje backend kolekcji z bieżącym; niezgodna kolekcja blokuje zapis."""
+        recorded = collection.metadata or {}
+        self._incompatible.pop(collection.name, None)
+
+        if "embedding_model" not in recorded:
+            logger.debug(f"Kolekcja '{collection.name}' bez zapisanego backendu embeddingów")
+            return
+
+        backend = self._embedding_service.backend
+        if (recorded.get("embedding_backend"), recorded.get("embedding_model")) != (backend.name, backend.model_name):
+            message = (
+                f"Kolekcja '{collection.name}' zbudowana backendem "
+                f"{recorded.get('embedding_backend')}:{recorded.get('embedding_model')} "
+                f"({recorded.get('embedding_dimension')} wym.), bieżący: {backend.name}:{backend.model_name}. "
+                f"Zresetuj kolekcję i wykonaj ingestion ponownie."
+            )
+            self._incompatible[collection.name] = message
+            logger.error(message)
+
+    def _ensure_writable(self, collection: chromadb.Collection) -> None:
+        """Blokuje zapis wektorów innego backendu do kolekcji."""
+        message = self._incompatible.get(collection.name)
+        if message:
+            raise ValueError(message)
+
     def add_chunks(
         self,
         chunks: List[ProcessedChunk],
@@ -106,33 +193,68 @@ class VectorStoreManager:
         if not chunks:
             return 0
 
-        collection = self.get_or_create_collection(collection_name)
         added_count = 0
 
         for i in range(0, len(chunks), batch_size):
             batch = chunks[i:i + batch_size]
 
-            ids = [chunk.chunk_id for chunk in batch]
-            documents = [chunk.text for chunk in batch]
-            metadatas = [self._sanitize_metadata(chunk.metadata) for chunk in batch]
-
             # Generuj embeddingi
-            embeddings = self._embedding_service.embed_documents(documents)
-
-            # Upsert (dodaj lub zaktualizuj)
-            collection.upsert(
-                ids=ids,
-                documents=documents,
-                metadatas=metadatas,
-                embeddings=embeddings
-            )
+            embeddings = self._embedding_service.embed_documents([chunk.text for chunk in batch])
 
-            added_count += len(batch)
+            added_count += self.upsert_chunks(batch, embeddings, collection_name)
             logger.debug(f"Dodano batch {i // batch_size + 1}: {len(batch)} chunków")
 
         logger.info(f"Dodano {added_count} chunków do kolekcji")
         return added_count
 
+    @property
+    def embedding_service(self) -> EmbeddingService:
+        """Serwis embeddingów używany przez kolekcję."""
+        return self._embedding_service
+
+    def upsert_chunks(
+        self,
+        chunks: List[ProcessedChunk],
+        embeddings: List[List[float]],
+        collection_name: Optional[str] = None
+    ) -> int:
+        """
+        Zapisuje chunki z gotowymi embeddingami (bez embedowania).
+
+        Args:
+            chunks: Lista ProcessedChunk
+            embeddings: Embeddingi w kolejności chunków
+            collection_name: Nazwa kolekcji (opcjonalna)
+
+        Returns:
+            Liczba zapisanych chunków
+        """
+        if not chunks:
+            return 0
+
+        if len(chunks) != len(embeddings):
+            raise ValueError(
+                f"Liczba embeddingów ({len(embeddings)}) różna od liczby chunków ({len(chunks)})"
+            )
+
+        collection = self.get_or_create_collection(collection_name)
+        self._ensure_writable(collection)
+
+        ids = [chunk.chunk_id for chunk in chunks]
+        documents = [chunk.text for chunk in chunks]
+        metadatas = [self._sanitize_metadata(chunk.metadata) for chunk in chunks]
+
+        # Upsert (dodaj lub zaktualizuj)
+        collection.upsert(
+            ids=ids,
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=embeddings
+        )
+        self._index_lexical(collection.name, ids, documents, metadatas)
+        self._bump_data_version()
+        return len(chunks)
+
     def add_document(
         self,
         document_id: str,
@@ -153,6 +275,7 @@ class VectorStoreManager:
             True jeśli sukces
         """
         collection = self.get_or_create_collection(collection_name)
+        self._ensure_writable(collection)
 
         # Generuj embedding
         embedding = self._embedding_service.embed_query(text)
@@ -161,12 +284,15 @@ class VectorStoreManager:
             logger.error(f"Nie udało się wygenerować embeddingu dla {document_id}")
             return False
 
+        sanitized = self._sanitize_metadata(metadata)
         collection.upsert(
             ids=[document_id],
             documents=[text],
-            metadatas=[self._sanitize_metadata(metadata)],
+            metadatas=[sanitized],
             embeddings=[embedding]
         )
+        self._index_lexical(collection.name, [document_id], [text], [sanitized])
+        self._bump_data_version()
 
         return True
 
@@ -177,7 +303,8 @@ class VectorStoreManager:
         where: Optional[Dict[str, Any]] = None,
         where_document: Optional[Dict[str, Any]] = None,
         collection_name: Optional[str] = None,
-        include: Optional[List[str]] = None
+        include: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None
     ) -> Dict[str, Any]:
         """
         Wykonuje zapytanie semantyczne z opcjonalnym filtrowaniem.
@@ -189,30 +316,201 @@ class VectorStoreManager:
             where_document: Filtr na treści dokumentu
             collection_name: Nazwa kolekcji (opcjonalna)
             include: Pola do zwrócenia (documents, metadatas, distances)
+            query_embedding: Gotowy embedding zapytania (pomija embed_query)
 
         Returns:
             Słownik z wynikami: documents, metadatas, distances, ids
         """
         collection = self.get_or_create_collection(collection_name)
 
-        # Generuj embedding zapytania
-        query_embedding = self._embedding_service.embed_query(query_text)
+        # Generuj embedding zapytania (jeśli nie podano gotowego)
+        if query_embedding is None:
+            query_embedding = self._embedding_service.embed_query(query_text)
 
         if not query_embedding:
             logger.warning("Nie udało się wygenerować embeddingu zapytania")
-            return {"documents": [[]], "metadatas": [[]], "distances": [[]], "ids": [[]]}
+            return self._empty_result()
 
         # Wykonaj zapytanie
-        results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results,
-            where=where,
-            where_document=where_document,
-            include=include or ["documents", "metadatas", "distances"]
-        )
+        with span("chroma.query", n_results=n_results):
+            results = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where,
+                where_document=where_document,
+                include=include or ["documents", "metadatas", "distances"]
+            )
 
         return results
 
+    def query_many(
+        self,
+        query_text: Optional[str],
+        wheres: List[Optional[Dict[str, Any]]],
+        n_results: int = 5,
+        collection_name: Optional[str] = None,
+        include: Optional[List[str]] = None,
+        query_embedding: Optional[List[float]] = None,
+        overfetch_factor: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Zapytanie semantyczne dla wielu filtrów metadanych naraz.
+
+        Embedding zapytania liczony jest raz. ChromaDB nie pozwala podać
+        osobnego `where` dla każdego wektora w batchu, więc filtry są łączone
+        przez `$or` w jedno zapytanie (z nadmiarowym n_results), a wyniki
+        rozdzielane lokalnie na filtry. Filtr, który nie dostał pełnych
+        n_results mimo że kolekcja może mieć więcej pasujących dokumentów,
+        jest dopytywany osobno (tym samym wektorem).
+
+        Args:
+            query_text: Tekst zapytania (ignorowany gdy podano query_embedding)
+            wheres: Lista filtrów metadanych (None = bez filtra)
+            n_results: Liczba wyników na filtr
+            collection_name: Nazwa kolekcji (opcjonalna)
+            include: Pola do zwrócenia (documents, metadatas, distances)
+            query_embedding: Gotowy embedding zapytania
+            overfetch_factor: Mnożnik n_results dla zapytania łączonego
+
+        Returns:
+            Lista słowników z wynikami (format jak query()), w kolejności `wheres`
+        """
+        if not wheres:
+            return []
+
+        if query_embedding is None:
+            query_embedding = self._embedding_service.embed_query(query_text)
+
+        if not query_embedding:
+            logger.warning("Nie udało się wygenerować embeddingu zapytania")
+            return [self._empty_result() for _ in wheres]
+
+        include = list(include or ["documents", "metadatas", "distances"])
+        if "metadatas" not in include:
+            include.append("metadatas")
+
+        # Unikalne filtry (zachowując kolejność)
+        distinct: Dict[str, Optional[Dict[str, Any]]] = {}
+        for where in wheres:
+            distinct.setdefault(self._where_key(where), where)
+
+        def query_single(where: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            raw = self.query(
+                query_text=query_text,
+                n_results=n_results,
+                where=where,
+                collection_name=collection_name,
+                include=include,
+                query_embedding=query_embedding
+            )
+            return self._result_rows(raw)
+
+        # Jeden filtr lub filtr z operatorami, których nie umiemy sprawdzić lokalnie
+        if len(distinct) == 1 or not all(self._is_simple_where(w) for w in distinct.values()):
+            rows_by_key = {key: query_single(where) for key, where in distinct.items()}
+            return [self._rows_to_result(rows_by_key[self._where_key(w)]) for w in wheres]
+
+        collection = self.get_or_create_collection(collection_name)
+        filters = [w for w in distinct.values() if w]
+        union_where = None if len(filters) < len(distinct) else {"$or": filters}
+        fetch_n = n_results * len(distinct) * max(1, overfetch_factor)
+
+        with span("chroma.query", n_results=fetch_n, filters=len(distinct)):
+            raw = collection.query(
+                query_embeddings=[query_embedding],
+                n_results=fetch_n,
+                where=union_where,
+                include=include
+            )
+        rows = self._result_rows(raw)
+
+        rows_by_key: Dict[str, List[Dict[str, Any]]] = {key: [] for key in distinct}
+        for row in rows:
+            for key, where in distinct.items():
+                bucket = rows_by_key[key]
+                if len(bucket) < n_results and self._matches_where(row["metadata"], where):
+                    bucket.append(row)
+
+        # Zapytanie łączone zwróciło komplet - część pasujących mogła się nie zmieścić
+        if len(rows) >= fetch_n:
+            for key, where in distinct.items():
+                if len(rows_by_key[key]) < n_results:
+                    rows_by_key[key] = query_single(where)
+
+        logger.debug(f"query_many: {len(distinct)} filtrów, {len(rows)} wyników zapytania łączonego")
+        return [self._rows_to_result(rows_by_key[self._where_key(w)]) for w in wheres]
+
+    @staticmethod
+    def _empty_result() -> Dict[str, Any]:
+        """Pusty wynik w formacie ChromaDB."""
+        return {"documents": [[]], "metadatas": [[]], "distances": [[]], "ids": [[]]}
+
+    @staticmethod
+    def _where_key(where: Optional[Dict[str, Any]]) -> str:
+        """Stabilny klucz filtra (do deduplikacji)."""
+        return json.dumps(where, sort_keys=True) if where else ""
+
+    @classmethod
+    def _is_simple_where(cls, where: Optional[Dict[str, Any]]) -> bool:
+        """Czy filtr składa się tylko z równości i $and/$or (sprawdzalny lokalnie)."""
+        if not where:
+            return True
+        for key, value in where.items():
+            if key in ("$and", "$or"):
+                if not all(cls._is_simple_where(w) for w in value):
+                    return False
+            elif key.startswith("$") or isinstance(value, dict):
+                return False
+        return True
+
+    @classmethod
+    def _matches_where(cls, metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+        """Lokalne sprawdzenie filtra where (równości, $and, $or)."""
+        if not where:
+            return True
+        for key, value in where.items():
+            if key == "$and":
+                if not all(cls._matches_where(metadata, w) for w in value):
+                    return False
+            elif key == "$or":
+                if not any(cls._matches_where(metadata, w) for w in value):
+                    return False
+            elif (metadata or {}).get(key) != value:
+                return False
+        return True
+
+    @staticmethod
+    def _result_rows(raw: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Zamienia wynik ChromaDB (listy kolumn) na listę wierszy."""
+        def column(name: str) -> list:
+            values = raw.get(name)
+            return values[0] if values and values[0] is not None else []
+
+        ids = column("ids")
+        documents = column("documents")
+        metadatas = column("metadatas")
+        distances = column("distances")
+
+        return [
+            {
+                "id": ids[i] if i < len(ids) else None,
+                "document": documents[i] if i < len(documents) else None,
+                "metadata": metadatas[i] if i < len(metadatas) else {},
+                "distance": distances[i] if i < len(distances) else None,
+            }
+            for i in range(max(len(ids), len(documents)))
+        ]
+
+    @staticmethod
+    def _rows_to_result(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Zamienia listę wierszy z powrotem na format ChromaDB."""
+        return {
+            "ids": [[r["id"] for r in rows]],
+            "documents": [[r["document"] for r in rows]],
+            "metadatas": [[r["metadata"] for r in rows]],
+            "distances": [[r["distance"] for r in rows]],
+        }
+
     def query_by_region(
         self,
         query_text: str,
@@ -274,12 +572,225 @@ class VectorStoreManager:
             collection.delete(
                 where={"document_id": document_id}
             )
+            if self._lexical_index is not None:
+                self._lexical_index.delete_document(collection.name, document_id)
+            self._bump_data_version()
             logger.info(f"Usunięto dokument {document_id}")
             return True
         except Exception as e:
             logger.error(f"Błąd usuwania dokumentu {document_id}: {e}")
             return False
 
+    def get_chunk_manifest(
+        self,
+        document_id: str,
+        collection_name: Optional[str] = None
+    ) -> Dict[str, Dict[str, str]]:
+        """
+        Zwraca hashe chunków zapisanych dla dokumentu.
+
+        Args:
+            document_id: ID dokumentu
+            collection_name: Nazwa kolekcji (opcjonalna)
+
+        Returns:
+            Słownik chunk_id -> {"content_hash", "document_hash", "total_chunks"}
+        """
+        collection = self.get_or_create_collection(collection_name)
+
+        existing = collection.get(
+            where={"document_id": document_id},
+            include=["metadatas"]
+        )
+
+        manifest = {}
+        for chunk_id, metadata in zip(existing.get("ids") or [], existing.get("metadatas") or []):
+            metadata = metadata or {}
+            manifest[chunk_id] = {
+                "content_hash": metadata.get("content_hash", ""),
+                "document_hash": metadata.get("document_hash", ""),
+                "total_chunks": metadata.get("total_chunks"),
+            }
+        return manifest
+
+    def get_chunk_embeddings(
+        self,
+        chunk_ids: List[str],
+        collection_name: Optional[str] = None
+    ) -> Dict[str, List[float]]:
+        """
+        Zwraca zapisane embeddingi chunków.
+
+        Args:
+            chunk_ids: Lista ID chunków
+            collection_name: Nazwa kolekcji (opcjonalna)
+
+        Returns:
+            Słownik chunk_id -> embedding (bez chunków nieobecnych w kolekcji)
+        """
+        if not chunk_ids:
+            return {}
+
+        collection = self.get_or_create_collection(collection_name)
+        with span("chroma.get", ids=len(chunk_ids)):
+            existing = collection.get(ids=list(chunk_ids), include=["embeddings"])
+
+        embeddings = existing.get("embeddings")
+        if embeddings is None:
+            return {}
+        return {
+            chunk_id: [float(v) for v in embedding]
+            for chunk_id, embedding in zip(existing.get("ids") or [], embeddings)
+            if embedding is not None and len(embedding)
+        }
+
+    def update_chunk_metadata(
+        self,
+        chunks: List[ProcessedChunk],
+        collection_name: Optional[str] = None
+    ) -> int:
+        """
+        Aktualizuje tylko metadane chunków (bez treści i embeddingów).
+
+        Używane dla niezmienionych chunków zmienionego dokumentu - dostają
+        nowy document_hash, dzięki czemu kolejny przebieg trafia w szybką
+        ścieżkę prepare_document.
+
+        Args:
+            chunks: Lista ProcessedChunk (istniejących w kolekcji)
+            collection_name: Nazwa kolekcji (opcjonalna)
+
+        Returns:
+            Liczba zaktualizowanych chunków
+        """
+        if not chunks:
+            return 0
+
+        collection = self.get_or_create_collection(collection_name)
+        collection.update(
+            ids=[chunk.chunk_id for chunk in chunks],
+            metadatas=[self._sanitize_metadata(chunk.metadata) for chunk in chunks]
+        )
+        return len(chunks)
+
+    def delete_chunks(
+        self,
+        chunk_ids: List[str],
+        collection_name: Optional[str] = None
+    ) -> int:
+        """
+        Usuwa chunki po ID.
+
+        Args:
+            chunk_ids: Lista ID chunków
+            collection_name: Nazwa kolekcji (opcjonalna)
+
+        Returns:
+            Liczba usuniętych chunków
+        """
+        if not chunk_ids:
+            return 0
+
+        collection = self.get_or_create_collection(collection_name)
+        collection.delete(ids=list(chunk_ids))
+        if self._lexical_index is not None:
+            self._lexical_index.delete_chunks(collection.name, chunk_ids)
+        self._bump_data_version()
+        logger.debug(f"Usunięto {len(chunk_ids)} chunków")
+        return len(chunk_ids)
+
+    @property
+    def lexical_index(self) -> Optional[LexicalIndex]:
+        """Indeks BM25 kolekcji (None gdy wyłączony)."""
+        return self._lexical_index
+
+    def _index_lexical(
+        self,
+        collection_name: str,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Aktualizuje indeks BM25; błąd indeksu nie przerywa zapisu do ChromaDB."""
+        if self._lexical_index is None:
+            return
+        try:
+            self._lexical_index.upsert(collection_name, ids, documents, metadatas)
+        except Exception as e:
+            logger.error(f"Błąd aktualizacji indeksu leksykalnego: {e}")
+
+    def lexical_query(
+        self,
+        query_text: str,
+        n_results: int = 5,
+        region: Optional[str] = None,
+        country: Optional[str] = None,
+        source: Optional[str] = None,
+        collection_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Wyszukiwanie BM25 w indeksie leksykalnym kolekcji.
+
+        Returns:
+            Wiersze {"id", "document", "metadata", "score"} (pusta lista gdy indeks wyłączony)
+        """
+        if self._lexical_index is None:
+            return []
+        return self._lexical_index.search(
+            collection_name or self.MAIN_COLLECTION,
+            query_text,
+            n_results=n_results,
+            region=region,
+            country=country,
+            source=source
+        )
+
+    def rebuild_lexical_index(
+        self,
+        collection_name: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> int:
+        """
+        Odbudowuje indeks BM25 z zawartości kolekcji ChromaDB.
+
+        Potrzebne dla baz zbudowanych przed wprowadzeniem indeksu
+        lub po jego usunięciu.
+
+        Args:
+            collection_name: Nazwa kolekcji (opcjonalna)
+            batch_size: Liczba chunków pobieranych naraz
+
+        Returns:
+            Liczba zaindeksowanych chunków
+        """
+        if self._lexical_index is None:
+            raise RuntimeError("Indeks leksykalny wyłączony (settings.lexical_index_enabled)")
+
+        collection = self.get_or_create_collection(collection_name)
+        self._lexical_index.clear(collection.name)
+
+        indexed = 0
+        offset = 0
+        while True:
+            batch = collection.get(
+                include=["documents", "metadatas"],
+                limit=batch_size,
+                offset=offset
+            )
+            ids = batch.get("ids") or []
+            if not ids:
+                break
+            indexed += self._lexical_index.upsert(
+                collection.name,
+                ids,
+                batch.get("documents") or [""] * len(ids),
+                [m or {} for m in (batch.get("metadatas") or [{}] * len(ids))]
+            )
+            offset += len(ids)
+
+        logger.info(f"Indeks leksykalny odbudowany: {indexed} chunków ('{collection.name}')")
+        return indexed
+
     def get_collection_stats(
         self,
         collection_name: Optional[str] = None
@@ -294,10 +805,18 @@ class VectorStoreManager:
             Słownik ze statystykami
         """
         collection = self.get_or_create_collection(collection_name)
+        metadata = collection.metadata or {}
 
         return {
             "name": collection.name,
             "count": collection.count(),
+            "embedding_backend": metadata.get("embedding_backend"),
+            "embedding_model": metadata.get("embedding_model"),
+            "embedding_dimension": metadata.get("embedding_dimension"),
+            "embedding_compatible": collection.name not in self._incompatible,
+            "lexical_count": (
+                self._lexical_index.count(collection.name) if self._lexical_index is not None else None
+            ),
             "persist_path": str(self.persist_path),
         }
 
@@ -325,6 +844,10 @@ class VectorStoreManager:
             self._client.delete_collection(name)
             if name in self._collections:
                 del self._collections[name]
+            self._incompatible.pop(name, None)
+            if self._lexical_index is not None:
+                self._lexical_index.clear(name)
+            self._bump_data_version()
             logger.info(f"Kolekcja '{name}' zresetowana")
             return True
         except Exception as e:
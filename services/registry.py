@@ -0,0 +1,98 @@
+"""
+Rejestr obiektów kosztownych w budowie (klienci LLM, agenci, grafy).
+
+Obiekt jest budowany raz na proces dla danego klucza i współdzielony.
+Rejestr mierzy czas budowy i liczbę ponownych użyć - z tego wynika
+szacowana oszczędność (reused * średni czas budowy).
+"""
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ObjectRegistry:
+    """Cache obiektów klucz -> instancja ze statystykami budowy."""
+
+    def __init__(self, kind: str):
+        """
+        Args:
+            kind: Rodzaj obiektów (do logów i statystyk), np. "llm", "agent"
+        """
+        self.kind = kind
+        self._objects: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._build_seconds = 0.0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """
+        Zwraca obiekt dla klucza, budując go przy pierwszym użyciu.
+
+        Args:
+            key: Klucz obiektu (np. (model, temperatura))
+            factory: Funkcja budująca obiekt
+        """
+        with self._lock:
+            obj = self._objects.get(key)
+            if obj is not None:
+                self._reused += 1
+                return obj
+
+            start = time.perf_counter()
+            obj = factory()
+            elapsed = time.perf_counter() - start
+
+            self._objects[key] = obj
+            self._created += 1
+            self._build_seconds += elapsed
+
+        logger.debug(f"Rejestr {self.kind}: zbudowano {key} w {elapsed * 1000:.1f} ms")
+        return obj
+
+    def clear(self) -> None:
+        """Usuwa wszystkie obiekty (np. po zmianie konfiguracji)."""
+        with self._lock:
+            self._objects.clear()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statystyki budowy i ponownych użyć."""
+        with self._lock:
+            avg_build = self._build_seconds / self._created if self._created else 0.0
+            return {
+                "objects": len(self._objects),
+                "created": self._created,
+                "reused": self._reused,
+                "avg_build_ms": round(avg_build * 1000, 2),
+                "saved_ms_estimate": round(self._reused * avg_build * 1000, 1),
+            }
+
+
+_registries: Dict[str, ObjectRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(kind: str) -> ObjectRegistry:
+    """Zwraca rejestr danego rodzaju (tworzony przy pierwszym użyciu)."""
+    with _registries_lock:
+        registry = _registries.get(kind)
+        if registry is None:
+            registry = _registries[kind] = ObjectRegistry(kind)
+        return registry
+
+
+def get_registry_stats(kind: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Statystyki wszystkich rejestrów (lub jednego rodzaju)."""
+    with _registries_lock:
+        registries = dict(_registries)
+    if kind is not None:
+        registries = {kind: registries[kind]} if kind in registries else {}
+    return {name: registry.get_stats() for name, registry in sorted(registries.items())}
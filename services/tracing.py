@@ -0,0 +1,260 @@
+"""
+Śledzenie etapów analizy (spany) i metryki w formacie Prometheus.
+
+Spany mierzą embeddingi, zapytania ChromaDB, web search, ocenę
+wiarygodności, wywołania LLM (z liczbą tokenów) i emitowanie eventów SSE:
+
+    with span("search.chroma", filters=3) as s:
+        ...
+        s.set(results=len(rows))
+
+Zakończony span trafia do:
+- histogramu czasu per nazwa (GET /metrics)
+- śledzenia bieżącej analizy (start_trace w kontekście zadania) -
+  spany od ostatniego eventu progress są dołączane do niego jako `timing`
+
+Przy settings.tracing_enabled = False span() zwraca współdzielony
+obiekt no-op - koszt to jedno sprawdzenie flagi. Kontekst śledzenia
+(contextvar) przechodzi do zadań asyncio i do puli run_blocking.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import bisect
+import logging
+import threading
+import time
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "sedno"
+
+# Granice kubełków histogramów (sekundy)
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Atrybuty spanów LLM sumowane w timing i licznikach tokenów
+TOKEN_ATTRIBUTES = ("prompt_tokens", "completion_tokens")
+
+
+class Histogram:
+    """Histogram Prometheus (kubełki skumulowane przy renderowaniu) z etykietą."""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, totals = self._series.setdefault(label_value, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            totals[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), totals[0]) for key, (counts, totals) in self._series.items()}
+        for label_value, (counts, total) in sorted(series.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    """Licznik Prometheus z etykietami."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: Tuple[str, ...], amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_span_duration = Histogram(
+    f"{METRICS_PREFIX}_span_duration_seconds", "Czas spanów (embedding, chroma, web, LLM, SSE)", "span"
+)
+_stage_duration = Histogram(
+    f"{METRICS_PREFIX}_stage_duration_seconds", "Czas etapów blokujących (run_blocking)", "stage"
+)
+_span_errors = Counter(f"{METRICS_PREFIX}_span_errors_total", "Spany zakończone wyjątkiem", ("span",))
+_llm_tokens = Counter(f"{METRICS_PREFIX}_llm_tokens_total", "Tokeny wywołań LLM", ("span", "kind"))
+
+
+class Trace:
+    """Spany jednej analizy; drain() zwraca agregat od poprzedniego wywołania."""
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self._pending: List[Tuple[str, float, Dict[str, Any]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, attributes: Dict[str, Any]) -> None:
+        with self._lock:
+            self._pending.append((name, seconds, attributes))
+
+    def drain(self) -> Dict[str, Any]:
+        """
+        Agregat spanów od ostatniego drain (pole timing eventu progress).
+
+        Returns:
+            {"elapsed_ms": ..., "spans": {nazwa: {"count", "ms", tokeny...}}}
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        spans: Dict[str, Dict[str, Any]] = {}
+        for name, seconds, attributes in pending:
+            entry = spans.setdefault(name, {"count": 0, "ms": 0.0})
+            entry["count"] += 1
+            entry["ms"] += seconds * 1000
+            for key in TOKEN_ATTRIBUTES:
+                if attributes.get(key):
+                    entry[key] = entry.get(key, 0) + int(attributes[key])
+            if attributes.get("error"):
+                entry["errors"] = entry.get("errors", 0) + 1
+        for entry in spans.values():
+            entry["ms"] = round(entry["ms"], 1)
+
+        return {
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "spans": spans,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+class Span:
+    """Pomiar jednego etapu (context manager)."""
+
+    __slots__ = ("name", "attributes", "_started")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self._started = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        """Dodaje atrybuty (np. prompt_tokens, completion_tokens, results)."""
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self._started
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.attributes["error"] = True
+            _span_errors.inc((self.name,))
+
+        _span_duration.observe(self.name, elapsed)
+        for key in TOKEN_ATTRIBUTES:
+            if self.attributes.get(key):
+                _llm_tokens.inc((self.name, key.split("_")[0]), self.attributes[key])
+
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(self.name, elapsed, self.attributes)
+
+
+class _NoopSpan:
+    """Span przy wyłączonym śledzeniu."""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes: Any):
+    """
+    Span etapu (no-op, gdy śledzenie wyłączone).
+
+    Args:
+        name: Nazwa etapu (np. "llm.stream", "search.web")
+        **attributes: Atrybuty początkowe
+    """
+    if not settings.tracing_enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+@contextmanager
+def start_trace(trace_id: str) -> Iterator[Optional[Trace]]:
+    """
+    Ustawia śledzenie analizy w bieżącym kontekście (zadaniu asyncio).
+
+        with start_trace(session_id):
+            await run_mvp_analysis(...)
+    """
+    if not settings.tracing_enabled:
+        yield None
+        return
+
+    trace = Trace(trace_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def drain_timing() -> Optional[Dict[str, Any]]:
+    """Agregat spanów bieżącej analizy od ostatniego eventu progress (None bez śledzenia)."""
+    trace = _current_trace.get()
+    return trace.drain() if trace is not None else None
+
+
+def record_stage_metric(stage: str, elapsed: float, failed: bool) -> None:
+    """Odbiorca pomiarów executora (add_stage_listener) - histogram etapów."""
+    _stage_duration.observe(stage, elapsed)
+
+
+def render_metrics() -> str:
+    """Metryki w formacie tekstowym Prometheus (text/plain; version=0.0.4)."""
+    lines: List[str] = []
+    for metric in (_span_duration, _stage_duration, _span_errors, _llm_tokens):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -4,84 +4,185 @@ Web Search Engine - wyszukiwanie w internecie.
 Używa DuckDuckGo do wyszukiwania informacji w czasie rzeczywistym.
 Przetwarzanie dokumentów i baza wektorowa przeniesione do services/rag/.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
 from datetime import datetime
 import logging
-import re
+import threading
+import time
 
 from langchain_community.tools import DuckDuckGoSearchRun
 
+from core.config import settings
+from services.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
+class _TTLCache:
+    """
+    Prosty cache LRU z TTL, bezpieczny wątkowo.
+
+    Wyszukiwania wykonywane są w puli wątków, stąd lock.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+
 class WebSearchEngine:
     """
     Serwis wyszukiwania w internecie.
 
     Używa DuckDuckGo Search API do wyszukiwania informacji
-    w czasie rzeczywistym.
+    w czasie rzeczywistym. Tytuły, snippety i URL-e pochodzą z jednego
+    wywołania API, a wyniki są cache'owane (TTL) po znormalizowanym zapytaniu.
     """
 
-    def __init__(self):
-        """Inicjalizuje WebSearchEngine z DuckDuckGo."""
-        self.search = DuckDuckGoSearchRun()
+    def __init__(
+        self,
+        max_results: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        search: Optional[Any] = None
+    ):
+        """
+        Inicjalizuje WebSearchEngine z DuckDuckGo.
+
+        Args:
+            max_results: Liczba wyników pobieranych z DuckDuckGo
+            cache_ttl: Czas życia wpisu w cache (sekundy, 0 = bez cache)
+            cache_size: Maksymalna liczba zapytań w cache
+            search: Narzędzie wyszukiwania z api_wrapper.results
+                (domyślnie DuckDuckGoSearchRun; np. atrapa w benchmarkach)
+        """
+        self.search = search or DuckDuckGoSearchRun()
+        self.max_results = max_results or settings.web_search_max_results
+        ttl = settings.web_search_cache_ttl if cache_ttl is None else cache_ttl
+        self._cache = _TTLCache(ttl=ttl, max_size=cache_size or settings.web_search_cache_size) if ttl > 0 else None
+
+        # Single-flight: równoległe identyczne zapytania czekają na jedno wywołanie
+        self._inflight: Dict[str, threading.Lock] = {}
+        self._inflight_lock = threading.Lock()
+
         logger.info("WebSearchEngine zainicjalizowany (DuckDuckGo)")
 
-    def search_web(self, query: str) -> str:
+    def search_results(self, query: str) -> List[Dict[str, str]]:
         """
-        Wykonuje wyszukiwanie w internecie.
+        Wykonuje wyszukiwanie i zwraca ustrukturyzowane wyniki.
+
+        Jedno wywołanie DuckDuckGo na znormalizowane zapytanie w okresie TTL.
 
         Args:
             query: Zapytanie tekstowe
 
         Returns:
-            Tekst z wynikami wyszukiwania
+            Lista słowników z polami: title, snippet, link
         """
         if not query or not query.strip():
             logger.warning("Próba wyszukiwania z pustym zapytaniem")
-            return ""
+            return []
 
-        try:
-            result = self.search.run(query)
-            logger.debug(f"Web search dla '{query[:50]}...': {len(result)} znaków")
-            return result
-        except Exception as e:
-            logger.error(f"Błąd web search: {e}")
-            return ""
+        key = self._normalize_query(query)
 
-    def search_web_for_rag(self, query: str) -> List[Dict[str, Any]]:
+        cached = self._cache.get(key) if self._cache is not None else None
+        if cached is not None:
+            return cached
+
+        with self._inflight_lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Ktoś mógł już pobrać wyniki, gdy czekaliśmy na lock
+            cached = self._cache.get(key) if self._cache is not None else None
+            if cached is not None:
+                return cached
+
+            try:
+                with span("web_search", max_results=self.max_results):
+                    results = self.search.api_wrapper.results(query, max_results=self.max_results)
+                logger.debug(f"Web search dla '{query[:50]}...': {len(results)} wyników")
+            except Exception as e:
+                logger.error(f"Błąd web search: {e}")
+                results = []
+            finally:
+                with self._inflight_lock:
+                    self._inflight.pop(key, None)
+
+            if results and self._cache is not None:
+                self._cache.set(key, results)
+
+        return results
+
+    def search_web(self, query: str) -> str:
         """
-        Wyszukuje w internecie i zwraca listę dokumentów z metadanymi dla RAG.
+        Wykonuje wyszukiwanie w internecie.
 
         Args:
             query: Zapytanie tekstowe
 
         Returns:
-            Lista słowników z polami: url, title, content, date, snippet
+            Tekst z wynikami wyszukiwania
         """
-        result = self.search_web(query)
+        return "\n\n".join(
+            f"{r.get('title', '')}\n{r.get('snippet', '')}".strip()
+            for r in self.search_results(query)
+        )
 
-        if not result:
-            return []
-
-        # Podziel wynik na fragmenty
-        fragments = self._split_into_fragments(result)
+    def search_web_for_rag(self, query: str) -> List[Dict[str, Any]]:
+        """
+        Wyszukuje w internecie i zwraca listę dokumentów z metadanymi dla RAG.
 
-        # Wyciągnij URL-e z wyniku
-        urls = self.get_search_urls(query)
+        Args:
+            query: Zapytanie tekstowe
 
-        # Parsuj fragmenty na dokumenty z metadanymi
+        Returns:
+            Lista słowników z polami: url, title, content, date, snippet
+        """
         documents = []
-        for idx, fragment in enumerate(fragments):
-            # Każdy fragment to osobny dokument
-            url = urls[idx] if idx < len(urls) else None
-            title = self._extract_title_from_fragment(fragment)
+        for result in self.search_results(query):
+            content = result.get("snippet", "")
+            if not content:
+                continue
 
             documents.append({
-                "url": url,
-                "title": title,
-                "content": fragment,
-                "snippet": fragment[:200],  # Pierwsze 200 znaków jako snippet
+                "url": result.get("link"),
+                "title": result.get("title") or self._extract_title_from_fragment(content),
+                "content": content,
+                "snippet": content[:200],  # Pierwsze 200 znaków jako snippet
                 "date": datetime.now().isoformat(),  # Web search nie ma konkretnej daty
                 "source": "web_search"
             })
@@ -90,7 +191,7 @@ class WebSearchEngine:
 
     def get_search_urls(self, query: str) -> List[str]:
         """
-        Wyszukuje i ekstrahuje URL-e z wyników.
+        Wyszukuje i zwraca URL-e wyników.
 
         Args:
             query: Zapytanie tekstowe
@@ -98,73 +199,34 @@ class WebSearchEngine:
         Returns:
             Lista znalezionych URL-i
         """
-        result = self.search_web(query)
-
-        if not result:
-            return []
-
-        # Regex do znajdowania URL-i
-        url_pattern = r'https?://[^\s<>"\']+|www\.[^\s<>"\']+'
-        urls = re.findall(url_pattern, result)
-
-        # Deduplikacja i walidacja
         unique_urls = []
-        for url in urls:
-            # Wyczyść URL z trailing znaków
-            url = url.rstrip('.,;:!?)')
-
-            if url.startswith(("http://", "https://", "www.")):
-                if url not in unique_urls:
-                    unique_urls.append(url)
+        for result in self.search_results(query):
+            url = result.get("link")
+            if url and url not in unique_urls:
+                unique_urls.append(url)
 
         return unique_urls
 
-    def _split_into_fragments(
-        self,
-        text: str,
-        max_fragment_length: int = 1000
-    ) -> List[str]:
-        """
-        Dzieli tekst na fragmenty.
-
-        Args:
-            text: Tekst do podziału
-            max_fragment_length: Maksymalna długość fragmentu
-
-        Returns:
-            Lista fragmentów
-        """
-        if not text:
-            return []
-
-        # Najpierw podziel po podwójnych newline'ach
-        paragraphs = text.split('\n\n')
-
-        fragments = []
-        current_fragment = ""
-
-        for para in paragraphs:
-            para = para.strip()
-            if not para:
-                continue
-
-            if len(current_fragment) + len(para) + 2 <= max_fragment_length:
-                if current_fragment:
-                    current_fragment += "\n\n"
-                current_fragment += para
-            else:
-                if current_fragment:
-                    fragments.append(current_fragment)
-                current_fragment = para
-
-        if current_fragment:
-            fragments.append(current_fragment)
-
-        # Jeśli brak fragmentów, zwróć cały tekst jako jeden fragment
-        if not fragments:
-            fragments = [text[:max_fragment_length]]
-
-        return fragments
+    def get_cache_stats(self) -> dict:
+        """Zwraca statystyki cache wyników."""
+        if self._cache is None:
+            return {"enabled": False}
+
+        total = self._cache.hits + self._cache.misses
+        return {
+            "enabled": True,
+            "cache_size": len(self._cache),
+            "max_cache_size": self._cache.max_size,
+            "ttl_seconds": self._cache.ttl,
+            "cache_hits": self._cache.hits,
+            "cache_misses": self._cache.misses,
+            "hit_rate": round(self._cache.hits / total, 3) if total > 0 else 0,
+        }
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalizuje zapytanie do klucza cache (wielkość liter, białe znaki)."""
+        return " ".join(query.lower().split())
 
     def _extract_title_from_fragment(self, fragment: str) -> str:
         """
@@ -0,0 +1,32 @@
+"""Wspólne fixtury testów: lokalna baza (ChromaDB + BM25) z deterministycznymi embeddingami."""
+import pytest
+
+from benchmarks.fakes import FakeEmbeddingBackend
+from services.rag.embedding_cache import PersistentEmbeddingCache
+from services.rag.embeddings import EmbeddingService
+from services.rag.lexical_index import LexicalIndex
+from services.rag.vector_store import VectorStoreManager
+
+
+@pytest.fixture
+def embedding_backend() -> FakeEmbeddingBackend:
+    """Embeddingi z haszowania słów, bez opóźnień i bez API."""
+    return FakeEmbeddingBackend(dimension=64)
+
+
+@pytest.fixture
+def embedding_service(tmp_path, embedding_backend) -> EmbeddingService:
+    return EmbeddingService(
+        backend=embedding_backend,
+        persistent_cache=PersistentEmbeddingCache(path=str(tmp_path / "embedding_cache.sqlite3")),
+    )
+
+
+@pytest.fixture
+def vector_store(tmp_path, embedding_service) -> VectorStoreManager:
+    """Pusta baza w katalogu tymczasowym (jak BenchmarkEnvironment.new_vector_store)."""
+    return VectorStoreManager(
+        persist_path=str(tmp_path / "chromadb"),
+        embedding_service=embedding_service,
+        lexical_index=LexicalIndex(path=str(tmp_path / "lexical_index.sqlite3")),
+    )
@@ -0,0 +1,94 @@
+"""Testy cache analiz: trafienia, unieważnianie po data_version i TTL."""
+from types import SimpleNamespace
+
+import pytest
+
+import services.analysis_cache
+from services.analysis_cache import AnalysisCache
+
+CONFIG = {"regions": ["EU", "USA"], "sectors": ["steel"], "timeframes": ["12m", "36m"]}
+RESULT = {"report": "## Raport\nCła UE na stal.", "scenarios": []}
+EVENTS = [
+    {"type": "progress", "agent": "system", "content": "Oczekiwanie w kolejce (pozycja 1)", "queue_position": 1},
+    {"type": "thinking", "agent": "supervisor", "content": "Analizuję zapytanie"},
+    {"type": "progress", "agent": "analysis", "content": "Wyszukiwanie", "timing": {"search": 0.2}},
+    {"type": "report_delta", "agent": "synthesis", "content": "## Rap"},
+    {"type": "done", "session_id": "s1"},
+]
+
+
+@pytest.fixture
+def data() -> SimpleNamespace:
+    """Stand-in bazy wektorowej - źródło data_version."""
+    return SimpleNamespace(data_version="v1")
+
+
+@pytest.fixture
+def cache(tmp_path, embedding_service, data) -> AnalysisCache:
+    return AnalysisCache(
+        path=str(tmp_path / "analysis_cache.sqlite3"),
+        ttl_seconds=3600,
+        similarity_threshold=0.8,
+        max_entries=100,
+        embedding_service=embedding_service,
+        vector_store=data,
+    )
+
+
+def test_lookup_hits_normalized_query_and_replays_filtered_events(cache):
+    cache.store("Cła UE na stal", CONFIG, EVENTS, RESULT)
+
+    hit = cache.lookup("  cła ue   na STAL? ", dict(CONFIG, regions=["USA", "EU"]))
+
+    assert hit is not None
+    assert hit.similarity == 1.0
+    assert hit.result == RESULT
+    assert [e["type"] for e in hit.events] == ["thinking", "progress"]
+    assert all("timing" not in e for e in hit.events)
+
+
+def test_lookup_matches_similar_query_but_not_other_config(cache):
+    cache.store("cła ue na stal", CONFIG, EVENTS, RESULT)
+
+    assert cache.lookup("cła ue na stal walcowaną", CONFIG) is not None
+    assert cache.lookup("sankcje wobec rosji na gaz", CONFIG) is None
+    assert cache.lookup("cła ue na stal", dict(CONFIG, sectors=["energy"])) is None
+
+
+def test_data_version_change_invalidates_entries(cache, data):
+    cache.store("cła ue na stal", CONFIG, EVENTS, RESULT)
+
+    data.data_version = "v2"
+
+    assert cache.lookup("cła ue na stal", CONFIG) is None
+
+
+def test_result_computed_on_old_data_is_not_stored(cache, data):
+    data.data_version = "v2"
+
+    cache.store("cła ue na stal", CONFIG, EVENTS, RESULT, data_version="v1")
+
+    assert cache.get_stats()["entries"] == 0
+    assert cache.lookup("cła ue na stal", CONFIG) is None
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = 1_800_000_000.0
+    monkeypatch.setattr(services.analysis_cache.time, "time", lambda: now)
+    cache.store("cła ue na stal", CONFIG, EVENTS, RESULT)
+    assert cache.lookup("cła ue na stal", CONFIG) is not None
+
+    monkeypatch.setattr(services.analysis_cache.time, "time", lambda: now + cache.ttl_seconds + 1)
+
+    assert cache.lookup("cła ue na stal", CONFIG) is None
+    stats = cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_store_replaces_previous_result_for_same_query(cache):
+    cache.store("cła ue na stal", CONFIG, EVENTS, RESULT)
+    cache.store("Cła UE na stal.", CONFIG, EVENTS, {"report": "nowszy"})
+
+    assert cache.get_stats()["entries"] == 1
+    assert cache.lookup("cła ue na stal", CONFIG).result == {"report": "nowszy"}
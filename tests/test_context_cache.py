@@ -0,0 +1,55 @@
+"""Testy FakeContextCache - lokalnej imitacji cache kontekstu Gemini."""
+from services.context_cache import FakeContextCache
+
+
+class _Model:
+    """Model, którego FakeContextCache nie powinien modyfikować."""
+
+
+def test_bind_prepends_cached_prefix_to_prompt():
+    cache = FakeContextCache()
+    llm = _Model()
+    context = cache.create("gemini-test", "Raport: cła UE na stal.", ttl_seconds=60)
+
+    bound_llm, prompt = cache.bind(llm, context, "Zadanie: scenariusz negatywny 12m.")
+
+    assert bound_llm is llm
+    assert prompt == "Raport: cła UE na stal.\n\nZadanie: scenariusz negatywny 12m."
+    assert context.name.startswith("cachedContents/fake-")
+    assert cache.active == 1
+
+
+def test_delete_removes_entry_and_updates_stats():
+    cache = FakeContextCache()
+    first = cache.create("gemini-test", "Prefiks pierwszy", ttl_seconds=60)
+    second = cache.create("gemini-test", "Prefiks drugi", ttl_seconds=60)
+    cache.bind(_Model(), first, "zadanie")
+
+    cache.delete(first)
+
+    assert first.name != second.name
+    assert cache.active == 1
+    stats = cache.get_stats()
+    assert stats["backend"] == "FakeContextCache"
+    assert stats["created"] == 2
+    assert stats["deleted"] == 1
+    assert stats["bound"] == 1
+    assert stats["cached_tokens"] == first.tokens + second.tokens
+
+
+def test_create_below_min_tokens_falls_back_to_full_prompts():
+    cache = FakeContextCache(min_tokens=1000)
+
+    assert cache.create("gemini-test", "Za krótki prefiks", ttl_seconds=60) is None
+    assert cache.get_stats()["failed"] == 1
+    assert cache.active == 0
+
+
+def test_delete_of_missing_entry_is_only_logged():
+    cache = FakeContextCache()
+    context = cache.create("gemini-test", "Prefiks", ttl_seconds=60)
+    cache.delete(context)
+
+    cache.delete(context)
+
+    assert cache.get_stats()["deleted"] == 1
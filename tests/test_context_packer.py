@@ -0,0 +1,73 @@
+"""Testy pakowania kontekstu promptów w budżet tokenów."""
+from agents.context_packer import compress_report, count_tokens, pack_documents, truncate_to_tokens
+
+
+def _paragraph(word: str, sentences: int) -> str:
+    return " ".join(f"Zdanie {i} o temacie {word} opisuje skutki decyzji." for i in range(sentences))
+
+
+def test_pack_documents_keeps_relevance_order_within_budget():
+    docs = [_paragraph("stal", 3), _paragraph("gaz", 3), _paragraph("chipy", 3)]
+    budget = count_tokens(docs[0]) + count_tokens("\n---\n") + count_tokens(docs[1])
+
+    packed = pack_documents(docs, render=str, budget_tokens=budget, min_chunk_tokens=10_000)
+
+    assert packed.indices == [0, 1]
+    assert packed.included == 2
+    assert packed.dropped == 1
+    assert packed.truncated == 0
+    assert packed.text == docs[0] + "\n---\n" + docs[1]
+    assert packed.tokens <= budget
+
+
+def test_pack_documents_truncates_last_fitting_document():
+    docs = [_paragraph("stal", 3), _paragraph("gaz", 40)]
+    budget = count_tokens(docs[0]) + 60
+
+    packed = pack_documents(docs, render=str, budget_tokens=budget, min_chunk_tokens=20)
+
+    assert packed.indices == [0, 1]
+    assert packed.truncated == 1
+    assert packed.text.endswith("[...]")
+    assert packed.tokens <= budget
+
+
+def test_pack_documents_fills_remaining_budget_with_shorter_documents():
+    short = "Krótka notatka o sankcjach."
+    docs = [_paragraph("stal", 3), _paragraph("gaz", 40), short]
+    budget = count_tokens(docs[0]) + count_tokens("\n---\n") + count_tokens(short)
+
+    packed = pack_documents(docs, render=str, budget_tokens=budget, min_chunk_tokens=10_000)
+
+    assert packed.indices == [0, 2]
+    assert packed.dropped == 1
+
+
+def test_truncate_to_tokens_respects_limit():
+    text = _paragraph("stal", 50)
+
+    truncated = truncate_to_tokens(text, 40)
+
+    assert count_tokens(truncated) <= 40
+    assert truncated.endswith("[...]")
+    assert truncate_to_tokens("krótko", 40) == "krótko"
+
+
+def test_compress_report_keeps_every_section_within_budget():
+    report = "\n\n".join(
+        f"## Sekcja {name}\n{_paragraph(name, 30)}" for name in ("stal", "gaz", "chipy")
+    )
+    budget = count_tokens(report) // 3
+
+    compressed = compress_report(report, budget_tokens=budget)
+
+    assert count_tokens(compressed) <= budget + 10
+    for name in ("stal", "gaz", "chipy"):
+        assert f"## Sekcja {name}" in compressed
+        assert f"Zdanie 0 o temacie {name}" in compressed
+
+
+def test_compress_report_returns_short_report_unchanged():
+    report = "## Podsumowanie\nKrótki raport."
+
+    assert compress_report(report, budget_tokens=1000) == report
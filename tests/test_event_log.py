@@ -0,0 +1,88 @@
+"""Testy dziennika eventów sesji i wznawiania strumienia SSE (Last-Event-ID)."""
+import asyncio
+import json
+from typing import List
+
+import pytest
+
+import api.session_store
+from api.event_log import EventLog
+from api.session_store import InMemorySessionStore
+from api.streaming import create_session, event_generator
+
+
+@pytest.fixture
+def session_store(monkeypatch) -> InMemorySessionStore:
+    store = InMemorySessionStore(max_sessions=10, ttl_seconds=60, max_bytes=10_000_000)
+    monkeypatch.setattr(api.session_store, "_session_store", store)
+    return store
+
+
+def _thinking(n: int) -> dict:
+    return {"type": "thinking", "agent": "supervisor", "content": f"krok {n}"}
+
+
+def test_read_after_returns_events_past_the_given_id():
+    log = EventLog()
+    for i in range(1, 4):
+        assert log.append(_thinking(i)) == i
+
+    assert [event_id for event_id, _ in log.read_after(1)] == [2, 3]
+    assert log.read_after(3) == []
+    assert [event_id for event_id, _ in log.read_after(-5)] == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_events_wakes_on_append():
+    log = EventLog()
+    waiter = asyncio.create_task(log.wait_for_events(0, timeout=5.0))
+    await asyncio.sleep(0.01)
+
+    log.append(_thinking(1))
+    events = await asyncio.wait_for(waiter, timeout=1.0)
+
+    assert [event_id for event_id, _ in events] == [1]
+
+
+@pytest.mark.asyncio
+async def test_wait_for_events_times_out_without_new_events():
+    log = EventLog()
+    log.append(_thinking(1))
+
+    assert await log.wait_for_events(1, timeout=0.01) == []
+
+
+def _frames(chunks: List[str]) -> List[tuple]:
+    """Ramki SSE z polem id jako pary (id, event)."""
+    frames = []
+    for chunk in chunks:
+        if not chunk.startswith("id: "):
+            continue
+        id_line, data_line = chunk.strip().split("\n")
+        frames.append((int(id_line[4:]), json.loads(data_line[6:])))
+    return frames
+
+
+@pytest.mark.asyncio
+async def test_event_generator_resumes_after_last_event_id(session_store):
+    session = await create_session("s1", "Cła UE na stal", {})
+    for i in range(1, 4):
+        session.events.append(_thinking(i))
+    session.events.append({"type": "done", "session_id": "s1"})
+
+    chunks = [chunk async for chunk in event_generator("s1", last_event_id=2, timeout=1.0)]
+
+    assert chunks[0] == "retry: 3000\n\n"
+    assert [event_id for event_id, _ in _frames(chunks)] == [3, 4]
+    assert _frames(chunks)[-1][1]["type"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_event_generator_returns_when_resumed_after_terminal_event(session_store):
+    session = await create_session("s1", "Cła UE na stal", {})
+    session.events.append(_thinking(1))
+    session.events.append({"type": "done", "session_id": "s1"})
+
+    chunks = [chunk async for chunk in event_generator("s1", last_event_id=2, timeout=1.0)]
+
+    assert _frames(chunks) == []
@@ -0,0 +1,126 @@
+"""Testy klasyfikacji błędów, ponowień i kolejki GeminiRateLimiter."""
+import asyncio
+import threading
+import time
+
+import pytest
+from google.api_core.exceptions import InvalidArgument, ResourceExhausted
+from langchain_google_genai._common import GoogleGenerativeAIError
+
+from services.gemini_limiter import GeminiRateLimiter, is_throttled, retryable_error
+
+
+def _wrapped_429() -> GoogleGenerativeAIError:
+    """Błąd jak z GoogleGenerativeAIEmbeddings: 429 opakowane przez raise ... from e."""
+    try:
+        try:
+            raise ResourceExhausted("Quota exceeded")
+        except ResourceExhausted as e:
+            raise GoogleGenerativeAIError(f"Error embedding content: {e}") from e
+    except GoogleGenerativeAIError as wrapped:
+        return wrapped
+
+
+@pytest.fixture
+def limiter(monkeypatch) -> GeminiRateLimiter:
+    limiter = GeminiRateLimiter("test", requests_per_minute=0, tokens_per_minute=0, max_concurrency=1, max_retries=2)
+    monkeypatch.setattr(limiter, "_backoff", lambda attempt: 0.0)
+    return limiter
+
+
+def test_wrapped_429_is_classified_as_throttling():
+    error = _wrapped_429()
+
+    assert isinstance(retryable_error(error), ResourceExhausted)
+    assert is_throttled(error)
+
+
+def test_wrapped_429_is_retried(limiter):
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise _wrapped_429()
+        return [0.1, 0.2]
+
+    assert limiter.call(embed, "tekst") == [0.1, 0.2]
+    assert len(calls) == 2
+    assert limiter.get_stats()["retries"] == 1
+
+
+def test_wrapped_non_retryable_error_is_raised(limiter):
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        try:
+            raise InvalidArgument("bad request")
+        except InvalidArgument as e:
+            raise GoogleGenerativeAIError("Error embedding content") from e
+
+    with pytest.raises(GoogleGenerativeAIError):
+        limiter.call(embed, "tekst")
+    assert len(calls) == 1
+
+
+def test_call_corrects_token_bucket_with_actual_usage():
+    # 600 TPM = bucket o pojemności 10 tokenów; batch 50 tokenów pobiera przy acquire tylko 10
+    limiter = GeminiRateLimiter("test", requests_per_minute=0, tokens_per_minute=600, max_concurrency=1)
+
+    limiter.call(lambda texts: texts, ["a", "b"], tokens=50, usage=lambda _: 50)
+
+    # Reszta batcha odliczona przy release - bucket jest na minusie
+    assert limiter._tokens < -30
+
+
+@pytest.mark.asyncio
+async def test_async_waiter_is_woken_by_release():
+    limiter = GeminiRateLimiter("test", requests_per_minute=0, tokens_per_minute=0, max_concurrency=1)
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+    assert limiter.get_stats()["queued"]["interactive"] == 1
+
+    limiter.release()
+    waited = await asyncio.wait_for(waiter, timeout=1.0)
+
+    assert waited < 0.5
+    assert limiter.get_stats()["in_flight"] == 1
+
+
+def test_thread_waiter_is_woken_by_release():
+    limiter = GeminiRateLimiter("test", requests_per_minute=0, tokens_per_minute=0, max_concurrency=1)
+    limiter.acquire_sync()
+    acquired = threading.Event()
+
+    def wait():
+        limiter.acquire_sync()
+        acquired.set()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    assert not acquired.wait(0.05)
+
+    released = time.monotonic()
+    limiter.release()
+    assert acquired.wait(1.0)
+    assert time.monotonic() - released < 0.5
+    thread.join()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_block_the_queue():
+    limiter = GeminiRateLimiter("test", requests_per_minute=0, tokens_per_minute=0, max_concurrency=1)
+    await limiter.acquire()
+
+    first = asyncio.create_task(limiter.acquire())
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.01)
+    first.cancel()
+    limiter.release()
+
+    await asyncio.wait_for(second, timeout=1.0)
+    assert limiter.get_stats()["queued"]["interactive"] == 0
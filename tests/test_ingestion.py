@@ -0,0 +1,132 @@
+"""Testy przyrostowej ingestion: plan dokumentu (prepare_document) i zatwierdzanie (DocumentCommits)."""
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from services.data_pipeline.ingestion import (
+    DocumentCommits,
+    DocumentPlan,
+    ingest_documents,
+    prepare_document,
+)
+from services.rag.text_processor import DocumentProcessor
+
+
+@pytest.fixture
+def processor() -> DocumentProcessor:
+    # Ta sama konfiguracja chunkingu co ingest_documents
+    return DocumentProcessor(chunk_size=1000, chunk_overlap=200)
+
+
+@pytest.fixture
+def document():
+    return generate_corpus(1, seed=3, min_words=900, max_words=1200)[0]
+
+
+@pytest.mark.asyncio
+async def test_unchanged_document_is_skipped(vector_store, processor, document, embedding_backend):
+    written = await ingest_documents([document], vector_store)
+    embedded = embedding_backend.texts
+
+    plan = prepare_document(document, processor, vector_store)
+
+    assert written > 1
+    assert plan.unchanged
+    assert plan.unchanged_chunks == written
+    assert await ingest_documents([document], vector_store) == 0
+    assert embedding_backend.texts == embedded
+
+
+@pytest.mark.asyncio
+async def test_changed_tail_rewrites_only_changed_chunks(vector_store, processor, document):
+    written = await ingest_documents([document], vector_store)
+    changed = replace(document, content=document.content + "\n\nAktualizacja: Komisja przedłużyła cła o rok.")
+
+    plan = prepare_document(changed, processor, vector_store)
+
+    assert not plan.unchanged
+    assert 0 < len(plan.to_upsert) < written
+    assert plan.unchanged_chunks > 0
+    # Nowy document_hash trafia też do metadanych niezmienionych chunków
+    assert plan.to_refresh
+
+    await ingest_documents([changed], vector_store)
+    assert prepare_document(changed, processor, vector_store).unchanged
+
+
+@pytest.mark.asyncio
+async def test_shortened_document_deletes_stale_chunks(vector_store, processor, document):
+    written = await ingest_documents([document], vector_store)
+    shortened = replace(document, content=document.content[: len(document.content) // 2])
+
+    plan = prepare_document(shortened, processor, vector_store)
+    assert plan.to_delete
+
+    await ingest_documents([shortened], vector_store)
+    manifest = vector_store.get_chunk_manifest(plan.document_id)
+    assert len(manifest) == written - len(plan.to_delete)
+    assert prepare_document(shortened, processor, vector_store).unchanged
+
+
+@pytest.mark.asyncio
+async def test_incomplete_document_is_not_treated_as_unchanged(vector_store, processor, document):
+    await ingest_documents([document], vector_store)
+    document_id = prepare_document(document, processor, vector_store).document_id
+    missing = sorted(vector_store.get_chunk_manifest(document_id))[-1]
+    vector_store.delete_chunks([missing])
+
+    plan = prepare_document(document, processor, vector_store)
+
+    assert not plan.unchanged
+    assert [chunk.chunk_id for chunk in plan.to_upsert] == [missing]
+
+
+def _chunk(document_id: str, index: int) -> SimpleNamespace:
+    return SimpleNamespace(document_id=document_id, chunk_id=f"{document_id}-chunk-{index:04d}")
+
+
+@pytest.mark.asyncio
+async def test_document_commits_after_last_batch_only():
+    committed: List[str] = []
+
+    async def on_commit(doc, plan: DocumentPlan) -> None:
+        committed.append(plan.document_id)
+
+    commits = DocumentCommits(on_commit)
+    chunks = [_chunk("doc-a", i) for i in range(3)]
+    await commits.add(SimpleNamespace(url="a"), DocumentPlan(document_id="doc-a", to_upsert=chunks))
+    await commits.add(SimpleNamespace(url="b"), DocumentPlan(document_id="doc-b", unchanged_chunks=2))
+
+    assert committed == ["doc-b"]
+
+    await commits.written(chunks[:2])
+    assert committed == ["doc-b"]
+    assert commits.pending == 1
+
+    await commits.written(chunks[2:])
+    assert committed == ["doc-b", "doc-a"]
+    assert commits.pending == 0
+    assert commits.committed == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_leaves_document_uncommitted():
+    committed: List[str] = []
+
+    async def on_commit(doc, plan: DocumentPlan) -> None:
+        committed.append(plan.document_id)
+
+    commits = DocumentCommits(on_commit)
+    chunks = [_chunk("doc-a", i) for i in range(2)]
+    await commits.add(SimpleNamespace(url="a"), DocumentPlan(document_id="doc-a", to_upsert=chunks))
+
+    await commits.written(chunks[:1])
+    await commits.failed_batch(chunks[1:])
+    await commits.written(chunks[1:])
+
+    assert committed == []
+    assert commits.failed == 1
+    assert commits.pending == 0
@@ -0,0 +1,92 @@
+"""Testy kolejki analiz: kontrola przyjęć (429) i kolejność priorytetów."""
+import asyncio
+from typing import List
+
+import pytest
+
+from api.jobs import AnalysisJob, JobScheduler, QueueFullError
+
+
+async def _until(predicate, timeout: float = 1.0) -> None:
+    """Oddaje sterowanie pętli, aż warunek będzie spełniony."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "warunek niespełniony w czasie"
+        await asyncio.sleep(0.001)
+
+
+def _job(session_id: str, priority: int = 0) -> AnalysisJob:
+    return AnalysisJob(session_id=session_id, query="Cła UE na stal", config={}, priority=priority)
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_when_queue_is_full():
+    release = asyncio.Event()
+
+    async def runner(job: AnalysisJob) -> None:
+        await release.wait()
+
+    scheduler = JobScheduler(runner, max_workers=1, max_queue_size=2)
+    scheduler.submit(_job("running"))
+    await _until(lambda: scheduler.get_stats()["running"] == 1)
+
+    assert scheduler.submit(_job("q1")) == 1
+    assert scheduler.submit(_job("q2")) == 2
+    assert scheduler.is_full
+
+    with pytest.raises(QueueFullError):
+        scheduler.submit(_job("q3"))
+
+    stats = scheduler.get_stats()
+    assert stats["rejected"] == 1
+    assert stats["queued"] == 2
+    assert scheduler.estimate_wait_seconds() >= 1
+
+    release.set()
+    await _until(lambda: scheduler.get_stats()["completed"] == 3)
+    assert not scheduler.is_full
+    await scheduler.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_by_priority_then_submission_order():
+    release = asyncio.Event()
+    started: List[str] = []
+    positions = {}
+
+    async def runner(job: AnalysisJob) -> None:
+        started.append(job.session_id)
+        await release.wait()
+
+    async def on_position(job: AnalysisJob, position: int) -> None:
+        positions[job.session_id] = position
+
+    scheduler = JobScheduler(runner, max_workers=1, max_queue_size=10, on_position=on_position)
+    scheduler.submit(_job("first", priority=5))
+    await _until(lambda: started == ["first"])
+
+    scheduler.submit(_job("background-1", priority=5))
+    scheduler.submit(_job("background-2", priority=5))
+    assert scheduler.submit(_job("interactive", priority=0)) == 1
+    await _until(lambda: positions.get("background-2") == 3)
+
+    release.set()
+    await _until(lambda: len(started) == 4)
+    assert started == ["first", "interactive", "background-1", "background-2"]
+    await scheduler.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_failed_job_does_not_stop_the_worker():
+    async def runner(job: AnalysisJob) -> None:
+        if job.session_id == "bad":
+            raise RuntimeError("analiza nie powiodła się")
+
+    scheduler = JobScheduler(runner, max_workers=1, max_queue_size=10)
+    scheduler.submit(_job("bad"))
+    scheduler.submit(_job("good"))
+
+    await _until(lambda: scheduler.get_stats()["completed"] == 1)
+    assert scheduler.get_stats()["failed"] == 1
+    await scheduler.shutdown()
@@ -0,0 +1,125 @@
+"""Testy wyszukiwania hybrydowego: fuzja RRF, składanie wyników, fan-out po filtrach."""
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from schemas.schemas import DocumentMetadata
+from services.rag.search import (
+    HybridSearchResult,
+    HybridSearchService,
+    SearchFilter,
+    SearchStrategy,
+    fuse_store_results,
+    reciprocal_rank_fusion,
+)
+
+
+def _result(
+    chunk_id: str,
+    relevance: float = 0.5,
+    source_type: str = "vector_store"
+) -> HybridSearchResult:
+    return HybridSearchResult(
+        content=f"Treść fragmentu {chunk_id}",
+        metadata=DocumentMetadata(source="EU_COMMISSION", region="EU"),
+        relevance_score=relevance,
+        source_type=source_type,
+        chunk_id=chunk_id if source_type == "vector_store" else None,
+    )
+
+
+def test_rrf_rewards_documents_ranked_by_both_lists():
+    vector = [_result("a"), _result("b"), _result("c")]
+    lexical = [_result("c"), _result("a"), _result("d")]
+
+    fused = reciprocal_rank_fusion([vector, lexical], k=60)
+
+    assert [r.chunk_id for r in fused] == ["a", "c", "b", "d"]
+    assert fused[0].fusion_score == round(1 / 61 + 1 / 62, 6)
+    assert fused[3].fusion_score == round(1 / 63, 6)
+    # Przy duplikatach zostaje obiekt z pierwszej listy
+    assert fused[0] is vector[0]
+
+
+def test_fuse_store_results_truncates_to_n_results():
+    vector = [_result("a"), _result("b")]
+    lexical = [_result("b"), _result("x"), _result("y")]
+
+    fused = fuse_store_results(vector, lexical, n_results=3)
+
+    assert [r.chunk_id for r in fused] == ["b", "a", "x"]
+    assert fuse_store_results(vector, [], n_results=1) == vector[:1]
+
+
+def test_finalize_keeps_rrf_order_and_filters_only_web_results():
+    # Trafienie BM25 z niskim cosinusem zostaje na swojej pozycji RRF
+    store = reciprocal_rank_fusion([[_result("a", 0.9)], [_result("exact", 0.05), _result("a", 0.9)]], k=60)
+    web = [_result("web-bad", 0.1, "web_search"), _result("web-good", 0.8, "web_search")]
+
+    results = HybridSearchService._finalize_results(store + web, n_results=3, min_relevance=0.3)
+
+    assert [r.chunk_id for r in results[:2]] == ["a", "exact"]
+    assert [(r.source_type, r.relevance_score) for r in results[2:]] == [("web_search", 0.8)]
+
+
+def test_finalize_filters_vector_only_results_by_relevance():
+    results = HybridSearchService._finalize_results(
+        [_result("low", 0.1), _result("high", 0.9)], n_results=5, min_relevance=0.3
+    )
+
+    assert [r.chunk_id for r in results] == ["high"]
+
+
+class FailingEmbeddings:
+    """Serwis embeddingów z niedostępnym API."""
+
+    def embed_query(self, text: str) -> List[float]:
+        raise RuntimeError("429 Resource exhausted")
+
+
+class FakeVectorStore:
+    """Baza z samym indeksem BM25 (ChromaDB nie powinna być pytana bez embeddingu)."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.embedding_service = FailingEmbeddings()
+        self.vector_queries = 0
+
+    def lexical_query(self, query: str, n_results: int, region=None, country=None, source=None):
+        return [row for row in self.rows if region is None or row["metadata"]["region"] == region][:n_results]
+
+    def get_chunk_embeddings(self, chunk_ids: List[str]) -> Dict[str, List[float]]:
+        return {}
+
+    def query_many(self, query_text: str, wheres: List[Optional[dict]], n_results: int, query_embedding=None):
+        self.vector_queries += 1
+        return [{"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]} for _ in wheres]
+
+
+def _row(chunk_id: str, region: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": chunk_id,
+        "document": text,
+        "metadata": {"source": "EU_COMMISSION", "region": region, "date": "2026-01-10"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_asearch_many_keeps_lexical_hits_when_embedding_fails():
+    store = FakeVectorStore([
+        _row("eu-1", "EU", "Komisja Europejska podnosi cła antydumpingowe na stal z Chin."),
+        _row("eu-2", "EU", "Rada UE przyjmuje 16. pakiet sankcji wobec Rosji."),
+        _row("usa-1", "USA", "Departament Handlu USA rozszerza kontrolę eksportu chipów."),
+    ])
+    service = HybridSearchService(vector_store=store, web_search=object())
+
+    results = await service.asearch_many(
+        "cła na stal",
+        [SearchFilter(region="EU", n_results=2), SearchFilter(region="USA", n_results=2)],
+        strategy=SearchStrategy.VECTOR_ONLY,
+    )
+
+    assert [r.chunk_id for r in results] == ["eu-1", "eu-2", "usa-1"]
+    assert all(r.fusion_score is not None for r in results)
+    assert all(r.relevance_score == 0.0 for r in results)
+    assert store.vector_queries == 0
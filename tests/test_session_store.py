@@ -0,0 +1,133 @@
+"""Testy magazynów sesji: limit pamięci z dziennikiem eventów i backend Redis."""
+import threading
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from api.session_store import AnalysisSession, InMemorySessionStore, RedisSessionStore
+
+
+class FakeRedis:
+    """Minimalny klient Redis w pamięci (komendy używane przez RedisSessionStore)."""
+
+    def __init__(self):
+        self.values: Dict[str, bytes] = {}
+        self.lists: Dict[str, List[bytes]] = {}
+        self.ttl: Dict[str, int] = {}
+        self.calling_threads = set()
+        self._lock = threading.Lock()
+
+    def _track(self) -> None:
+        self.calling_threads.add(threading.get_ident())
+
+    def get(self, key: str) -> Optional[bytes]:
+        self._track()
+        return self.values.get(key)
+
+    def set(self, key: str, value: str, ex: Optional[int] = None) -> None:
+        self._track()
+        self.values[key] = value.encode("utf-8")
+        if ex is not None:
+            self.ttl[key] = ex
+
+    def delete(self, key: str) -> int:
+        self._track()
+        existed = self.values.pop(key, None) is not None or self.lists.pop(key, None) is not None
+        return int(existed)
+
+    def rpush(self, key: str, value: str) -> int:
+        self._track()
+        with self._lock:
+            self.lists.setdefault(key, []).append(value.encode("utf-8"))
+            return len(self.lists[key])
+
+    def lrange(self, key: str, start: int, end: int) -> List[bytes]:
+        self._track()
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def expire(self, key: str, seconds: int) -> None:
+        self._track()
+        self.ttl[key] = seconds
+
+
+def _session(session_id: str, status: str = "completed") -> AnalysisSession:
+    return AnalysisSession(session_id=session_id, query="Cła UE na stal", config={}, status=status)
+
+
+def _event(n: int) -> Dict[str, Any]:
+    return {"type": "thinking", "agent": "supervisor", "content": "x" * 200 + str(n)}
+
+
+def test_in_memory_store_counts_event_log_growth():
+    store = InMemorySessionStore(max_sessions=10, ttl_seconds=60, max_bytes=10_000_000)
+    session = _session("s1", status="running")
+    store.save(session)
+    before = store.get_stats()["bytes"]
+
+    for i in range(10):
+        session.events.append(_event(i))
+    store.get("s1")
+
+    assert store.get_stats()["bytes"] >= before + session.events.size_bytes
+
+
+def test_in_memory_store_evicts_finished_session_when_events_exceed_limit():
+    store = InMemorySessionStore(max_sessions=10, ttl_seconds=60, max_bytes=3_000)
+    finished = _session("old")
+    active = _session("new", status="running")
+    store.save(finished)
+    store.save(active)
+
+    # Dziennik rośnie bez save() - tak jak przy emitowaniu eventów (emit_event woła get)
+    for i in range(20):
+        active.events.append(_event(i))
+        store.get("new")
+
+    assert store.get("old") is None
+    assert store.get("new") is active
+    assert store.get_stats()["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_redis_store_shares_state_and_events_between_workers():
+    client = FakeRedis()
+    worker_a = RedisSessionStore(client, ttl_seconds=60)
+    worker_b = RedisSessionStore(client, ttl_seconds=60)
+
+    session = _session("s1", status="running")
+    await worker_a.asave(session)
+    session.events.append(_event(1))
+    session.events.append(_event(2))
+    worker_a.flush()
+
+    remote = await worker_b.aget("s1")
+    assert remote is not None
+    assert remote.status == "running"
+
+    events = await remote.events.wait_for_events(0, timeout=1.0)
+    assert [event_id for event_id, _ in events] == [1, 2]
+    assert events[1][1]["content"] == _event(2)["content"]
+
+    # Kolejne wywołanie dociąga tylko nowe eventy
+    session.events.append(_event(3))
+    worker_a.flush()
+    events = await remote.events.wait_for_events(2, timeout=1.0)
+    assert [event_id for event_id, _ in events] == [3]
+    assert remote.events.last_id == 3
+
+
+@pytest.mark.asyncio
+async def test_redis_store_keeps_client_calls_off_the_event_loop():
+    client = FakeRedis()
+    store = RedisSessionStore(client, ttl_seconds=60)
+
+    session = _session("s1", status="running")
+    await store.asave(session)
+    session.events.append(_event(1))
+    store.flush()
+    await store.adelete("s1")
+
+    assert client.calling_threads
+    assert threading.get_ident() not in client.calling_threads
+    assert await store.aget("s1") is None
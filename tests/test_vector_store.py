@@ -0,0 +1,59 @@
+"""Testy VectorStoreManager.query_many - jedno zapytanie $or rozdzielane na filtry."""
+from dataclasses import replace
+
+import pytest
+
+from benchmarks.corpus import generate_corpus
+from services.data_pipeline.ingestion import ingest_documents
+
+REGIONS = ["EU", "EU", "EU", "USA", "USA", "ASIA"]
+QUERY = "cła antydumpingowe na stal i sankcje handlowe"
+
+
+async def _populate(vector_store) -> None:
+    documents = [
+        replace(doc, region=region, country=None)
+        for doc, region in zip(generate_corpus(len(REGIONS), seed=7), REGIONS)
+    ]
+    await ingest_documents(documents, vector_store, batch_size=16)
+
+
+@pytest.mark.asyncio
+async def test_query_many_splits_or_result_per_filter(vector_store):
+    await _populate(vector_store)
+    wheres = [{"region": "EU"}, {"region": "USA"}, {"region": "ASIA"}]
+
+    results = vector_store.query_many(QUERY, wheres, n_results=3)
+
+    assert len(results) == len(wheres)
+    for where, result in zip(wheres, results):
+        assert result["ids"][0], f"brak wyników dla {where}"
+        assert all(m["region"] == where["region"] for m in result["metadatas"][0])
+
+        # Ten sam wynik co osobne zapytanie z tym filtrem
+        single = vector_store.query(QUERY, n_results=3, where=where)
+        assert result["ids"][0] == single["ids"][0]
+
+
+@pytest.mark.asyncio
+async def test_query_many_returns_results_in_filter_order_with_duplicates(vector_store):
+    await _populate(vector_store)
+    wheres = [{"region": "USA"}, None, {"region": "USA"}]
+
+    results = vector_store.query_many(QUERY, wheres, n_results=2)
+
+    assert results[0]["ids"][0] == results[2]["ids"][0]
+    assert results[1]["ids"][0] == vector_store.query(QUERY, n_results=2)["ids"][0]
+
+
+@pytest.mark.asyncio
+async def test_query_many_backfills_filter_missing_from_union_result(vector_store):
+    await _populate(vector_store)
+    # Zapytanie łączone bez nadmiaru - filtr z mniejszą liczbą trafień jest dopytywany osobno
+    wheres = [{"region": "EU"}, {"region": "ASIA"}]
+
+    results = vector_store.query_many(QUERY, wheres, n_results=2, overfetch_factor=1)
+
+    for where, result in zip(wheres, results):
+        single = vector_store.query(QUERY, n_results=2, where=where)
+        assert result["ids"][0] == single["ids"][0]